@@ -0,0 +1,86 @@
+"""
+Benchmark the FDIC record flattener against pd.json_normalize.
+
+Usage:
+    poetry run python benchmarks/bench_flatten.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from data_transform import flatten_fdic_records  # noqa: E402
+
+
+def generate_records(rows: int) -> List[Dict]:
+    """Generate API records shaped like the /api/failures response."""
+    return [
+        {
+            "data": {
+                "ID": str(i),
+                "CERT": 10000 + i,
+                "FIN": str(1000 + i),
+                "NAME": f"Bank {i}",
+                "CITYST": "AUSTIN, TX",
+                "PSTALP": "TX",
+                "FAILDATE": f"{i % 12 + 1}/{i % 28 + 1}/{2023 - i % 90}",
+                "FAILYR": str(2023 - i % 90),
+                "SAVR": "DIF",
+                "RESTYPE": "FAILURE",
+                "RESTYPE1": "PA",
+                "CHCLASS1": "NM",
+                "QBFASSET": i * 17,
+                "QBFDEP": i * 13,
+                "COST": None if i % 3 else i * 1.5,
+            },
+            "score": 0,
+        }
+        for i in range(rows)
+    ]
+
+
+def best_of(repeat: int, func: Callable[[], pd.DataFrame]) -> float:
+    """Return the fastest wall time of `repeat` calls to `func`, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    records = generate_records(args.rows)
+
+    def json_normalize() -> pd.DataFrame:
+        return pd.json_normalize([item["data"] for item in records if "data" in item])
+
+    def flatten() -> pd.DataFrame:
+        return flatten_fdic_records(records)
+
+    # Both paths must build the same table
+    pd.testing.assert_frame_equal(json_normalize(), flatten())
+
+    normalize_time = best_of(args.repeat, json_normalize)
+    flatten_time = best_of(args.repeat, flatten)
+
+    print(f"rows:                 {args.rows}")
+    print(f"pd.json_normalize:    {normalize_time:.3f}s")
+    print(f"flatten_fdic_records: {flatten_time:.3f}s")
+    print(f"speedup:              {normalize_time / flatten_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
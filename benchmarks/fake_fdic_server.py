@@ -0,0 +1,226 @@
+"""
+Local stand-in for the FDIC BankFind API used by the benchmark suite.
+
+Serves /api/failures, /api/financials and /docs/*.yaml from synthetic records,
+with configurable row counts, per-request latency and error injection.
+
+Usage:
+    poetry run python benchmarks/fake_fdic_server.py --port 8000 --rows 1000000
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
+from urllib.parse import parse_qs, urlparse
+
+from synthetic_data import (
+    generate_failure_properties_yaml,
+    generate_failure_record,
+    generate_financials_record,
+    generate_records,
+)
+
+# Largest page the real API accepts before answering validate:numericality
+MAX_LIMIT = 10000
+
+ENDPOINT_GENERATORS: Dict[str, Callable[[int], Dict]] = {
+    "/api/failures": generate_failure_record,
+    "/api/financials": generate_financials_record,
+}
+
+
+class FakeFDICServer(ThreadingHTTPServer):
+    """
+    A threaded HTTP server mimicking the FDIC API endpoints used by the pipeline.
+
+    Parameters:
+        port (int): The port to listen on; 0 picks a free port.
+        rows (Dict[str, int]): The total number of records of each API endpoint.
+        latency (float): The delay added to every API response, in seconds.
+        error_rate (float): The fraction of API requests answered with a 503.
+        seed (int): The seed of the error injection.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        rows: Optional[Dict[str, int]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(("127.0.0.1", port), FakeFDICRequestHandler)
+        self.rows = rows or {endpoint: 10000 for endpoint in ENDPOINT_GENERATORS}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.definitions_yaml = generate_failure_properties_yaml().encode("utf-8")
+        self.definitions_etag = (
+            f'"{hashlib.sha256(self.definitions_yaml).hexdigest()[:16]}"'
+        )
+        self.request_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """The base URL of the server (e.g., 'http://127.0.0.1:8000')."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def should_fail(self) -> bool:
+        """Count a request and decide whether to inject an error into it."""
+        with self._lock:
+            self.request_count += 1
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.error_count += 1
+            return fail
+
+    def start(self) -> "FakeFDICServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving requests and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+
+class FakeFDICRequestHandler(BaseHTTPRequestHandler):
+    """Answer FDIC API requests from synthetic records."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Silence the per-request access log."""
+
+    def do_GET(self) -> None:
+        server = cast(FakeFDICServer, self.server)
+        parsed_url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+
+        if parsed_url.path.startswith("/docs/") and parsed_url.path.endswith(".yaml"):
+            self._send_definitions(server)
+            return
+
+        generator = ENDPOINT_GENERATORS.get(parsed_url.path)
+        if generator is None:
+            self._send_json(404, {"errors": [{"code": "not_found"}]})
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+        if server.should_fail():
+            self._send_json(503, {"errors": [{"code": "unavailable"}]})
+            return
+
+        status, body = self._get_page(server, parsed_url.path, generator, query)
+        self._send_json(status, body)
+
+    def _get_page(
+        self,
+        server: FakeFDICServer,
+        endpoint: str,
+        generator: Callable[[int], Dict],
+        query: Dict[str, str],
+    ) -> Tuple[int, Dict]:
+        """Build the status code and body of a paginated API response."""
+        limit = int(query.get("limit", 10))
+        offset = int(query.get("offset", 0))
+        if limit > MAX_LIMIT:
+            return 400, {"errors": [{"code": "validate:numericality"}]}
+
+        total = server.rows.get(endpoint, 0)
+        records = generate_records(generator, offset, limit, total)
+
+        fields = query.get("fields")
+        if fields:
+            projection = set(fields.split(","))
+            for record in records:
+                record["data"] = {
+                    key: value
+                    for key, value in record["data"].items()
+                    if key in projection or key == "ID"
+                }
+
+        return 200, {
+            "meta": {"total": total, "parameters": query},
+            "data": records,
+            "totals": {"count": total},
+        }
+
+    def _send_definitions(self, server: FakeFDICServer) -> None:
+        """Send the definitions YAML document, honouring If-None-Match."""
+        if self.headers.get("If-None-Match") == server.definitions_etag:
+            self.send_response(304)
+            self.send_header("ETag", server.definitions_etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-yaml")
+        self.send_header("ETag", server.definitions_etag)
+        self.send_header("Content-Length", str(len(server.definitions_yaml)))
+        self.end_headers()
+        self.wfile.write(server.definitions_yaml)
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        """Send a JSON response."""
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def parse_rows(values: List[str]) -> Dict[str, int]:
+    """Parse 'endpoint=rows' arguments, or a bare row count for every endpoint."""
+    rows: Dict[str, int] = {}
+    for value in values:
+        if "=" in value:
+            endpoint, count = value.split("=", 1)
+            rows[endpoint] = int(count)
+        else:
+            rows.update({endpoint: int(value) for endpoint in ENDPOINT_GENERATORS})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--rows",
+        nargs="+",
+        default=["10000"],
+        help="Rows per endpoint, e.g. 1000000 or /api/financials=5000000",
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeFDICServer(
+        port=args.port,
+        rows=parse_rows(args.rows),
+        latency=args.latency,
+        error_rate=args.error_rate,
+    )
+    print(f"Serving the stand-in FDIC API on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Benchmark FDICDataPipeline end to end against the stand-in FDIC API server.
+
+Each row count runs in a fresh interpreter with its own data and state
+directories, so the reported peak RSS belongs to that run alone.
+
+Usage:
+    poetry run python benchmarks/run_benchmarks.py --rows 10000 1000000 10000000
+    poetry run python benchmarks/run_benchmarks.py --rows 100000 --latency 0.05 \
+        --error-rate 0.01 --set TRANSFORM_CHUNK_ROWS=50000 FUSED_PIPELINE=true
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from fake_fdic_server import FakeFDICServer
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Pipelines collected for each benchmarked endpoint
+ENDPOINT_PIPELINES = {
+    "failures": ["failures", "failure_definitions"],
+    "financials": ["financials"],
+}
+
+
+def parse_overrides(values: List[str]) -> Dict[str, Any]:
+    """Parse KEY=VALUE config overrides, reading each value as JSON if possible."""
+    overrides: Dict[str, Any] = {}
+    for value in values:
+        key, raw = value.split("=", 1)
+        try:
+            overrides[key] = json.loads(raw)
+        except json.JSONDecodeError:
+            overrides[key] = raw
+    return overrides
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_worker(base_url: str, endpoint: str, work_dir: str, overrides: Dict) -> Dict:
+    """
+    Run the pipeline once in this process and measure it.
+
+    Parameters:
+        base_url (str): The base URL of the stand-in FDIC API server.
+        endpoint (str): The benchmarked endpoint, a key of ENDPOINT_PIPELINES.
+        work_dir (str): The directory holding the data and state directories of the run.
+        overrides (Dict): Config attributes to override before the pipeline is imported.
+
+    Returns:
+        Dict: The stage timings, request latencies and peak RSS of the run.
+    """
+    sys.path.insert(0, SRC_DIR)
+    import config
+
+    # Paths must be set before the pipeline modules bind them as defaults
+    config.DATA_DIR = os.path.join(work_dir, "data")
+    config.STATE_DIR = os.path.join(work_dir, "state")
+    config.LOGGING_LEVEL = "WARNING"
+    for key, value in overrides.items():
+        setattr(config, key, value)
+
+    import api_utils
+    import logging
+    from fdic_datapipeline import FDICDataPipeline
+    from get_dataset_metadata import gen_kaggle_metadata
+
+    logging.basicConfig(level=config.LOGGING_LEVEL)
+
+    latencies: List[float] = []
+    latencies_lock = threading.Lock()
+    make_api_request = api_utils.make_api_request
+
+    def timed_api_request(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return make_api_request(*args, **kwargs)
+        finally:
+            with latencies_lock:
+                latencies.append(time.perf_counter() - start)
+
+    api_utils.make_api_request = timed_api_request
+
+    def timed(stage: Callable[[], Any]) -> float:
+        start = time.perf_counter()
+        stage()
+        return time.perf_counter() - start
+
+    stages: Dict[str, float] = {}
+    pipeline = FDICDataPipeline(
+        base_url, incremental=config.INCREMENTAL_SYNC, fused=config.FUSED_PIPELINE
+    )
+    pipeline_configs = [
+        config.PIPELINE_CONFIGS[name] for name in ENDPOINT_PIPELINES[endpoint]
+    ]
+    pipeline.prepare_data_directory()
+    stages["collection"] = timed(
+        lambda: pipeline.run_data_collection_pipelines(pipeline_configs)
+    )
+    stages["transformation"] = timed(pipeline.run_data_transformation_pipeline)
+    if endpoint == "failures":
+        stages["metadata"] = timed(gen_kaggle_metadata)
+
+    data_dir = config.DATA_DIR
+    output_bytes = sum(
+        os.path.getsize(os.path.join(data_dir, name)) for name in os.listdir(data_dir)
+    )
+
+    return {
+        "stages": stages,
+        "requests": len(latencies),
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_max": max(latencies, default=0.0),
+        "output_bytes": output_bytes,
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_benchmark(
+    server: FakeFDICServer, rows: int, endpoint: str, overrides: Dict
+) -> Dict:
+    """
+    Run the pipeline for one row count in a fresh interpreter.
+
+    Parameters:
+        server (FakeFDICServer): The running stand-in FDIC API server.
+        rows (int): The number of records served by the benchmarked endpoint.
+        endpoint (str): The benchmarked endpoint, a key of ENDPOINT_PIPELINES.
+        overrides (Dict): Config attributes to override in the worker.
+
+    Returns:
+        Dict: The worker's measurements, plus the row count and server error count.
+    """
+    server.rows[f"/api/{endpoint}"] = rows
+    errors_before = server.error_count
+
+    with tempfile.TemporaryDirectory(prefix="fdic-bench-") as work_dir:
+        task = {
+            "base_url": server.base_url,
+            "endpoint": endpoint,
+            "work_dir": work_dir,
+            "overrides": overrides,
+        }
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(task)],
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+
+    result = json.loads(completed.stdout.decode("utf-8").strip().splitlines()[-1])
+    result["rows"] = rows
+    result["injected_errors"] = server.error_count - errors_before
+    return result
+
+
+def print_report(results: List[Dict]) -> None:
+    """Print a table of the benchmark results."""
+    header = (
+        f"{'rows':>10} {'total s':>9} {'collect s':>9} {'transform s':>11} "
+        f"{'rows/s':>10} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'errors':>6} {'peak MB':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        stages = result["stages"]
+        total = sum(stages.values())
+        print(
+            f"{result['rows']:>10} {total:>9.2f} {stages['collection']:>9.2f} "
+            f"{stages['transformation']:>11.2f} {result['rows'] / total:>10.0f} "
+            f"{result['requests']:>8} {result['latency_p50'] * 1000:>8.1f} "
+            f"{result['latency_p95'] * 1000:>8.1f} {result['injected_errors']:>6} "
+            f"{result['peak_rss_mb']:>8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10000, 1000000, 10000000]
+    )
+    parser.add_argument(
+        "--endpoint", choices=sorted(ENDPOINT_PIPELINES), default="failures"
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--set",
+        nargs="+",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Override config attributes in the pipeline, e.g. FUSED_PIPELINE=true",
+    )
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.worker:
+        task = json.loads(args.worker)
+        print(json.dumps(run_worker(**task)))
+        return
+
+    overrides = parse_overrides(args.set)
+    server = FakeFDICServer(latency=args.latency, error_rate=args.error_rate).start()
+    try:
+        results = [
+            run_benchmark(server, rows, args.endpoint, overrides) for rows in args.rows
+        ]
+    finally:
+        server.stop()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
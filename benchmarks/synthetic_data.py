@@ -0,0 +1,144 @@
+"""
+Deterministic synthetic FDIC records for the benchmark suite.
+
+Records are generated from their index alone, so the stand-in API server can
+serve any page of a multi-million row endpoint without holding it in memory.
+"""
+import os
+import random
+import sys
+from typing import Any, Callable, Dict, List
+
+import yaml
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import config  # noqa: E402
+
+STATES = ["TX", "CA", "IL", "GA", "FL", "NY", "OH", "MO", "KS", "MN"]
+CHARTER_CLASSES = ["N", "NM", "SM", "SB", "SA"]
+RESOLUTIONS = ["FAILURE", "ASSISTANCE"]
+TRANSACTION_TYPES = ["PA", "PI", "IDT", "PO", "A/A"]
+INSURANCE_FUNDS = ["DIF", "BIF", "SAIF", "FSLIC", "RTC"]
+
+# YAML property types of the FAILURE_PROPERTY_TYPE_MAP types
+YAML_TYPES = {
+    "numeric": "number",
+    "decimal": "number",
+    "integer": "integer",
+    "datetime": "string",
+    "province": "string",
+    "string": "string",
+}
+
+
+def generate_failure_record(index: int) -> Dict[str, Any]:
+    """
+    Generate the /api/failures record at the given index.
+
+    Parameters:
+        index (int): The position of the record in the endpoint, sorted by FAILDATE descending.
+
+    Returns:
+        Dict[str, Any]: The record, with its properties in the 'data' field.
+    """
+    rng = random.Random(index)
+    year = 2023 - (index // 50) % 90
+    state = STATES[rng.randrange(len(STATES))]
+
+    return {
+        "data": {
+            "ID": str(index + 1),
+            "CERT": 10000 + index,
+            "CHCLASS1": CHARTER_CLASSES[rng.randrange(len(CHARTER_CLASSES))],
+            "FAILDATE": f"{rng.randint(1, 12)}/{rng.randint(1, 28)}/{year}",
+            "COST": None if rng.random() < 0.2 else rng.randint(0, 500000),
+            "FIN": str(1000 + index),
+            "NAME": f"Synthetic Bank {index}",
+            "SAVR": INSURANCE_FUNDS[rng.randrange(len(INSURANCE_FUNDS))],
+            "CITYST": f"City {index % 997}, {state}",
+            "RESTYPE": RESOLUTIONS[rng.randrange(len(RESOLUTIONS))],
+            "PSTALP": state,
+            "QBFASSET": rng.randint(1000, 50000000),
+            "QBFDEP": rng.randint(1000, 40000000),
+            "RESTYPE1": TRANSACTION_TYPES[rng.randrange(len(TRANSACTION_TYPES))],
+            "FAILYR": str(year),
+        },
+        "score": 0,
+    }
+
+
+def generate_financials_record(index: int) -> Dict[str, Any]:
+    """
+    Generate the /api/financials record at the given index.
+
+    Parameters:
+        index (int): The position of the record in the endpoint.
+
+    Returns:
+        Dict[str, Any]: The record, with its properties in the 'data' field.
+    """
+    rng = random.Random(index)
+    year = 2023 - (index // 40000) % 30
+    quarter_end = ["0331", "0630", "0930", "1231"][index % 4]
+    asset = rng.randint(10000, 900000000)
+
+    return {
+        "data": {
+            "ID": f"{10000 + index // 4}_{year}{quarter_end}",
+            "CERT": 10000 + index // 4,
+            "REPDTE": f"{year}{quarter_end}",
+            "STALP": STATES[rng.randrange(len(STATES))],
+            "ASSET": asset,
+            "DEP": int(asset * rng.uniform(0.6, 0.9)),
+            "EQ": int(asset * rng.uniform(0.05, 0.15)),
+            "NETINC": rng.randint(-50000, 5000000),
+            "ROA": round(rng.uniform(-2, 3), 4),
+            "ROE": round(rng.uniform(-20, 30), 4),
+            "LNLSNET": int(asset * rng.uniform(0.4, 0.8)),
+            "NUMEMP": rng.randint(5, 20000),
+        },
+        "score": 0,
+    }
+
+
+def generate_records(
+    generator: Callable[[int], Dict], offset: int, limit: int, total: int
+) -> List[Dict]:
+    """
+    Generate one page of records.
+
+    Parameters:
+        generator (Callable[[int], Dict]): The record generator of the endpoint.
+        offset (int): The index of the first record of the page.
+        limit (int): The maximum number of records in the page.
+        total (int): The total number of records in the endpoint.
+
+    Returns:
+        List[Dict]: The records of the page.
+    """
+    return [generator(index) for index in range(offset, min(offset + limit, total))]
+
+
+def generate_failure_properties_yaml() -> str:
+    """
+    Generate a /docs/failure_properties.yaml document matching the failures records.
+
+    Returns:
+        str: The YAML document.
+    """
+    properties = {
+        prop["name"]: {
+            "type": YAML_TYPES.get(prop["type"], "string"),
+            "title": prop["title"],
+            "description": f"Synthetic {prop['title'].replace('_', ' ')} property.",
+        }
+        for prop in config.FAILURE_PROPERTY_TYPE_MAP
+    }
+
+    return yaml.safe_dump(
+        {"properties": {"data": {"type": "object", "properties": properties}}},
+        sort_keys=False,
+    )
@@ -1,10 +1,35 @@
 import os
-import requests
 import logging
-from data_transform import save_data
-from typing import List, Dict, Union, Optional, Mapping
-from file_ops import setup_directory, get_data_directory
+import config
+import http_cache
+import http_client
+import json
+import metrics
+import shutil
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from page_size import PageLimitError, PageSizeController, load_page_size, save_page_size
+from requests import Response
+from requests.exceptions import Timeout
+from typing import Deque, Iterator, List, Dict, Tuple, Union, Optional, Mapping
+from file_ops import (
+    clear_checkpoint,
+    get_checkpoint_partial_path,
+    get_data_directory,
+    load_checkpoint,
+    save_checkpoint,
+    setup_directory,
+)
 from urllib.parse import urlencode, urlunparse, urlparse
+from urllib3.exceptions import ReadTimeoutError
+
+
+class PaginationError(Exception):
+    """Exception raised when a page of a paginated endpoint cannot be downloaded."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
 
 
 def construct_url(
@@ -53,62 +78,146 @@ def construct_url(
     return full_url
 
 
+def get_retry_count(response: Response) -> int:
+    """
+    Get the number of times a request was retried before its final response.
+
+    Parameters:
+        response (Response): The final response.
+
+    Returns:
+        int: The number of retries recorded by the urllib3 retry policy.
+    """
+    retries = getattr(response.raw, "retries", None)
+
+    return len(retries.history) if retries is not None else 0
+
+
+def is_timeout(error: Exception) -> bool:
+    """
+    Check whether a request failed because the server did not respond in time.
+
+    Parameters:
+        error (Exception): The exception raised by the request.
+
+    Returns:
+        bool: True if the request, or its last retry, timed out.
+    """
+    if isinstance(error, Timeout):
+        return True
+    # Read timeouts that exhausted the retries surface as connection errors
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, ReadTimeoutError)
+
+
 def make_api_request(
-    url: str, params: Mapping[str, Union[str, int]]
+    url: str,
+    params: Mapping[str, Union[str, int]],
+    page_size: Optional[PageSizeController] = None,
 ) -> Union[None, Dict]:
     """
     Make an API request to the given URL with the specified parameters.
 
+    With config.PAGE_CACHE_ENABLED, successful responses are kept in the page
+    cache and reused until they expire. With config.REPLAY_FROM_CACHE, the
+    response comes from the page cache only and the API is never contacted.
+
     Parameters:
         url (str): The URL to which the API request will be sent.
         params (Dict[str, Union[str, int]]): The parameters for the API request.
+        page_size (Optional[PageSizeController]): The controller of the request's 'limit', told about its latency and size. # noqa E501
 
     Returns:
         Union[None, Dict]: The JSON response as a dictionary if the request is successful, otherwise None.
 
+    Raises:
+        PageLimitError: If a page size controller is given and the API rejected or timed out on the 'limit'.
+
     Logs:
         Various log messages indicating the status and any issues encountered.
     """
 
     try:
-        # Initial API request
-        response = requests.get(url, params=params)
+        if config.PAGE_CACHE_ENABLED or config.REPLAY_FROM_CACHE:
+            ttl = None if config.REPLAY_FROM_CACHE else config.PAGE_CACHE_TTL
+            body = http_cache.load_page(url, params, ttl)
+            if body is not None:
+                logging.debug(f"Loaded {url} {dict(params)} from the page cache")
+                return json.loads(body)
+            if config.REPLAY_FROM_CACHE:
+                logging.warning(f"{url} {dict(params)} is not in the page cache")
+                return None
+
+        # API request through the shared, pooled session
+        response = http_client.get(url, params=params)
+        # Rate limiter waits and retries are not part of the request's latency
+        seconds = time.perf_counter() - http_client.get_attempt_start()
+        metrics.observe_request(
+            urlparse(url).path,
+            seconds,
+            len(response.content),
+            get_retry_count(response),
+            response.status_code == 200,
+        )
 
         if response.status_code == 200:
-            return response.json()
+            data = response.json()
+            if page_size is not None:
+                page_size.observe(
+                    int(params["limit"]),
+                    seconds,
+                    len(response.content),
+                )
+            if config.PAGE_CACHE_ENABLED:
+                http_cache.store_page(url, params, response.content)
+            return data
 
         if response.status_code == 400 and "errors" in response.json():
             error_code = response.json()["errors"][0].get("code", "")
             if error_code == "validate:numericality":
-                logging.warning("Setting limit to 500 and retrying")
-                mutable_params = dict(params)
-                mutable_params["limit"] = str(500)
-                requests.get(url, params=mutable_params)
+                message = f"The API rejected limit={params.get('limit')} for {url}"
+                if page_size is not None:
+                    raise PageLimitError(message, int(params["limit"]))
+                logging.warning(message)
                 return None
 
         # Log warnings for other non-200 status codes
         logging.warning(
             f"Failed to download data with status code {response.status_code}"
         )
-        logging.warning(f"The error message is: {response.json()}")
+        logging.warning(f"The error message is: {response.text}")
         return None
 
+    except PageLimitError:
+        raise
+
     except Exception as e:
+        if page_size is not None and "limit" in params and is_timeout(e):
+            raise PageLimitError(
+                f"Timed out on limit={params['limit']} for {url}", int(params["limit"])
+            )
         # Log any other exceptions
         logging.error(f"An error occurred while downloading data from {url}: {e}")
         return None
 
 
-def download_files(urls: List[str], output_file_name: Optional[str] = None) -> None:
+def download_files(
+    urls: List[str], output_file_name: Optional[str] = None, use_cache: bool = True
+) -> bool:
     """
     Downloads files from a list of URLs and saves them to a specified folder.
 
+    When `use_cache` is set, the validators of previously downloaded files are
+    sent as If-None-Match/If-Modified-Since headers and a 304 Not Modified
+    response reuses the cached body instead of downloading it again.
+
     Parameters:
         urls (List[str]): List of URLs to download files from.
         output_file_name (str, optional): Custom file name for the downloaded files. If None, the file name is derived from the URL. # noqa E501
+        use_cache (bool, optional): Revalidate against the local HTTP cache. Default is True.
 
     Returns:
-        None
+        bool: True if every file was downloaded, otherwise False.
     """
 
     # Get data directory
@@ -116,6 +225,7 @@ def download_files(urls: List[str], output_file_name: Optional[str] = None) -> N
     # Use the setup_directory function to handle directory creation
     destination_dir = setup_directory(abs_data_dir)
 
+    success = True
     for url in urls:
         try:
             # Get the file name from the URL
@@ -125,17 +235,231 @@ def download_files(urls: List[str], output_file_name: Optional[str] = None) -> N
             destination_path = os.path.join(destination_dir, file_name)
 
             # Download and save the file
-            response = requests.get(url)
-            if response.status_code == 200:
-                with open(destination_path, "wb") as f:
-                    f.write(response.content)
-                logging.info(f"Successfully downloaded {file_name}")
-            else:
-                logging.warning(
-                    f"Failed to download {file_name} with status code {response.status_code}"
+            cached_body_path = http_cache.get_cached_body_path(url)
+            if config.REPLAY_FROM_CACHE:
+                if cached_body_path is None:
+                    logging.warning(f"{url} is not in the HTTP cache")
+                    success = False
+                else:
+                    shutil.copyfile(cached_body_path, destination_path)
+                    logging.info(f"Replayed {file_name} from the HTTP cache")
+                continue
+
+            headers = http_cache.get_conditional_headers(url) if use_cache else {}
+            size = 0
+            with http_client.get(url, headers=headers, stream=True) as response:
+                cached_body_path = http_cache.get_cached_body_path(url)
+                if response.status_code == 304 and cached_body_path:
+                    shutil.copyfile(cached_body_path, destination_path)
+                    logging.info(f"{file_name} not modified, reused cached copy")
+                elif response.status_code == 200:
+                    # iter_content decodes gzip/deflate/br transfer encoding
+                    # chunk by chunk, so the body is never held in memory whole
+                    with open(destination_path, "wb") as f:
+                        for chunk in response.iter_content(
+                            chunk_size=config.DOWNLOAD_CHUNK_SIZE
+                        ):
+                            f.write(chunk)
+                            size += len(chunk)
+                    if use_cache:
+                        http_cache.store_response(url, response, destination_path)
+                    logging.info(f"Successfully downloaded {file_name}")
+                else:
+                    logging.warning(
+                        f"Failed to download {file_name} with status code {response.status_code}"
+                    )
+                    success = False
+                metrics.observe_request(
+                    urlparse(url).path,
+                    time.perf_counter() - http_client.get_attempt_start(),
+                    size,
+                    get_retry_count(response),
+                    response.status_code in (200, 304),
                 )
         except Exception as e:
             logging.error(f"An error occurred while downloading {url}: {e}")
+            success = False
+
+    return success
+
+
+def _fetch_page(
+    url: str,
+    params: Mapping[str, Union[str, int]],
+    offset: int,
+    page_size: Optional[PageSizeController] = None,
+    max_attempts: int = config.PAGE_MAX_ATTEMPTS,
+) -> Union[None, Dict]:
+    """
+    Fetch a single page of a paginated endpoint.
+
+    A page that fails despite the HTTP retries of the session, e.g. on a dropped
+    connection or an invalid body, is attempted again after an exponential delay.
+
+    Parameters:
+        url (str): The URL of the paginated endpoint.
+        params (Mapping[str, Union[str, int]]): The parameters of the page request, including its 'limit'.
+        offset (int): The offset of the first record of the page.
+        page_size (Optional[PageSizeController]): The controller of the page's 'limit'.
+        max_attempts (int): The maximum number of attempts at the page.
+
+    Returns:
+        Union[None, Dict]: The JSON response as a dictionary if the request is successful, otherwise None.
+
+    Raises:
+        PageLimitError: If a page size controller is given and the API rejected or timed out on the 'limit'.
+    """
+    page_params = dict(params)
+    page_params["offset"] = str(offset)
+
+    for attempt in range(1, max_attempts + 1):
+        data = make_api_request(url, page_params, page_size)
+        if data and "data" in data:
+            return data
+        if config.REPLAY_FROM_CACHE:
+            # A page missing from the cache will not appear by trying again
+            break
+        if attempt < max_attempts:
+            delay = config.PAGE_RETRY_BACKOFF * 2 ** (attempt - 1)
+            logging.warning(
+                f"Page at offset {offset} of {url} failed (attempt {attempt}/{max_attempts}), retrying in {delay}s"
+            )
+            time.sleep(delay)
+
+    return None
+
+
+def _fetch_range(
+    url: str,
+    params: Mapping[str, Union[str, int]],
+    offset: int,
+    length: int,
+    page_size: PageSizeController,
+) -> Tuple[Optional[List[Dict]], Optional[int]]:
+    """
+    Fetch the records of a range of offsets, in pages sized by a controller.
+
+    A range is normally a single page. If the API rejects or times out on the
+    page size, the rest of the range is requested in smaller pages.
+
+    Parameters:
+        url (str): The URL of the paginated endpoint.
+        params (Mapping[str, Union[str, int]]): The parameters shared by every page request.
+        offset (int): The offset of the first record of the range.
+        length (int): The number of records in the range.
+        page_size (PageSizeController): The controller of the page size.
+
+    Returns:
+        Tuple[Optional[List[Dict]], Optional[int]]: The records of the range, or None if a page cannot be downloaded, and the total number of records reported by the API. # noqa E501
+    """
+    records: List[Dict] = []
+    total = None
+    position = offset
+
+    while position < offset + length:
+        limit = min(page_size.limit_at(position), offset + length - position)
+        page_params = dict(params)
+        page_params["limit"] = str(limit)
+        try:
+            data = _fetch_page(url, page_params, position, page_size)
+        except PageLimitError as e:
+            logging.warning(str(e))
+            # A page that was evicted from the cache is no longer held to its limit
+            page_size.schedule.pop(position, None)
+            if page_size.reject(e.limit):
+                continue
+            return None, total
+
+        if data is None:
+            return None, total
+
+        records.extend(data["data"])
+        total = data.get("meta", {}).get("total", total)
+        if len(data["data"]) < limit:
+            break
+        position += limit
+
+    return records, total
+
+
+def _iter_pages(
+    url: str,
+    params: Mapping[str, Union[str, int]],
+    page_size: PageSizeController,
+    max_workers: int,
+    start_offset: int = 0,
+) -> Iterator[Tuple[int, int, List[Dict], Optional[int]]]:
+    """
+    Yield the records of a paginated endpoint page by page, in offset order.
+
+    The first page is requested on its own to learn the total number of records
+    from `meta.total`. The remaining offsets are then requested concurrently with
+    at most `max_workers` pages in flight, so only a bounded number of pages is
+    held in memory. If the API does not report a total, pages are requested one
+    after another until a short page is returned. Each page is sized by the page
+    size controller when it is scheduled.
+
+    Parameters:
+        url (str): The URL of the paginated endpoint.
+        params (Mapping[str, Union[str, int]]): The parameters shared by every page request.
+        page_size (PageSizeController): The controller of the page size.
+        max_workers (int): The maximum number of pages requested concurrently.
+        start_offset (int): The offset of the first page, e.g. when resuming a download.
+
+    Yields:
+        Tuple[int, int, List[Dict], Optional[int]]: The offsets the page starts at and ends before, its records and the total number of records. # noqa E501
+
+    Raises:
+        PaginationError: If a page cannot be downloaded.
+    """
+    length = page_size.limit_at(start_offset)
+    records, total = _fetch_range(url, params, start_offset, length, page_size)
+
+    # Check if data is returned
+    if records is None:
+        raise PaginationError(f"Failed to download {url} at offset {start_offset}")
+    yield start_offset, start_offset + length, records, total
+
+    if total is None:
+        # Fall back to sequential paging until a short page is returned
+        offset = start_offset + length
+        while len(records) == length:
+            length = page_size.limit_at(offset)
+            records, _ = _fetch_range(url, params, offset, length, page_size)
+            if records is None:
+                raise PaginationError(f"Failed to download {url} at offset {offset}")
+            yield offset, offset + length, records, total
+            offset += length
+        return
+
+    max_workers = max(1, max_workers)
+    next_offset = start_offset + length
+
+    def submit(executor: ThreadPoolExecutor) -> Tuple[int, int, Future]:
+        nonlocal next_offset
+        offset = next_offset
+        length = page_size.limit_at(offset)
+        next_offset += length
+        future = executor.submit(_fetch_range, url, params, offset, length, page_size)
+        return offset, offset + length, future
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Keep a sliding window of in-flight pages and consume them in order
+        pending: Deque[Tuple[int, int, Future]] = deque()
+        while next_offset < int(total) and len(pending) < max_workers:
+            pending.append(submit(executor))
+
+        while pending:
+            offset, end, future = pending.popleft()
+            records, _ = future.result()
+            if records is None:
+                for _, _, remaining in pending:
+                    remaining.cancel()
+                raise PaginationError(f"Failed to download {url} at offset {offset}")
+
+            if next_offset < int(total):
+                pending.append(submit(executor))
+            yield offset, end, records, total
 
 
 def download_files_with_pagination(
@@ -144,58 +468,173 @@ def download_files_with_pagination(
     params: Dict[str, str],
     limit: int = 10000,
     output_format: str = "json",
-) -> None:
-    offset: int = 0
-    all_data: list = []
-    params["limit"] = str(limit)
+    max_workers: int = config.PAGINATION_MAX_WORKERS,
+    merge_existing: bool = False,
+    resumable: bool = config.RESUMABLE_PAGINATION,
+    adaptive: bool = config.ADAPTIVE_PAGE_SIZE,
+) -> bool:
     """
     Download data from an API with pagination support.
 
+    Pages are fetched concurrently and streamed to the output file as they
+    arrive, so memory stays bounded to a few pages regardless of endpoint size.
+    With the "csv" output format each page is flattened straight into the CSV
+    file, skipping the intermediate JSON file and the transform stage; the
+    download fails if a later page has properties the first page did not.
+
+    With an adaptive page size, pages start at the size remembered from the
+    endpoint's previous download, or `limit`, and are tuned from their latency,
+    size and rejected limits (see PageSizeController). With
+    config.PAGE_CACHE_ENABLED, pages still in the page cache are requested with
+    the limit they were cached with instead; with config.REPLAY_FROM_CACHE,
+    every page is.
+
+    The output file is only published once every page is downloaded. When the
+    download is resumable, the partial output is kept in the state directory
+    with a checkpoint after every page, and an interrupted download of the same
+    request resumes after its last checkpointed page. A resumed download starts
+    over if the endpoint's total number of records has changed since.
+
     Parameters:
         base_url (str): The base URL for the API.
         endpoint (str): The specific API endpoint for the data.
         params (Dict[str, str]): Parameters to pass in the API request.
         limit (int, optional): The maximum number of records per request. Default is 10,000.
-        output_format (str, optional): The format for the saved data file. Default is "json".
+        output_format (str, optional): The format for the saved data file, "json" or "csv". Default is "json".
+        max_workers (int, optional): The maximum number of pages requested concurrently. Default is config.PAGINATION_MAX_WORKERS. # noqa E501
+        merge_existing (bool, optional): Merge the records into an existing CSV file instead of replacing it. Default is False. # noqa E501
+        resumable (bool, optional): Checkpoint the download so that it can be resumed. Default is config.RESUMABLE_PAGINATION. # noqa E501
+        adaptive (bool, optional): Tune the page size. Default is config.ADAPTIVE_PAGE_SIZE.
 
     Returns:
-        None: The function saves the downloaded data to a file and logs the success.
+        bool: True if every page was downloaded, False if the download stopped early.
     """
-    offset = 0
-    all_data = []
-    params["limit"] = str(limit)
+    # The writers import pandas, which file downloads do not need
+    from data_transform import CsvHeaderError, open_data_writer
+
+    params = {key: value for key, value in params.items() if key != "limit"}
+    url = construct_url(base_url, endpoint)
+    if config.REPLAY_FROM_CACHE:
+        # Cached pages are keyed by their limit, so they are requested exactly
+        # as they were cached, without tuning the page size
+        schedule = http_cache.load_page_limits(url, params)
+        page_size = PageSizeController(
+            schedule.get(0) or load_page_size(endpoint) or limit,
+            adaptive=False,
+            schedule=schedule,
+        )
+        adaptive = False
+    else:
+        # Pages still in the cache are requested with the limits they were
+        # cached with, so they are hit whatever the page size is tuned to
+        page_size = PageSizeController(
+            (load_page_size(endpoint) or limit) if adaptive else limit,
+            adaptive=adaptive,
+            schedule=(
+                http_cache.load_page_limits(url, params, config.PAGE_CACHE_TTL)
+                if config.PAGE_CACHE_ENABLED
+                else None
+            ),
+        )
 
     # get data directory
     abs_data_dir = get_data_directory()
     # Setup destination directory and path
     destination_dir = setup_directory(abs_data_dir)
     file_name = params.get("filename", "default_file_name")
-    destination_path = os.path.join(destination_dir, f"{file_name}.{output_format}")
-
-    while True:
-        # Update the offset for pagination
-        params["offset"] = str(offset)
+    output_name = f"{file_name}.{output_format}"
+    destination_path = os.path.join(destination_dir, output_name)
 
-        # Construct the URL and make the API request
-        url = construct_url(base_url, endpoint)
-        data = make_api_request(url, params)
-
-        # Check if data is returned and if it contains the "data" key
-        if not data or "data" not in data:
-            break
-
-        # Add the new data to the list
-        all_data.extend(data["data"])
+    # Look for a checkpoint of this exact request
+    checkpoint_key = (
+        f"{http_cache.get_page_key(url, params)}:{output_format}:{merge_existing}"
+    )
+    checkpoint = load_checkpoint(output_name, checkpoint_key) if resumable else None
+    partial_path = get_checkpoint_partial_path(output_name) if resumable else None
+    start_offset = checkpoint["offset"] if checkpoint else 0
+    if checkpoint:
+        logging.info(
+            f"Resuming {file_name} at offset {start_offset} with {checkpoint['writer']['record_count']} records"
+        )
 
-        # Check if this is the last page of data
-        if len(data["data"]) < limit:
-            break
+    # Stream every page to the output file
+    writer = open_data_writer(
+        destination_path,
+        output_format,
+        merge_existing,
+        partial_path,
+        checkpoint["writer"] if checkpoint else None,
+    )
+    try:
+        for offset, end, records, total in _iter_pages(
+            url, params, page_size, max_workers, start_offset
+        ):
+            if checkpoint and offset == start_offset and total != checkpoint["total"]:
+                logging.warning(
+                    f"{file_name} total changed from {checkpoint['total']} to {total}, restarting the download"
+                )
+                writer.abort()
+                clear_checkpoint(output_name)
+                return download_files_with_pagination(
+                    base_url,
+                    endpoint,
+                    params,
+                    limit,
+                    output_format,
+                    max_workers,
+                    merge_existing,
+                    resumable,
+                    adaptive,
+                )
 
-        # Update the offset for the next page
-        offset += limit
+            writer.write_records(records)
+            if resumable:
+                save_checkpoint(
+                    output_name,
+                    {
+                        "key": checkpoint_key,
+                        "offset": end,
+                        "total": total,
+                        "writer": writer.checkpoint(),
+                    },
+                )
+    except CsvHeaderError as e:
+        # Resuming would fail on the same page
+        writer.abort()
+        if resumable:
+            clear_checkpoint(output_name)
+        else:
+            os.remove(writer.partial_path)
+        logging.error(f"{e}; collect {file_name} without FUSED_PIPELINE")
+        return False
+    except PaginationError as e:
+        writer.abort()
+        if resumable:
+            logging.error(
+                f"{e}; kept {writer.record_count} records of {file_name} to resume from"
+            )
+        else:
+            os.remove(writer.partial_path)
+            logging.error(
+                f"{e}; discarded {writer.record_count} records of {file_name}"
+            )
+        return False
+    finally:
+        metrics.add_rows(
+            "collection",
+            os.path.basename(destination_path),
+            writer.record_count,
+            writer.record_count,
+        )
+        if adaptive:
+            save_page_size(endpoint, page_size.best or page_size.limit)
 
-    # Save the collected data
-    save_data(all_data, destination_path, output_format)
+    writer.close()
+    if resumable:
+        clear_checkpoint(output_name)
 
     # Log the success
-    logging.info(f"Successfully downloaded all data to {file_name}")
+    logging.info(
+        f"Successfully downloaded {writer.record_count} records to {file_name}"
+    )
+    return True
@@ -0,0 +1,272 @@
+import config
+import csv
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import re
+from file_ops import get_file_hash, get_state_directory, open_data_file, setup_directory
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Dates as the API writes them (M/D/YYYY) and as ISO 8601 dates or datetimes
+US_DATE_PATTERN = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})$")
+ISO_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T].*)?$")
+
+# Number of rows read from a CSV file at a time
+CHUNK_ROWS = 50000
+
+
+class HyperLogLog:
+    """
+    Estimate the number of distinct values of a stream in fixed memory.
+
+    Parameters:
+        precision (int): The number of index bits; the sketch keeps 2 ** precision one-byte registers.
+
+    Example:
+    >>> sketch = HyperLogLog(12)
+    >>> sketch.update(["a", "b", "a"])
+    >>> sketch.count()
+    2
+    """
+
+    def __init__(self, precision: int = config.COLUMN_STATS_PRECISION) -> None:
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def update(self, values: Iterable[str]) -> None:
+        """
+        Add values to the sketch.
+
+        Parameters:
+            values (Iterable[str]): The values to add.
+        """
+        rank_bits = 64 - self.precision
+        rank_mask = (1 << rank_bits) - 1
+        registers = self.registers
+        for value in values:
+            hashed = int.from_bytes(
+                hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+            )
+            index = hashed >> rank_bits
+            rank = rank_bits - (hashed & rank_mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def count(self) -> int:
+        """
+        Estimate the number of distinct values added to the sketch.
+
+        Returns:
+            int: The estimated number of distinct values.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-rank for rank in self.registers)
+
+        # Linear counting is more accurate while many registers are empty
+        empty = self.registers.count(0)
+        if estimate <= 2.5 * m and empty:
+            estimate = m * math.log(m / empty)
+
+        return round(estimate)
+
+
+def parse_date(value: str) -> Optional[str]:
+    """
+    Parse a date value of a CSV file.
+
+    Parameters:
+        value (str): The value (e.g., '2/9/2023' or '2023-02-09').
+
+    Returns:
+        Optional[str]: The date formatted as YYYY-MM-DD, or None if the value is not a date.
+    """
+    match = US_DATE_PATTERN.match(value)
+    if match:
+        month, day, year = match.groups()
+        return f"{year}-{int(month):02d}-{int(day):02d}"
+    if ISO_DATE_PATTERN.match(value):
+        return value[:10]
+    return None
+
+
+def merge_range(
+    value_range: Optional[Tuple[Any, Any]], values: List[Any]
+) -> Tuple[Any, Any]:
+    """Widen a (minimum, maximum) range to include values."""
+    low, high = min(values), max(values)
+    if value_range is None:
+        return (low, high)
+    return (min(value_range[0], low), max(value_range[1], high))
+
+
+class ColumnStatistics:
+    """
+    Accumulate the statistics of a CSV column, one chunk of values at a time.
+
+    Empty values are nulls. The column's type narrows as values arrive, from
+    integer to numeric to string, or from datetime to string, and its minimum
+    and maximum are compared as that type. Each chunk is reduced to its
+    distinct values first, so a repeated value is parsed and hashed once per
+    chunk.
+
+    Parameters:
+        precision (int): The precision of the distinct count estimate.
+    """
+
+    def __init__(self, precision: int = config.COLUMN_STATS_PRECISION) -> None:
+        self.nulls = 0
+        self.distinct = HyperLogLog(precision)
+        self.numeric = True
+        self.integer = True
+        self.dates = True
+        self.number_range: Optional[Tuple[float, float]] = None
+        self.date_range: Optional[Tuple[str, str]] = None
+        self.string_range: Optional[Tuple[str, str]] = None
+
+    def update(self, values: Sequence[str]) -> None:
+        """
+        Add a chunk of values of the column.
+
+        Parameters:
+            values (Sequence[str]): The values, as read from the CSV file.
+        """
+        self.nulls += values.count("")
+        unique_values = list(set(values) - {""})
+        if not unique_values:
+            return
+
+        self.distinct.update(unique_values)
+        self.string_range = merge_range(self.string_range, unique_values)
+
+        if self.numeric:
+            try:
+                numbers = [float(value) for value in unique_values]
+            except ValueError:
+                numbers = []
+            if numbers and all(math.isfinite(number) for number in numbers):
+                self.integer = self.integer and all(
+                    number.is_integer() for number in numbers
+                )
+                self.number_range = merge_range(self.number_range, numbers)
+            else:
+                self.numeric = False
+                # Numbers of earlier chunks are not dates either
+                self.dates = self.dates and self.number_range is None
+
+        if self.dates and not self.numeric:
+            dates = [parse_date(value) for value in unique_values]
+            if all(dates):
+                self.date_range = merge_range(self.date_range, dates)
+            else:
+                self.dates = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the column.
+
+        Returns:
+            Dict[str, Any]: The column's type, null count, distinct count estimate, minimum and maximum.
+        """
+        value_range: Optional[Tuple[Any, Any]]
+        if self.string_range is None:
+            column_type, value_range = "string", None
+        elif self.numeric and self.number_range is not None:
+            column_type, value_range = "numeric", self.number_range
+            if self.integer:
+                column_type = "integer"
+                value_range = (int(value_range[0]), int(value_range[1]))
+        elif self.dates:
+            column_type, value_range = "datetime", self.date_range
+        else:
+            column_type, value_range = "string", self.string_range
+
+        return {
+            "type": column_type,
+            "nulls": self.nulls,
+            "distinct": self.distinct.count(),
+            "min": value_range[0] if value_range else None,
+            "max": value_range[1] if value_range else None,
+        }
+
+
+def scan_csv_statistics(
+    file_path: str, compression: Optional[str] = None, chunk_rows: int = CHUNK_ROWS
+) -> Dict[str, Any]:
+    """
+    Compute the statistics of every column of a CSV file in a single streaming pass.
+
+    The file is read `chunk_rows` rows at a time, so only one chunk is held in
+    memory whatever the size of the file.
+
+    Parameters:
+        file_path (str): The full path of the CSV file.
+        compression (Optional[str]): The compression of the file, "gzip" or "zstd", or None.
+        chunk_rows (int): The number of rows read at a time.
+
+    Returns:
+        Dict[str, Any]: The number of 'rows' and the statistics of each of the 'columns', keyed by column name.
+    """
+    with open_data_file(file_path, compression) as raw_file:
+        reader = csv.reader(io.TextIOWrapper(raw_file, encoding="utf-8", newline=""))
+        header = next(reader, [])
+        columns = [ColumnStatistics() for _ in header]
+        width = len(header)
+
+        rows = 0
+        while True:
+            chunk = list(islice(reader, chunk_rows))
+            if not chunk:
+                break
+            rows += len(chunk)
+            # Short rows are padded with nulls, extra values are ignored
+            chunk = [
+                row if len(row) >= width else row + [""] * (width - len(row))
+                for row in chunk
+            ]
+            for column, values in zip(columns, zip(*chunk)):
+                column.update(values)
+
+    return {
+        "rows": rows,
+        "columns": {name: column.to_dict() for name, column in zip(header, columns)},
+    }
+
+
+def get_column_statistics(
+    file_path: str, compression: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Get the column statistics of a CSV file, scanning it only if its content changed.
+
+    Statistics are cached in the state directory by the file's content hash.
+
+    Parameters:
+        file_path (str): The full path of the CSV file.
+        compression (Optional[str]): The compression of the file, "gzip" or "zstd", or None.
+
+    Returns:
+        Dict[str, Any]: The number of 'rows' and the statistics of each of the 'columns', keyed by column name.
+    """
+    stats_dir = setup_directory(
+        os.path.join(get_state_directory(), config.COLUMN_STATS_DIR)
+    )
+    stats_path = os.path.join(stats_dir, f"{get_file_hash(file_path)}.json")
+
+    if os.path.exists(stats_path):
+        logging.info(f"{os.path.basename(file_path)} unchanged, skipped scanning")
+        with open(stats_path, "r") as f:
+            return json.load(f)
+
+    statistics = scan_csv_statistics(file_path, compression)
+
+    with open(f"{stats_path}.tmp", "w") as f:
+        json.dump(statistics, f)
+    os.replace(f"{stats_path}.tmp", stats_path)
+
+    logging.info(f"Scanned {statistics['rows']} rows of {os.path.basename(file_path)}")
+    return statistics
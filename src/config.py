@@ -1,8 +1,55 @@
+import os
+from typing import List
+
 # This could be "INFO", "DEBUG", "WARNING", "ERROR", or "CRITICAL"
 LOGGING_LEVEL = "INFO"
 
 DATA_DIR = "../data"
+# Pipeline state kept between runs (watermarks, caches); never published
+STATE_DIR = "../.pipeline"
+WATERMARKS_FILE = "watermarks.json"
+# Datasets whose collected file only holds the records since their watermark,
+# to merge into the existing output by the transform stage, in STATE_DIR
+PENDING_MERGES_FILE = "pending_merges.json"
+# Paginated downloads save a checkpoint after every page, in STATE_DIR, so an
+# interrupted download resumes where it stopped. Checkpoints older than
+# CHECKPOINT_MAX_AGE seconds are discarded, as the records may have moved.
+RESUMABLE_PAGINATION = True
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_MAX_AGE = 24 * 60 * 60
+# Fetch only records newer than the stored watermark and merge them into the
+# existing dataset instead of cleaning the data directory and re-downloading
+INCREMENTAL_SYNC = False
+# Columns identifying a record of each dataset, by dataset name, used when
+# merging new records into the existing output. The API's ID is used instead
+# when both sides have it; other datasets compare whole rows.
+DATASET_KEYS = {
+    "bank_failures": ["CERT"],
+    "financials": ["CERT", "REPDTE"],
+}
+# Conditional-GET cache of downloaded files and their parsed results, in STATE_DIR
+HTTP_CACHE_DIR = "http_cache"
+# Raw API pages cached by a hash of their URL and parameters, in STATE_DIR.
+# Pages older than PAGE_CACHE_TTL seconds are fetched again and the least
+# recently used pages are evicted above PAGE_CACHE_MAX_BYTES. Cached pages are
+# requested again with the limits they were cached with, whatever the page size.
+PAGE_CACHE_ENABLED = False
+PAGE_CACHE_DIR = "page_cache"
+PAGE_CACHE_MAX_BYTES = 2 * 1024**3
+PAGE_CACHE_TTL = 24 * 60 * 60
+# Serve every request from the page and HTTP caches without contacting the
+# API, regardless of age, e.g. to re-run the transform stage offline. Pages
+# are requested with the limits they were cached with, and a page missing from
+# the cache fails the download without retrying.
+REPLAY_FROM_CACHE = False
+# Run report (JSON) and Prometheus textfile of the last run, in STATE_DIR
+RUN_REPORT_FILE = "run_report.json"
+METRICS_TEXTFILE = "fdic_pipeline.prom"
+# Upper bounds of the page request latency histogram, in seconds
+REQUEST_LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
 METADATA_FILE = "./dataset-metadata.json"
+# A resource may set "compression" to "gzip" or "zstd" (zstd requires the
+# optional zstandard package) to publish it as <path>.gz or <path>.zst.
 KAGGLE_METADATA = {
     "title": "FDIC Data for U.S. Bank Institutions and Failures",
     "subtitle": "This data set contains the fdic public data on fdic institutions.",
@@ -25,8 +72,114 @@ KAGGLE_METADATA = {
     ],
 }
 
+# Manifest of the content hash and row count of every published resource and
+# of the collected files they were transformed from, in STATE_DIR. With
+# SKIP_UNCHANGED, a full collection keeps the published files of the previous
+# run, and the transformations of unchanged inputs and the metadata generation
+# of an unchanged dataset are skipped.
+MANIFEST_FILE = "manifest.json"
+SKIP_UNCHANGED = True
+
+# Per-column statistics of every CSV resource in the Kaggle metadata, cached
+# by content hash in this directory of STATE_DIR. Distinct counts are estimated
+# with 2 ** COLUMN_STATS_PRECISION registers (about 1.6% error at 12).
+COLUMN_STATS_DIR = "column_stats"
+COLUMN_STATS_PRECISION = 12
+
+# Optional SQLite database of every CSV resource, one table per dataset, for
+# point lookups and joins by CERT. Tables are reloaded when their file changed,
+# in batches of SQLITE_BATCH_ROWS rows, and SQLITE_INDEX_COLUMNS are indexed.
+# The database is kept outside of the published data directory.
+SQLITE_STORE = False
+SQLITE_DB_PATH = "../fdic.sqlite"
+SQLITE_BATCH_ROWS = 10000
+SQLITE_INDEX_COLUMNS = ["CERT", "FAILDATE", "REPDTE", "STALP"]
+
+# Write paginated pages straight to CSV as they arrive instead of saving JSON
+# and converting it in the transform stage
+FUSED_PIPELINE = False
+
+# Stream JSON files through the transform stage in chunks of this many records
+# instead of loading them whole; 0 disables streaming
+TRANSFORM_CHUNK_ROWS = 0
+# Number of processes transforming independent files at the same time; 1 runs
+# the transform stage in the main process
+TRANSFORM_MAX_WORKERS = os.cpu_count() or 1
+
+# Typed columnar copies written next to every CSV output: "parquet" and/or
+# "arrow" (Arrow IPC). Requires the optional pyarrow dependency.
+COLUMNAR_OUTPUT_FORMATS: List[str] = []
+# Definitions file used to type the columns of each dataset, by dataset name
+DATASET_DEFINITIONS = {"bank_failures": "failure_properties.csv"}
+# Partitioned copies of large datasets, by dataset name: the date column to
+# partition on and its "year" or "quarter". Partitions are CSV files in a
+# Hive-style layout (e.g., bank_failures/year=2023/data.csv) with an
+# _index.json per dataset, in PARTITION_DIR next to (not in) the published data
+# directory. Only the partitions whose content changed are rewritten, by
+# PARTITION_MAX_WORKERS threads.
+PARTITIONED_OUTPUT = False
+PARTITION_DIR = "../partitions"
+PARTITIONED_DATASETS = {
+    "bank_failures": {"column": "FAILDATE", "granularity": "year"},
+    "financials": {"column": "REPDTE", "granularity": "quarter"},
+}
+PARTITION_MAX_WORKERS = 4
+# Build DataFrames with compact dtypes from the dataset's column types:
+# categoricals for CATEGORICAL_COLUMNS, downcast nullable integers, datetimes,
+# and decimals as integers scaled by at most DECIMAL_MAX_SCALE digits
+TYPED_TRANSFORM = False
+CATEGORICAL_COLUMNS = ["CHCLASS1", "PSTALP", "RESTYPE", "RESTYPE1", "SAVR"]
+DECIMAL_MAX_SCALE = 4
+# Typed runs write dates to CSV in the API's M/D/YYYY format, like other runs;
+# True writes ISO 8601 dates (YYYY-MM-DD) instead, which changes the format of
+# the published date columns
+TYPED_CSV_ISO_DATES = False
+
 FDIC_URL = "https://banks.data.fdic.gov"
 
+# Number of endpoint pipelines collected at the same time
+PIPELINE_MAX_CONCURRENCY = 3
+# Size of the chunks streamed to disk when downloading files, in bytes
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Number of pages requested concurrently once the total record count is known
+PAGINATION_MAX_WORKERS = 4
+
+# Shared HTTP session: keep-alive pool size, per-request timeout (seconds) and
+# exponential backoff with jitter for 429/5xx responses
+HTTP_POOL_SIZE = PIPELINE_MAX_CONCURRENCY * PAGINATION_MAX_WORKERS
+HTTP_TIMEOUT = 60
+HTTP_MAX_RETRIES = 5
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_BACKOFF_MAX = 30
+HTTP_BACKOFF_JITTER = 0.5
+# Token bucket shared by every API request and retry: at most HTTP_RATE_LIMIT
+# requests per second on average, in bursts of up to HTTP_RATE_BURST; 0
+# disables the limit. A 429 response pauses every request for its Retry-After,
+# or HTTP_THROTTLE_PAUSE seconds without one.
+HTTP_RATE_LIMIT = 10
+HTTP_RATE_BURST = 20
+HTTP_THROTTLE_PAUSE = 5
+# Attempts at a page that failed despite the HTTP retries, e.g. on a dropped
+# connection, and the base of the exponential delay between them, in seconds
+PAGE_MAX_ATTEMPTS = 3
+PAGE_RETRY_BACKOFF = 5
+# Adaptive page size: the limit of each endpoint grows by PAGE_SIZE_STEP after
+# a page within PAGE_TARGET_LATENCY seconds and PAGE_MAX_BYTES, and is
+# multiplied by PAGE_SIZE_DECREASE after a slow or large page, a timeout or a
+# rejected limit, which also caps the limit below the failed value until
+# PAGE_SIZE_PROBE_AFTER pages in a row succeed within the targets. The last
+# limit of each endpoint is remembered in STATE_DIR.
+ADAPTIVE_PAGE_SIZE = True
+PAGE_SIZE_MIN = 100
+PAGE_SIZE_MAX = 10000
+PAGE_SIZE_STEP = 1000
+PAGE_SIZE_DECREASE = 0.5
+PAGE_SIZE_PROBE_AFTER = 10
+PAGE_TARGET_LATENCY = 20
+PAGE_MAX_BYTES = 64 * 1024 * 1024
+PAGE_SIZES_FILE = "page_sizes.json"
+
 FAILURES_ENDPOINT = "/api/failures"
 FAILURES_PARAMS = {
     "sort_by": "FAILDATE",
@@ -84,59 +237,115 @@ SUMMERY_PARAMS = {
 
 FAILURE_PROPERTY_TYPE_MAP = [
     {
+        "name": "CERT",
         "title": "cert",
         "type": "numeric",
     },
     {
+        "name": "CHCLASS1",
         "title": "charter_class",
         "type": "string",
     },
     {
+        "name": "FAILDATE",
         "title": "effective_date",
         "type": "datetime",
     },
     {
+        "name": "COST",
         "title": "estimated_loss",
         "type": "decimal",
     },
     {
+        "name": "FIN",
         "title": "fin",
         "type": "integer",
     },
     {
+        "name": "NAME",
         "title": "institution_name",
         "type": "string",
     },
     {
+        "name": "SAVR",
         "title": "insurance_fund",
         "type": "string",
     },
     {
+        "name": "CITYST",
         "title": "location",
         "type": "string",
     },
     {
+        "name": "RESTYPE",
         "title": "resolution",
         "type": "string",
     },
     {
+        "name": "PSTALP",
         "title": "state",
         "type": "province",
     },
     {
+        "name": "QBFASSET",
         "title": "total_assets",
         "type": "decimal",
     },
     {
+        "name": "QBFDEP",
         "title": "total_deposits",
         "type": "decimal",
     },
     {
+        "name": "RESTYPE1",
         "title": "transaction_type",
         "type": "string",
     },
     {
+        "name": "FAILYR",
         "title": "year",
         "type": "integer",
     },
 ]
+
+# Column projection sent to the API as the `fields` parameter, so only the
+# properties described by the definitions come over the wire
+FAILURES_FIELDS = [prop["name"] for prop in FAILURE_PROPERTY_TYPE_MAP]
+
+# Collection pipelines by name: the endpoint, its parameters and optionally the
+# incremental "watermark" field and the "fields" projection. Only
+# ENABLED_PIPELINES run by default; enabling another one also requires declaring
+# its outputs in KAGGLE_METADATA["resources"].
+PIPELINE_CONFIGS = {
+    "failures": {
+        "endpoint": FAILURES_ENDPOINT,
+        "params": FAILURES_PARAMS,
+        "watermark": "FAILDATE",
+        "fields": FAILURES_FIELDS,
+    },
+    "failure_definitions": {
+        "endpoint": FAILURES_DEFINITION_ENDPOINT,
+        "params": {},
+    },
+    "locations": {
+        "endpoint": LOCATIONS_ENDPOINT,
+        "params": LOCATIONS_PARAMS,
+    },
+    "institutions": {
+        "endpoint": INSTITUTIONS_ENDPOINT,
+        "params": INSTITUTIONS_PARAMS,
+    },
+    "financials": {
+        "endpoint": FINANCIALS_ENDPOINT,
+        "params": FINANCIALS_PARAMS,
+    },
+    "sod": {
+        "endpoint": SOD_ENDPOINT,
+        "params": SOD_PARAMS,
+    },
+    "summary": {
+        "endpoint": SUMMARY_ENDPOINT,
+        "params": SUMMERY_PARAMS,
+    },
+}
+ENABLED_PIPELINES = ["failures", "failure_definitions"]
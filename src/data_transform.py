@@ -1,111 +1,694 @@
+import io
+import config
+import hashlib
 import json
 import yaml
 import logging
 import os
 import pandas as pd
-from typing import List, Dict
+import shutil
+from column_stats import parse_date
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from file_ops import get_file_hash, import_optional_dependency
+from http_cache import load_parsed, store_parsed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
 
+# pandas dtypes of the definition file and FAILURE_PROPERTY_TYPE_MAP types
+PANDAS_DTYPES = {
+    "string": "string",
+    "province": "string",
+    "number": "Float64",
+    "numeric": "Float64",
+    "decimal": "Float64",
+    "integer": "Int64",
+    "datetime": "datetime64[ns]",
+    "date": "datetime64[ns]",
+}
 
-def save_data(
-    data: List[Dict], destination_path: str, output_format: str = "json"
-) -> None:
+# Nullable integer dtypes from the smallest, with their value ranges
+INTEGER_DTYPES = [
+    ("Int8", -(2**7), 2**7 - 1),
+    ("Int16", -(2**15), 2**15 - 1),
+    ("Int32", -(2**31), 2**31 - 1),
+    ("Int64", -(2**63), 2**63 - 1),
+]
+
+
+class CsvHeaderError(Exception):
+    """Exception raised when records have properties missing from the header of a CSV file being written."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+
+
+class JsonArrayWriter:
+    """
+    Write records to a JSON array file incrementally, one page at a time.
+
+    The file is a regular JSON array, so it can be read back with json.load, but
+    only the page currently being written is held in memory. Each record is
+    written on its own line. Records go to a partial file that replaces the
+    destination when the writer is closed; a writer resumed from a checkpoint
+    continues the partial file where the checkpoint was taken.
+
+    Example:
+    >>> with JsonArrayWriter("/tmp/data.json") as writer:
+    ...     writer.write_records([{"data": {"CERT": 1}}])
+    """
+
+    def __init__(
+        self,
+        destination_path: str,
+        partial_path: Optional[str] = None,
+        resume: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.destination_path = destination_path
+        self.record_count = 0
+        self.partial_path = partial_path or f"{destination_path}.partial"
+        if resume:
+            self._file: TextIO = open_for_resume(self.partial_path, resume["bytes"])
+            self.record_count = resume["record_count"]
+        else:
+            self._file = open(self.partial_path, "w")
+            self._file.write("[")
+
+    def write_records(self, records: Iterable[Dict]) -> None:
+        """
+        Append records to the JSON array.
+
+        Parameters:
+            records (Iterable[Dict]): The records to append.
+        """
+        for record in records:
+            self._file.write(",\n" if self.record_count else "\n")
+            json.dump(record, self._file)
+            self.record_count += 1
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Flush the records written so far and describe the partial file.
+
+        Returns:
+            Dict[str, Any]: The state to resume the writer from.
+        """
+        self._file.flush()
+        return {"bytes": self._file.tell(), "record_count": self.record_count}
+
+    def abort(self) -> None:
+        """Close the partial file without publishing it to the destination path."""
+        self._file.close()
+
+    def close(self) -> None:
+        """Close the JSON array and move it to the destination path."""
+        if not self._file.closed:
+            self._file.write("\n]\n" if self.record_count else "]\n")
+            self._file.close()
+            shutil.move(self.partial_path, self.destination_path)
+
+    def __enter__(self) -> "JsonArrayWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def flatten_fdic_records(
+    records: Iterable[Dict],
+    columns: Optional[List[str]] = None,
+    dtype: Optional[str] = None,
+    column_types: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
     """
-    Save a list of dictionaries to a file in the specified format.
+    Flatten FDIC API records into a DataFrame.
+
+    FDIC API records wrap a flat dictionary of properties in their 'data' field,
+    so the table is built directly from one list per column instead of walking
+    every nested key of every record like pd.json_normalize does.
+
+    Parameters:
+        records (Iterable[Dict]): The API records, each with its properties in the 'data' field.
+        columns (Optional[List[str]]): The properties to extract. Defaults to every property, in first-seen order.
+        dtype (Optional[str]): The dtype of every column. Defaults to the dtypes pandas infers.
+        column_types (Optional[Dict[str, str]]): Build the columns with the compact dtypes of these declared types instead (see build_typed_frame). # noqa E501
+
+    Returns:
+        DataFrame: One row per record and one column per property.
+    """
+    data_field = [item["data"] for item in records if "data" in item]
+
+    if columns is None:
+        columns = list(dict.fromkeys(chain.from_iterable(data_field)))
+
+    values = {column: [row.get(column) for row in data_field] for column in columns}
+    if column_types is not None:
+        return build_typed_frame(values, column_types)
+
+    return pd.DataFrame(values, columns=columns, dtype=dtype)
+
+
+def normalize_key_value(value: str) -> str:
+    """
+    Normalize a CSV value so that the formats written by the transformations compare equal.
+
+    Numbers are compared by value (e.g., '254766.0' and '254766') and dates as
+    YYYY-MM-DD (e.g., '2/9/2023' and '2023-02-09').
+
+    Parameters:
+        value (str): The value, as read from a CSV file.
+
+    Returns:
+        str: The normalized value.
+    """
+    date = parse_date(value)
+    if date is not None:
+        return date
+
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    if number.is_integer():
+        return str(int(number))
+    return repr(number)
+
+
+def get_dataset_key_columns(
+    csv_file_path: str, new_columns: Iterable[str], existing_columns: Iterable[str]
+) -> List[str]:
+    """
+    Get the columns identifying a record of a dataset when merging.
+
+    The API's 'ID' is used when both files have it, otherwise the columns of
+    config.DATASET_KEYS.
+
+    Parameters:
+        csv_file_path (str): The full path of the dataset's CSV file (e.g., '.../bank_failures.csv').
+        new_columns (Iterable[str]): The columns of the new records.
+        existing_columns (Iterable[str]): The columns of the existing CSV file.
+
+    Returns:
+        List[str]: The key columns, or an empty list to compare whole rows.
+    """
+    dataset = os.path.basename(csv_file_path).split(".", 1)[0]
+    shared_columns = set(new_columns) & set(existing_columns)
+
+    for key_columns in (["ID"], config.DATASET_KEYS.get(dataset)):
+        if key_columns and all(column in shared_columns for column in key_columns):
+            return key_columns
+
+    return []
+
+
+def get_row_keys(df: pd.DataFrame, key_columns: List[str]) -> List[Tuple[str, ...]]:
+    """
+    Get the normalized key of every row of a DataFrame of CSV text values.
+
+    Parameters:
+        df (DataFrame): The rows, read from a CSV file as text.
+        key_columns (List[str]): The key columns; every column if empty.
+
+    Returns:
+        List[Tuple[str, ...]]: The key of each row, in order.
+    """
+    columns = key_columns or list(df.columns)
+
+    return list(zip(*(df[column].map(normalize_key_value) for column in columns)))
+
+
+def merge_with_existing_csv(df: pd.DataFrame, csv_file_path: str) -> pd.DataFrame:
+    """
+    Merge newly downloaded records with the rows of an existing CSV file.
+
+    Records are matched on the dataset's key (see get_dataset_key_columns),
+    with numbers and dates normalized, so a record fetched again on the
+    watermark boundary replaces its previous version whatever the format it
+    was written in. New records are kept in front of the existing rows.
+
+    Parameters:
+        df (DataFrame): The newly downloaded records.
+        csv_file_path (str): The full path of the existing CSV file.
+
+    Returns:
+        DataFrame: The merged records, with one row per key.
+    """
+    new_df = pd.read_csv(
+        io.StringIO(df.to_csv(index=False)), dtype=str, keep_default_na=False
+    )
+    existing_df = pd.read_csv(csv_file_path, dtype=str, keep_default_na=False)
+    key_columns = get_dataset_key_columns(
+        csv_file_path, new_df.columns, existing_df.columns
+    )
+
+    new_keys = pd.Series(get_row_keys(new_df, key_columns), dtype=object)
+    new_df = new_df[~new_keys.duplicated(keep="last").to_numpy()]
+    existing_keys = get_row_keys(existing_df, key_columns)
+    replaced = set(new_keys)
+    existing_df = existing_df[[key not in replaced for key in existing_keys]]
+
+    return pd.concat([new_df, existing_df], ignore_index=True)
+
+
+def iter_json_array(file_path: str, read_size: int = 1024 * 1024) -> Iterator[Any]:
+    """
+    Parse the elements of a JSON array file one at a time.
+
+    The file is read in blocks of `read_size` characters, so memory stays
+    bounded by the block size and the largest element instead of the file size.
+
+    Parameters:
+        file_path (str): The full path to the JSON array file.
+        read_size (int, optional): The number of characters read at a time. Default is 1 MiB.
+
+    Yields:
+        Any: Each element of the array, in order.
+
+    Raises:
+        ValueError: If the file does not contain a complete JSON array.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(file_path, "r") as json_file:
+        buffer = json_file.read(read_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{os.path.basename(file_path)} is not a JSON array")
+        position = 1
+
+        while True:
+            # Skip whitespace and the separator before the next element
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position < len(buffer):
+                    break
+                buffer, position = json_file.read(read_size), 0
+                if not buffer:
+                    raise ValueError(f"Unexpected end of {os.path.basename(file_path)}")
+
+            if buffer[position] == "]":
+                return
+
+            # Decode the next element, reading more blocks until it is complete
+            while True:
+                try:
+                    element, position = decoder.raw_decode(buffer, position)
+                    break
+                except json.JSONDecodeError:
+                    chunk = json_file.read(read_size)
+                    if not chunk:
+                        raise
+                    buffer, position = buffer[position:] + chunk, 0
+
+            yield element
+
+
+def append_existing_csv_rows(
+    new_csv_path: str, existing_csv_path: str, chunk_rows: int
+) -> int:
+    """
+    Append the rows of an existing CSV file to a CSV file of new records.
+
+    The existing file is read in chunks of `chunk_rows` rows and its rows with
+    the key of a new record are skipped, so the new records replace them (see
+    merge_with_existing_csv). Only the keys of the new records, which are few in
+    an incremental run, are held in memory.
+
+    Parameters:
+        new_csv_path (str): The full path of the CSV file of new records.
+        existing_csv_path (str): The full path of the existing CSV file.
+        chunk_rows (int): The number of existing rows read at a time.
+
+    Returns:
+        int: The number of existing rows appended.
+    """
+    new_df = pd.read_csv(new_csv_path, dtype=str, keep_default_na=False)
+    columns = list(new_df.columns)
+    existing_columns = pd.read_csv(existing_csv_path, dtype=str, nrows=0).columns
+    key_columns = get_dataset_key_columns(existing_csv_path, columns, existing_columns)
+    new_keys = set(get_row_keys(new_df, key_columns))
+    del new_df
+
+    appended = 0
+    for chunk in pd.read_csv(
+        existing_csv_path, dtype=str, keep_default_na=False, chunksize=chunk_rows
+    ):
+        chunk = chunk.reindex(columns=columns, fill_value="")
+        is_new = [key not in new_keys for key in get_row_keys(chunk, key_columns)]
+        chunk[is_new].to_csv(new_csv_path, mode="a", header=False, index=False)
+        appended += sum(is_new)
+
+    return appended
+
+
+class CsvPageWriter:
+    """
+    Write FDIC API records to a CSV file incrementally, one page at a time.
+
+    Each page is flattened and appended as it arrives, so only the page being
+    written is held in memory. Values are written as they appear in the API
+    response and the columns are `columns`, or else the properties of the
+    first page; a record with another property raises CsvHeaderError rather
+    than losing it. Rows go to a
+    partial file that replaces the destination when the writer is closed,
+    optionally followed by the rows of the existing destination file, which
+    is left as it is if there are no new records. A writer
+    resumed from a checkpoint continues the partial file where the checkpoint
+    was taken.
+
+    Example:
+    >>> with CsvPageWriter("/tmp/data.csv") as writer:
+    ...     writer.write_records([{"data": {"CERT": 1}}])
+    """
+
+    def __init__(
+        self,
+        destination_path: str,
+        merge_existing: bool = False,
+        merge_chunk_rows: int = 50000,
+        partial_path: Optional[str] = None,
+        resume: Optional[Dict[str, Any]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> None:
+        self.destination_path = destination_path
+        self.merge_existing = merge_existing
+        self.merge_chunk_rows = merge_chunk_rows
+        self.record_count = 0
+        # Rows of the existing destination file kept when merging
+        self.merged_count = 0
+        self._columns = columns
+        self.partial_path = partial_path or f"{destination_path}.partial"
+        if resume:
+            self._file: TextIO = open_for_resume(self.partial_path, resume["bytes"])
+            self.record_count = resume["record_count"]
+            self._columns = resume["columns"]
+        else:
+            self._file = open(self.partial_path, "w", newline="")
+
+    def write_records(self, records: Iterable[Dict]) -> None:
+        """
+        Append records to the CSV file.
+
+        Parameters:
+            records (Iterable[Dict]): The API records, each with its properties in the 'data' field.
+
+        Raises:
+            CsvHeaderError: If a record has a property that is not a column of the file.
+        """
+        records = list(records)
+        if not records:
+            return
+
+        if self._columns is not None:
+            header = set(self._columns)
+            unknown = {
+                key
+                for record in records
+                for key in record.get("data", {})
+                if key not in header
+            }
+            if unknown:
+                file_name = os.path.basename(self.destination_path)
+                raise CsvHeaderError(
+                    f"Properties {', '.join(sorted(unknown))} are not columns of {file_name}"
+                )
+
+        df = flatten_fdic_records(records, columns=self._columns, dtype="object")
+        df.to_csv(self._file, header=self.record_count == 0, index=False)
+        self._columns = list(df.columns)
+        self.record_count += len(records)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Flush the rows written so far and describe the partial file.
+
+        Returns:
+            Dict[str, Any]: The state to resume the writer from.
+        """
+        self._file.flush()
+        return {
+            "bytes": self._file.tell(),
+            "record_count": self.record_count,
+            "columns": self._columns,
+        }
+
+    def abort(self) -> None:
+        """Close the partial file without publishing it to the destination path."""
+        self._file.close()
+
+    def close(self) -> None:
+        """Close the partial file and move it to the destination path."""
+        if self._file.closed:
+            return
+        self._file.close()
+
+        if (
+            self.merge_existing
+            and os.path.exists(self.destination_path)
+            and not self.record_count
+        ):
+            # Nothing new since the watermark; the existing file stays as it is
+            os.remove(self.partial_path)
+            logging.info(
+                f"No new records, kept {os.path.basename(self.destination_path)} as it is."
+            )
+            return
+
+        if self.merge_existing and os.path.exists(self.destination_path):
+            self.merged_count = append_existing_csv_rows(
+                self.partial_path, self.destination_path, self.merge_chunk_rows
+            )
+            logging.info(
+                f"Merged {self.record_count} new records into {os.path.basename(self.destination_path)}."
+            )
+        shutil.move(self.partial_path, self.destination_path)
+
+    def __enter__(self) -> "CsvPageWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def open_for_resume(partial_path: str, size: int) -> TextIO:
+    """
+    Open a partial output file for appending after its first `size` bytes.
+
+    Anything written after the checkpoint that recorded `size` is discarded.
+
+    Parameters:
+        partial_path (str): The full path of the partial output file.
+        size (int): The size of the file at the checkpoint, in bytes.
+
+    Returns:
+        TextIO: The file, positioned at its end.
+    """
+    with open(partial_path, "r+") as f:
+        f.truncate(size)
+
+    return open(partial_path, "a", newline="")
+
+
+def open_data_writer(
+    destination_path: str,
+    output_format: str = "json",
+    merge_existing: bool = False,
+    partial_path: Optional[str] = None,
+    resume: Optional[Dict[str, Any]] = None,
+) -> Union[JsonArrayWriter, CsvPageWriter]:
+    """
+    Open a streaming writer for the specified output format.
 
     Parameters:
-        data (List[Dict]): The data to be saved, as a list of dictionaries.
         destination_path (str): The full path where the file will be saved.
-        output_format (str, optional): The format in which to save the data. Currently only supports "json". Default is "json". # noqa E501
+        output_format (str, optional): The format in which to save the data, "json" or "csv". Default is "json".
+        merge_existing (bool, optional): Merge the records into an existing CSV file instead of replacing it. Default is False. # noqa E501
+        partial_path (Optional[str], optional): The file written to until the writer is closed. Default is next to the destination. # noqa E501
+        resume (Optional[Dict[str, Any]], optional): The checkpoint of a previous writer of the partial file to continue from. # noqa E501
 
     Returns:
-        None: The function saves the data to a file in the specified format.
+        Union[JsonArrayWriter, CsvPageWriter]: A writer that appends records to the file as they arrive.
 
     Raises:
         ValueError: If an unsupported output format is specified.
     """
 
     if output_format.lower() == "json":
-        with open(destination_path, "w") as output_file:
-            json.dump(data, output_file)
+        return JsonArrayWriter(destination_path, partial_path, resume)
+    elif output_format.lower() == "csv":
+        return CsvPageWriter(
+            destination_path, merge_existing, partial_path=partial_path, resume=resume
+        )
     else:
         raise ValueError(f"Unsupported output format: {output_format}")
 
 
-def fdic_json_to_csv(files: List[str]) -> None:
+def stream_json_to_csv(
+    json_file_path: str,
+    csv_file_path: str,
+    chunk_rows: int,
+    merge_existing: bool = False,
+) -> Tuple[int, int]:
     """
-    Convert a list of JSON files to CSV format.
+    Convert a JSON array file of FDIC API records to CSV in fixed-size chunks.
+
+    Records are parsed incrementally and written `chunk_rows` at a time, so peak
+    memory is a small constant instead of a multiple of the file size. The
+    columns are collected in a first pass over the file, so they are the same
+    as when the file is converted whole.
 
     Parameters:
-        files (List[str]): A list of full paths to JSON files to be converted.
+        json_file_path (str): The full path of the JSON file.
+        csv_file_path (str): The full path of the CSV file to write.
+        chunk_rows (int): The number of records converted at a time.
+        merge_existing (bool, optional): Merge the records into an existing CSV file instead of replacing it. Default is False. # noqa E501
 
     Returns:
-        None: The function saves the converted data as CSV files and removes the original JSON files.
+        Tuple[int, int]: The number of records converted and of rows written, including merged existing rows.
     """
+    columns = list(
+        dict.fromkeys(
+            chain.from_iterable(
+                record["data"]
+                for record in iter_json_array(json_file_path)
+                if "data" in record
+            )
+        )
+    )
+    records = iter_json_array(json_file_path)
 
-    for file_path in files:
-        # Log the start of the conversion process for this file
-        logging.info(f"Starting conversion of {os.path.basename(file_path)} to CSV.")
+    with CsvPageWriter(
+        csv_file_path, merge_existing, chunk_rows, columns=columns
+    ) as writer:
+        while True:
+            chunk = list(islice(records, chunk_rows))
+            if not chunk:
+                break
+            writer.write_records(chunk)
 
-        try:
-            # Open and read the JSON file
-            with open(file_path, "r") as json_file:
-                loaded_json = json.load(json_file)
+    return writer.record_count, writer.record_count + writer.merged_count
 
-            # Isolate the 'data' field
-            data_field = [item["data"] for item in loaded_json if "data" in item]
 
-            # Normalize just the 'data' field to a flat table
-            df = pd.json_normalize(data_field)
+def fdic_json_file_to_csv(
+    file_path: str,
+    merge_existing: bool = False,
+    chunk_rows: int = 0,
+    typed: bool = False,
+) -> Tuple[int, int]:
+    """
+    Convert a JSON file to CSV format and remove the JSON file.
 
-            # Save the DataFrame to a CSV file
-            csv_file_path = file_path.replace(".json", ".csv")
-            df.to_csv(csv_file_path, index=False)
+    Parameters:
+        file_path (str): The full path to the JSON file to be converted.
+        merge_existing (bool, optional): Merge the records into an existing CSV file instead of replacing it. Default is False. # noqa E501
+        chunk_rows (int, optional): Stream the file in chunks of this many records instead of loading it whole. Default is 0 (disabled). # noqa E501
+        typed (bool, optional): Build the table with the compact dtypes of the dataset's column types. Streamed files keep the values as received. Default is False. # noqa E501
 
-            # Remove the original JSON file
-            os.remove(file_path)
+    Returns:
+        Tuple[int, int]: The number of records read and of CSV rows written. The function saves the converted data as a CSV file and removes the original JSON file. # noqa E501
+    """
+    # Log the start of the conversion process for this file
+    logging.info(f"Starting conversion of {os.path.basename(file_path)} to CSV.")
 
-            # Log the completion of the conversion process for this file
-            logging.info(
-                f"Completed conversion of {os.path.basename(file_path)} to CSV."
+    csv_file_path = file_path.replace(".json", ".csv")
+
+    if chunk_rows:
+        # Parse and write the records incrementally
+        rows_in, rows_out = stream_json_to_csv(
+            file_path, csv_file_path, chunk_rows, merge_existing
+        )
+    else:
+        # Open and read the JSON file
+        with open(file_path, "r") as json_file:
+            loaded_json = json.load(json_file)
+
+        # Flatten the 'data' field of every record to a table
+        if typed:
+            column_types = get_dataset_column_types(csv_file_path)
+            # Decimals stay scaled integers until they are formatted for writing
+            df = format_typed_columns(
+                flatten_fdic_records(loaded_json, column_types=column_types)
             )
+        else:
+            df = flatten_fdic_records(loaded_json)
 
-        except Exception as e:
-            # Log any exceptions that occur during the conversion process
-            logging.error(
-                f"An error occurred while converting {os.path.basename(file_path)} to CSV: {e}"
+        # Save the DataFrame to a CSV file
+        rows_in, rows_out = len(loaded_json), len(df)
+        if merge_existing and os.path.exists(csv_file_path) and not loaded_json:
+            # Nothing new since the watermark; the existing file stays as it is
+            logging.info(
+                f"No new records, kept {os.path.basename(csv_file_path)} as it is."
             )
+        elif merge_existing and os.path.exists(csv_file_path):
+            df = merge_with_existing_csv(df, csv_file_path)
+            logging.info(
+                f"Merged {len(loaded_json)} new records into {os.path.basename(csv_file_path)}."
+            )
+            df.to_csv(csv_file_path, index=False)
+            rows_out = len(df)
+        else:
+            df.to_csv(csv_file_path, index=False)
+
+    # Remove the original JSON file
+    os.remove(file_path)
+
+    # Log the completion of the conversion process for this file
+    logging.info(f"Completed conversion of {os.path.basename(file_path)} to CSV.")
 
+    return rows_in, rows_out
 
-def fdic_yaml_to_csv(files: List[str]) -> None:
+
+def get_csv_column_max_date(csv_file_path: str, column: str) -> Optional[str]:
     """
-    Converts specific properties in multiple YAML files to individual CSV files.
+    Get the latest date stored in a column of a CSV file.
 
-    This function reads each YAML file in the provided list, navigates to the 'properties'
-    section inside the 'data' key, and extracts 'name', 'title', and 'description'
-    attributes from each property. It then saves these extracted properties to individual CSV files.
+    Parameters:
+        csv_file_path (str): The full path of the CSV file.
+        column (str): The name of the date column.
+
+    Returns:
+        Optional[str]: The latest date formatted as YYYY-MM-DD, or None if the column has no dates.
+    """
+    dates = pd.to_datetime(
+        pd.read_csv(csv_file_path, usecols=[column])[column],
+        format="mixed",
+        errors="coerce",
+    )
+    max_date = dates.max()
+
+    if pd.isna(max_date):
+        return None
+
+    return max_date.strftime("%Y-%m-%d")
+
+
+def fdic_yaml_file_to_csv(file_path: str) -> Tuple[int, int]:
+    """
+    Converts the properties of a YAML definitions file to a CSV file.
+
+    The function navigates to the 'properties' section inside the 'data' key and
+    extracts 'name', 'title', 'description' and 'type' attributes from each
+    property. The parsed properties are cached by the file's content hash, so an
+    unchanged file is not parsed again.
 
     Parameters:
-    - files (List[str]): A list of paths to the YAML files to be read.
+    - file_path (str): The path to the YAML file to be read.
 
     Returns:
-    - None: The function saves the extracted data to individual CSV files and returns None.
+    - Tuple[int, int]: The number of properties read and of CSV rows written. The function saves the extracted data to a CSV file and removes the YAML file. # noqa E501
 
-    Logging:
-    - Logs error if any file is not found or YAML parsing fails.
-    - Logs info upon successful saving of each CSV file.
+    Raises:
+    - FileNotFoundError: If the file is not found.
+    - yaml.YAMLError: If the file cannot be parsed.
     """
-    for file_path in files:
-        try:
-            with open(file_path, "r") as f:
-                data = yaml.safe_load(f)
-        except FileNotFoundError:
-            logging.error(f"File {os.path.basename(file_path)} not found.")
-            continue
-        except yaml.YAMLError as e:
-            logging.error(
-                f"Error parsing YAML file at {os.path.basename(file_path)}: {e}"
-            )
-            continue
+    # Reuse the parsed properties if this exact document was parsed before
+    content_hash = get_file_hash(file_path)
+
+    extracted_properties = load_parsed(content_hash)
+    if extracted_properties is not None:
+        logging.info(f"{os.path.basename(file_path)} unchanged, skipped parsing")
+    else:
+        with open(file_path, "r") as f:
+            data = yaml.safe_load(f)
 
         properties_data = (
             data.get("properties", {}).get("data", {}).get("properties", {})
@@ -125,17 +708,16 @@ def fdic_yaml_to_csv(files: List[str]) -> None:
                 }
             )
 
-        try:
-            df = pd.DataFrame(extracted_properties)
-            csv_path = file_path.replace(".yaml", ".csv")
-            # sort by name in abc order
-            df.to_csv(csv_path, index=False)
-            logging.info(f"Saved to {os.path.basename(csv_path)}")
-            os.remove(file_path)
-        except Exception as e:
-            logging.error(
-                f"Error creating DataFrame or writing to CSV for {file_path}: {e}"
-            )
+        store_parsed(content_hash, extracted_properties)
+
+    df = pd.DataFrame(extracted_properties)
+    csv_path = file_path.replace(".yaml", ".csv")
+    # sort by name in abc order
+    df.to_csv(csv_path, index=False)
+    logging.info(f"Saved to {os.path.basename(csv_path)}")
+    os.remove(file_path)
+
+    return len(extracted_properties), len(df)
 
 
 def update_dataframe_generic(
@@ -165,5 +747,513 @@ def update_dataframe_generic(
     return df
 
 
+def load_column_types(
+    definitions_csv_path: str,
+    type_map: List[Dict[str, str]] = config.FAILURE_PROPERTY_TYPE_MAP,
+) -> Dict[str, str]:
+    """
+    Load the type of every column of a dataset from its definitions file.
+
+    The types declared in `type_map` take precedence over the types of the
+    definitions file, matched on the lower snake case property title.
+
+    Parameters:
+    - definitions_csv_path (str): The path to the definitions CSV file (e.g., 'failure_properties.csv').
+    - type_map (List[Dict[str, str]]): The list of dictionaries mapping property titles to types.
+
+    Returns:
+    - Dict[str, str]: The type of each column, keyed by the column name.
+    """
+    definitions_df = pd.read_csv(definitions_csv_path)
+    definitions_df["title"] = (
+        definitions_df["title"].astype(str).str.lower().str.replace(" ", "_")
+    )
+    definitions_df = update_dataframe_generic(definitions_df, type_map)
+
+    return dict(zip(definitions_df["name"], definitions_df["type"].astype(str)))
+
+
+def coerce_column_types(df: pd.DataFrame, column_types: Dict[str, str]) -> pd.DataFrame:
+    """
+    Convert the columns of a DataFrame to the dtypes of their declared types.
+
+    Values that cannot be converted become missing values. Columns without a
+    known declared type keep the dtype pandas inferred.
+
+    Parameters:
+    - df (DataFrame): The DataFrame to be converted.
+    - column_types (Dict[str, str]): The declared type of each column, keyed by the column name.
+
+    Returns:
+    - DataFrame: The converted DataFrame.
+    """
+    for column, column_type in column_types.items():
+        dtype = PANDAS_DTYPES.get(column_type.lower())
+        if column not in df.columns or dtype is None:
+            continue
+
+        if dtype == "datetime64[ns]":
+            df[column] = pd.to_datetime(df[column], format="mixed", errors="coerce")
+        elif dtype in ("Int64", "Float64"):
+            numeric = pd.to_numeric(df[column], errors="coerce")
+            try:
+                df[column] = numeric.astype(dtype)
+            except (TypeError, ValueError):
+                # Declared integers with fractional values are kept as floats
+                df[column] = numeric.astype("Float64")
+        else:
+            df[column] = df[column].astype(dtype)
+
+    return df
+
+
+def get_dataset_column_types(
+    csv_file_path: str,
+    dataset_definitions: Dict[str, str] = config.DATASET_DEFINITIONS,
+) -> Dict[str, str]:
+    """
+    Get the declared column types of a dataset from its definitions file.
+
+    Parameters:
+    - csv_file_path (str): The full path to the dataset's CSV file.
+    - dataset_definitions (Dict[str, str]): The definitions file of each dataset, keyed by the dataset name.
+
+    Returns:
+    - Dict[str, str]: The type of each column, or an empty dict if the dataset has no definitions file next to it.
+    """
+    data_dir = os.path.dirname(csv_file_path)
+    dataset_name = os.path.basename(csv_file_path)[: -len(".csv")]
+
+    definitions_file = dataset_definitions.get(dataset_name)
+    if definitions_file:
+        definitions_path = os.path.join(data_dir, definitions_file)
+        if os.path.exists(definitions_path):
+            return load_column_types(definitions_path)
+
+    return {}
+
+
+def downcast_integers(numeric: pd.Series) -> Optional[pd.Series]:
+    """
+    Convert numbers to the smallest nullable integer dtype that holds them.
+
+    Parameters:
+    - numeric (Series): The numbers, with missing values as NaN.
+
+    Returns:
+    - Optional[Series]: The integers, or None if a value is fractional or out of range.
+    """
+    valid = numeric.dropna()
+    if not (valid == valid.round()).all():
+        return None
+
+    low = valid.min() if len(valid) else 0
+    high = valid.max() if len(valid) else 0
+    for dtype, min_value, max_value in INTEGER_DTYPES:
+        if min_value <= low and high <= max_value:
+            return numeric.astype(dtype)
+
+    return None
+
+
+def to_scaled_integers(
+    numeric: pd.Series, max_scale: int = config.DECIMAL_MAX_SCALE
+) -> Tuple[pd.Series, Optional[int]]:
+    """
+    Store decimals exactly as integers multiplied by a power of ten.
+
+    The smallest scale that makes every value whole is used.
+
+    Parameters:
+    - numeric (Series): The decimals, with missing values as NaN.
+    - max_scale (int): The largest number of decimal digits to scale by.
+
+    Returns:
+    - Tuple[Series, Optional[int]]: The scaled integers and the scale, or the decimals as floats and None if they need more than `max_scale` digits. # noqa E501
+    """
+    for scale in range(max_scale + 1):
+        # Round away binary floating point noise before testing for whole numbers
+        scaled = (numeric * 10**scale).round(6)
+        integers = downcast_integers(scaled)
+        if integers is not None:
+            return integers, scale
+
+    return numeric.astype("Float64"), None
+
+
+def build_typed_frame(
+    values: Dict[str, Any],
+    column_types: Dict[str, str],
+    categorical_columns: List[str] = config.CATEGORICAL_COLUMNS,
+    max_scale: int = config.DECIMAL_MAX_SCALE,
+) -> pd.DataFrame:
+    """
+    Build a DataFrame with compact dtypes from the declared column types.
+
+    Every column is converted before the frame is assembled, so no wide object
+    columns are held alongside it. `categorical_columns` become categoricals,
+    declared integers and whole numbers become the smallest nullable integer
+    dtype, dates become datetimes, and decimals become integers scaled by a
+    power of ten. The scale of each decimal column is kept in
+    `df.attrs["decimal_scales"]`, and the numeric columns an untyped frame
+    would hold as floats in `df.attrs["float_columns"]`; see
+    format_typed_columns and typed_frame_to_arrow. Columns without a known
+    declared type are left for pandas to infer.
+
+    Parameters:
+    - values (Dict[str, Any]): The values of each column, keyed by the column name.
+    - column_types (Dict[str, str]): The declared type of each column, keyed by the column name.
+    - categorical_columns (List[str]): The columns stored as categoricals.
+    - max_scale (int): The largest number of decimal digits decimals are scaled by.
+
+    Returns:
+    - DataFrame: The typed DataFrame.
+    """
+    columns: Dict[str, Any] = {}
+    decimal_scales: Dict[str, int] = {}
+    float_columns: List[str] = []
+
+    for column, column_values in values.items():
+        column_type = column_types.get(column, "").lower()
+        dtype = PANDAS_DTYPES.get(column_type)
+
+        if column in categorical_columns:
+            columns[column] = pd.Categorical(column_values)
+        elif dtype == "datetime64[ns]":
+            columns[column] = pd.to_datetime(
+                pd.Series(column_values, dtype=object), format="mixed", errors="coerce"
+            )
+        elif dtype in ("Int64", "Float64"):
+            numeric = pd.to_numeric(pd.Series(column_values), errors="coerce")
+            # pandas infers floats for numbers with a fraction or missing value
+            if any(
+                value is None or isinstance(value, float) for value in column_values
+            ):
+                float_columns.append(column)
+            if column_type == "decimal":
+                columns[column], scale = to_scaled_integers(numeric, max_scale)
+                if scale is not None:
+                    decimal_scales[column] = scale
+            else:
+                integers = downcast_integers(numeric)
+                columns[column] = (
+                    integers if integers is not None else numeric.astype("Float64")
+                )
+        elif dtype == "string":
+            columns[column] = pd.array(column_values, dtype="string")
+        else:
+            columns[column] = column_values
+
+    df = pd.DataFrame(columns)
+    df.attrs["decimal_scales"] = decimal_scales
+    df.attrs["float_columns"] = float_columns
+
+    return df
+
+
+def format_scaled_decimals(scaled: pd.Series, scale: int) -> pd.Series:
+    """
+    Format integers scaled by a power of ten as exact decimal text.
+
+    Parameters:
+    - scaled (Series): The decimals multiplied by 10 ** scale, as nullable integers.
+    - scale (int): The number of decimal digits the values are scaled by.
+
+    Returns:
+    - Series: The decimals as text (e.g., 12345 with scale 2 is '123.45'), with missing values kept.
+    """
+    absolute = scaled.astype("Int64").abs()
+    whole = (absolute // 10**scale).astype("string")
+    fraction = (
+        (absolute % 10**scale).astype("string").str.zfill(scale).str.rstrip("0")
+    )
+    text = whole + "." + fraction.mask(fraction == "", "0")
+
+    return text.mask((scaled < 0).fillna(False), "-" + text)
+
+
+def format_typed_columns(
+    df: pd.DataFrame, iso_dates: bool = config.TYPED_CSV_ISO_DATES
+) -> pd.DataFrame:
+    """
+    Format the scaled decimal and datetime columns of a typed DataFrame for writing to CSV.
+
+    Only these columns are converted, right before writing; the other columns
+    keep their compact dtypes. Integers stored for values an untyped frame
+    holds as floats are written as floats (e.g., '254766.0'), so the CSV
+    file is the same as an untyped transformation's.
+
+    Parameters:
+    - df (DataFrame): A DataFrame from build_typed_frame.
+    - iso_dates (bool): Write dates as YYYY-MM-DD instead of the API's M/D/YYYY.
+
+    Returns:
+    - DataFrame: The DataFrame with its decimals and dates as text.
+    """
+    formatted: Dict[str, pd.Series] = {}
+
+    decimal_scales = df.attrs.get("decimal_scales", {})
+    float_columns = df.attrs.get("float_columns", [])
+
+    for column, scale in decimal_scales.items():
+        if scale or column in float_columns:
+            formatted[column] = format_scaled_decimals(df[column], scale)
+
+    for column in float_columns:
+        if column not in decimal_scales and pd.api.types.is_integer_dtype(df[column]):
+            formatted[column] = format_scaled_decimals(df[column], 0)
+
+    for column in df.select_dtypes(include="datetime").columns:
+        dates = df[column].dt
+        if iso_dates:
+            formatted[column] = dates.strftime("%Y-%m-%d").astype("string")
+        else:
+            formatted[column] = (
+                dates.month.astype("Int64").astype("string")
+                + "/"
+                + dates.day.astype("Int64").astype("string")
+                + "/"
+                + dates.year.astype("Int64").astype("string")
+            )
+
+    return df.assign(**formatted) if formatted else df
+
+
+def typed_frame_to_arrow(df: pd.DataFrame) -> Any:
+    """
+    Convert a typed DataFrame to an Arrow table, unscaling its decimals.
+
+    The compact dtypes carry over to Arrow, e.g. categoricals become
+    dictionary arrays. Only the scaled decimal columns are converted, back to
+    floating point values.
+
+    Parameters:
+    - df (DataFrame): A DataFrame from build_typed_frame.
+
+    Returns:
+    - pyarrow.Table: The table to write.
+    """
+    pa = import_optional_dependency("pyarrow", "columnar")
+
+    unscaled = {
+        column: df[column].astype("Float64") / 10**scale
+        for column, scale in df.attrs.get("decimal_scales", {}).items()
+    }
+
+    return pa.Table.from_pandas(df.assign(**unscaled), preserve_index=False)
+
+
+def fdic_csv_file_to_columnar(
+    file_path: str,
+    output_formats: List[str],
+    dataset_definitions: Dict[str, str] = config.DATASET_DEFINITIONS,
+    typed: bool = False,
+) -> None:
+    """
+    Write typed columnar copies (Parquet and/or Arrow IPC) of a CSV file.
+
+    Column types come from the dataset's definitions file, when one is declared
+    in `dataset_definitions` and present next to the CSV file.
+
+    Parameters:
+    - file_path (str): The full path to the CSV file to be converted.
+    - output_formats (List[str]): The columnar formats to write, "parquet" and/or "arrow".
+    - dataset_definitions (Dict[str, str]): The definitions file of each dataset, keyed by the dataset name.
+    - typed (bool): Use the compact dtypes of build_typed_frame, e.g. categoricals and downcast integers.
+
+    Returns:
+    - None: The function saves the columnar files next to the CSV file.
+
+    Raises:
+    - ValueError: If an unsupported columnar format is specified.
+    - ImportError: If pyarrow is not installed.
+    """
+    feather = import_optional_dependency("pyarrow.feather", "columnar")
+    parquet = import_optional_dependency("pyarrow.parquet", "columnar")
+    pa = import_optional_dependency("pyarrow", "columnar")
+
+    column_types = get_dataset_column_types(file_path, dataset_definitions)
+
+    if typed:
+        raw_df = pd.read_csv(file_path, dtype=str)
+        table = typed_frame_to_arrow(
+            build_typed_frame(
+                {column: raw_df.pop(column) for column in list(raw_df.columns)},
+                column_types,
+            )
+        )
+    else:
+        table = pa.Table.from_pandas(
+            coerce_column_types(pd.read_csv(file_path), column_types),
+            preserve_index=False,
+        )
+
+    for output_format in output_formats:
+        columnar_path = file_path.replace(".csv", f".{output_format}")
+        if output_format == "parquet":
+            parquet.write_table(table, columnar_path)
+        elif output_format == "arrow":
+            feather.write_feather(table, columnar_path)
+        else:
+            raise ValueError(f"Unsupported columnar format: {output_format}")
+        logging.info(f"Saved to {os.path.basename(columnar_path)}")
+
+
+def get_partition_keys(dates: pd.Series, granularity: str) -> pd.Series:
+    """
+    Get the partition of every row from its date.
+
+    Parameters:
+        dates (pd.Series): The raw values of the partition column.
+        granularity (str): The granularity of the partitions, "year" or "quarter".
+
+    Returns:
+        pd.Series: The partition of each row (e.g., 'year=2023' or 'quarter=2023Q1'), or '<granularity>=unknown'.
+
+    Raises:
+        ValueError: If an unsupported granularity is specified.
+    """
+    parsed = pd.to_datetime(dates, format="mixed", errors="coerce")
+    years = parsed.dt.year.astype("Int64").astype("string")
+
+    if granularity == "year":
+        keys = "year=" + years
+    elif granularity == "quarter":
+        quarters = parsed.dt.quarter.astype("Int64").astype("string")
+        keys = "quarter=" + years + "Q" + quarters
+    else:
+        raise ValueError(f"Unsupported partition granularity: {granularity}")
+
+    return keys.fillna(f"{granularity}=unknown")
+
+
+def fdic_csv_file_to_partitions(
+    file_path: str,
+    column: str,
+    granularity: str,
+    partition_dir: str,
+    chunk_rows: int = 50000,
+    max_workers: int = config.PARTITION_MAX_WORKERS,
+) -> Tuple[int, int]:
+    """
+    Write a CSV file as CSV partitions by the year or quarter of a date column.
+
+    The file is read in chunks of `chunk_rows` rows and every chunk is split by
+    partition, its partitions appended to their staging files by `max_workers`
+    threads. A partition whose content hash matches the dataset's index is left
+    untouched, so only changed partitions are rewritten; partitions that no
+    longer have rows are removed. Values are written as they appear in the file.
+
+    Parameters:
+    - file_path (str): The full path to the CSV file (e.g., '.../bank_failures.csv').
+    - column (str): The date column to partition on (e.g., 'FAILDATE').
+    - granularity (str): The granularity of the partitions, "year" or "quarter".
+    - partition_dir (str): The directory the dataset's partitions are written to.
+    - chunk_rows (int): The number of rows read at a time.
+    - max_workers (int): The number of threads writing partitions at the same time.
+
+    Returns:
+    - Tuple[int, int]: The number of rows read and of rows written to changed partitions.
+    """
+    dataset = os.path.splitext(os.path.basename(file_path))[0]
+    dataset_dir = os.path.join(partition_dir, dataset)
+    staging_dir = os.path.join(dataset_dir, ".staging")
+    index_path = os.path.join(dataset_dir, "_index.json")
+
+    previous_index: Dict[str, Any] = {"partitions": {}}
+    if os.path.exists(index_path):
+        with open(index_path, "r") as f:
+            previous_index = json.load(f)
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    # Content hash and row count of every partition, keyed by partition
+    digests: Dict[str, Any] = {}
+    rows: Dict[str, int] = {}
+
+    def append_partition(key: str, partition_df: pd.DataFrame) -> None:
+        # Each partition is written by a single thread at a time
+        content = partition_df.to_csv(index=False, header=key not in digests)
+        if key not in digests:
+            digests[key] = hashlib.sha256()
+            rows[key] = 0
+        digests[key].update(content.encode())
+        rows[key] += len(partition_df)
+        with open(os.path.join(staging_dir, f"{key}.csv"), "a", newline="") as f:
+            f.write(content)
+
+    rows_in = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for chunk in pd.read_csv(
+            file_path, dtype=str, keep_default_na=False, chunksize=chunk_rows
+        ):
+            rows_in += len(chunk)
+            keys = get_partition_keys(chunk[column], granularity)
+            # Finish the chunk before the next one, keeping rows in file order
+            list(
+                executor.map(
+                    lambda group: append_partition(*group),
+                    chunk.groupby(keys, sort=False),
+                )
+            )
+
+    partitions: Dict[str, Dict[str, Any]] = {}
+
+    def publish_partition(key: str) -> bool:
+        relative_path = os.path.join(key, "data.csv")
+        partition_path = os.path.join(dataset_dir, relative_path)
+        staging_path = os.path.join(staging_dir, f"{key}.csv")
+        content_hash = digests[key].hexdigest()
+        partitions[key] = {
+            "path": relative_path,
+            "rows": rows[key],
+            "sha256": content_hash,
+        }
+
+        previous = previous_index["partitions"].get(key)
+        if (
+            previous
+            and previous["sha256"] == content_hash
+            and os.path.exists(partition_path)
+        ):
+            os.remove(staging_path)
+            return False
+
+        os.makedirs(os.path.dirname(partition_path), exist_ok=True)
+        os.replace(staging_path, partition_path)
+        return True
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        written = [
+            key
+            for key, changed in zip(digests, executor.map(publish_partition, digests))
+            if changed
+        ]
+    rows_out = sum(rows[key] for key in written)
+
+    removed = [key for key in previous_index["partitions"] if key not in partitions]
+    for key in removed:
+        shutil.rmtree(os.path.join(dataset_dir, key), ignore_errors=True)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    index = {
+        "dataset": dataset,
+        "column": column,
+        "granularity": granularity,
+        "rows": rows_in,
+        "partitions": dict(sorted(partitions.items())),
+    }
+    with open(f"{index_path}.tmp", "w") as f:
+        json.dump(index, f, indent=4)
+    os.replace(f"{index_path}.tmp", index_path)
+
+    logging.info(
+        f"Partitioned {dataset} by {column} {granularity} into {len(partitions)} partitions: "
+        f"{len(written)} written, {len(partitions) - len(written)} unchanged, {len(removed)} removed"
+    )
+    return rows_in, rows_out
+
+
 def bank_failures_transformations() -> None:
     pass
@@ -1,93 +1,560 @@
 from file_ops import (
     get_files_in_data_dir,
     clean_data_directory,
+    compress_file,
+    decompress_file,
+    get_compressed_file_name,
     get_data_directory,
+    get_file_hash,
+    get_partition_directory,
+    load_pending_merges,
+    load_watermark,
+    save_pending_merges,
+    save_watermark,
+    setup_directory,
 )
-from api_utils import (
-    construct_url,
-    download_files,
-    download_files_with_pagination,
-)
-from data_transform import (
-    fdic_json_to_csv,
-    fdic_yaml_to_csv,
+from manifest import (
+    get_published_file_names,
+    get_resource_paths,
+    is_resource_intact,
+    load_manifest,
+    save_manifest,
+    update_resources,
 )
 import config
+import hashlib
 import logging
-from typing import Dict, List, Optional
+import metrics
+import os
+import time
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 
 class FDICDataPipeline:
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str,
+        incremental: bool = config.INCREMENTAL_SYNC,
+        fused: bool = config.FUSED_PIPELINE,
+        typed: bool = config.TYPED_TRANSFORM,
+    ):
         self.base_url = base_url
         self.abs_data_dir = get_data_directory(config.DATA_DIR)
+        self.incremental = incremental
+        # Fused runs write paginated pages straight to CSV during collection
+        self.fused = fused
+        # Typed runs build DataFrames with the compact dtypes of the definitions
+        self.typed = typed
+        # Watermark field of every dataset collected in this run, by file name
+        self.watermark_fields: Dict[str, str] = {}
+        # Watermark field of every dataset collected since its watermark, to
+        # merge into the existing output, or None if collected in full, by file name
+        self.pending_merges: Dict[str, Optional[str]] = {}
+        # Published files whose content changed in this run's transformation
+        self.changed_resources: List[str] = []
+
+    def prepare_data_directory(self, clean: bool = True) -> None:
+        """
+        Prepare the data directory for a collection run.
+
+        Incremental runs merge into the previous output, so its compressed
+        resources are restored. Other runs start from an empty data directory
+        when `clean` is set, and otherwise overwrite only what they collect.
+        With config.SKIP_UNCHANGED, an empty data directory still holds the
+        published files of the previous run, so that the transformations of
+        unchanged inputs can be skipped.
+
+        Parameters:
+            clean (bool): Remove the previous output unless the run is incremental.
+        """
+        if self.incremental:
+            setup_directory(self.abs_data_dir)
+            self.decompress_dataset_artifacts()
+        elif clean:
+            keep = get_published_file_names() if config.SKIP_UNCHANGED else None
+            clean_data_directory(self.abs_data_dir, keep=keep)
+        else:
+            setup_directory(self.abs_data_dir)
+
+    def get_watermark(self, file_name: str, watermark_field: str) -> Optional[str]:
+        """
+        Get the high-water mark of a dataset from the previous run.
+
+        The stored watermark is used when present; otherwise it is derived from
+        the existing CSV output.
+
+        Parameters:
+            file_name (str): The name of the dataset (e.g., 'bank_failures').
+            watermark_field (str): The field the watermark applies to (e.g., 'FAILDATE').
 
-        clean_data_directory(self.abs_data_dir)
+        Returns:
+            Optional[str]: The watermark, or None if there is no previous output to merge into.
+        """
+        csv_path = os.path.join(self.abs_data_dir, f"{file_name}.csv")
+        if not os.path.exists(csv_path):
+            return None
+
+        from data_transform import get_csv_column_max_date
+
+        watermark = load_watermark(file_name)
+        if watermark and watermark.get("field") == watermark_field:
+            return watermark["value"]
+
+        return get_csv_column_max_date(csv_path, watermark_field)
 
     def run_data_collection_pipeline(
-        self, endpoint: str, params: Dict[str, str]
-    ) -> None:
+        self,
+        endpoint: str,
+        params: Dict[str, str],
+        watermark_field: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> bool:
+        # requests is only imported by runs that collect data
+        from api_utils import (
+            construct_url,
+            download_files,
+            download_files_with_pagination,
+        )
+
         logging.info(f"Starting Data Pipeline for {endpoint} endpoint.")
+        start = time.perf_counter()
+
+        if fields and params:
+            # Only request the projected columns (and the watermark field)
+            projection = list(fields)
+            if watermark_field and watermark_field not in projection:
+                projection.append(watermark_field)
+            params = dict(params)
+            params["fields"] = ",".join(projection)
+
+        # Only records filtered by a watermark are merged into the existing output
+        merge_existing = False
+        if self.incremental and watermark_field and params:
+            self.watermark_fields[params["filename"]] = watermark_field
+            watermark = self.get_watermark(params["filename"], watermark_field)
+            if watermark:
+                # The boundary is inclusive; duplicates are dropped when merging
+                logging.info(f"Fetching {endpoint} records since {watermark}.")
+                params = dict(params)
+                params["filters"] = f'{watermark_field}:["{watermark}" TO *]'
+                merge_existing = True
 
-        # Cleaning existing data directory
+        if params and "filename" in params:
+            # Fused runs merge while collecting; others leave it to the transform
+            self.pending_merges[params["filename"]] = (
+                watermark_field if merge_existing and not self.fused else None
+            )
 
         url = construct_url(self.base_url, endpoint, params)
 
         if not params:
             logging.info(f"Downloading {endpoint} files.")
-            try:
-                download_files([url])
-            except Exception as e:
-                logging.warning(f"Failed to download data with status code {e}")
+            success = download_files([url])
         elif params["download"] == "true":
             file_name = f"{params['filename']}.{params['format']}"
             logging.info(f"Downloading {file_name} without pagination.")
-            download_files([url], file_name)
+            success = download_files([url], file_name)
         elif params["download"] == "false":
             file_name = f"{params['filename']}.{params['format']}"
             logging.info(f"Downloading {file_name} with pagination.")
-            download_files_with_pagination(self.base_url, endpoint, params)
+            success = download_files_with_pagination(
+                self.base_url,
+                endpoint,
+                params,
+                output_format="csv" if self.fused else "json",
+                merge_existing=merge_existing and self.fused,
+            )
         else:
-            logging.warning("")
+            logging.warning(f"Unsupported download mode {params['download']}.")
+            success = False
 
+        metrics.observe_endpoint(endpoint, time.perf_counter() - start, success)
         logging.info(f"Completed Data Pipeline for {endpoint} endpoint.")
+        return success
 
     def run_data_collection_pipelines(
         self,
-        pipeline_configs: List[Dict[str, Optional[Dict[str, str]]]],
-    ) -> None:
-        for conf in pipeline_configs:
-            endpoint = conf.get("endpoint")
-            params = conf.get("params", {})
+        pipeline_configs: List[Dict[str, Any]],
+        max_concurrency: int = config.PIPELINE_MAX_CONCURRENCY,
+    ) -> Dict[str, bool]:
+        """
+        Run the collection pipelines of independent endpoints concurrently.
 
-            if endpoint is None:
-                logging.warning("Skipping pipeline due to missing endpoint.")
-                continue
+        At most `max_concurrency` pipelines run at the same time. A failing
+        pipeline is reported without stopping the others.
+
+        Parameters:
+            pipeline_configs (List[Dict[str, Any]]): The 'endpoint', 'params' and optional 'watermark' and 'fields' of each pipeline. # noqa E501
+            max_concurrency (int): The maximum number of pipelines running at the same time.
+
+        Returns:
+            Dict[str, bool]: Whether each pipeline succeeded, keyed by its output file name, or its endpoint for downloads without one. # noqa E501
+        """
+        results: Dict[str, bool] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            # Several pipelines may share an endpoint, so each keeps its own future
+            futures: List[Tuple[str, str, Future]] = []
+            for conf in pipeline_configs:
+                endpoint = conf.get("endpoint")
+                params = conf.get("params", {})
+                watermark_field = conf.get("watermark")
+                fields = conf.get("fields")
+
+                if endpoint is None:
+                    logging.warning("Skipping pipeline due to missing endpoint.")
+                    continue
+
+                if params is None:
+                    params = {}
+
+                # Explicitly type-casting to avoid MyPy error
+                assert isinstance(endpoint, str)
+                assert isinstance(params, dict)
+
+                name = params.get("filename", endpoint)
+                future = executor.submit(
+                    self.run_data_collection_pipeline,
+                    endpoint,
+                    params,
+                    watermark_field,
+                    fields,
+                )
+                futures.append((name, endpoint, future))
+
+            for name, endpoint, future in futures:
+                try:
+                    success = future.result()
+                except Exception as e:
+                    logging.error(f"Data Pipeline for {endpoint} endpoint failed: {e}")
+                    success = False
+                # Pipelines writing the same output only succeed together
+                results[name] = results.get(name, True) and success
+
+        save_pending_merges(self.pending_merges)
+
+        failed = [name for name, success in results.items() if not success]
+        if failed:
+            logging.error(f"Data collection failed for: {', '.join(failed)}")
+        else:
+            logging.info(f"Data collection succeeded for {len(results)} pipelines.")
+
+        return results
+
+    def run_file_transformations(
+        self,
+        tasks: List[Tuple[Callable[..., Any], Tuple[Any, ...]]],
+        max_workers: int = config.TRANSFORM_MAX_WORKERS,
+    ) -> Dict[str, str]:
+        """
+        Run independent file transformations, in a process pool when possible.
+
+        Transformations are CPU-bound, so they run in separate processes rather
+        than threads. Every transformation runs even if others fail. A transformation
+        returning a (rows in, rows out) tuple has its row counts recorded.
+
+        Parameters:
+            tasks (List[Tuple[Callable[..., Any], Tuple[Any, ...]]]): The transformation function and its arguments, the first being the file path. # noqa E501
+            max_workers (int): The maximum number of worker processes; 1 runs the tasks in this process.
+
+        Returns:
+            Dict[str, str]: The error of each failed transformation, keyed by file name.
+        """
+        errors: Dict[str, str] = {}
+
+        def record_error(file_path: str, error: Exception) -> None:
+            file_name = os.path.basename(file_path)
+            errors[file_name] = f"{type(error).__name__}: {error}"
+            logging.error(f"An error occurred while transforming {file_name}: {error}")
+
+        def record_result(file_path: str, result: Any) -> None:
+            if isinstance(result, tuple):
+                metrics.add_rows("transformation", os.path.basename(file_path), *result)
 
-            if params is None:
-                params = {}
+        if max_workers <= 1 or len(tasks) <= 1:
+            for transform, args in tasks:
+                try:
+                    record_result(args[0], transform(*args))
+                except Exception as e:
+                    record_error(args[0], e)
+            return errors
 
-            # Explicitly type-casting to avoid MyPy error
-            assert isinstance(endpoint, str)
-            assert isinstance(params, dict)
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            futures = {
+                executor.submit(transform, *args): args[0] for transform, args in tasks
+            }
+            for future in as_completed(futures):
+                try:
+                    record_result(futures[future], future.result())
+                except Exception as e:
+                    record_error(futures[future], e)
 
-            self.run_data_collection_pipeline(endpoint, params)
+        return errors
+
+    def run_data_transformation_pipeline(self) -> Dict[str, str]:
+        """
+        Transform the collected JSON and YAML files to CSV (and columnar) files.
+
+        Returns:
+            Dict[str, str]: The error of each failed transformation, keyed by file name.
+        """
+        # pandas is only imported by runs that transform data
+        from data_transform import (
+            fdic_csv_file_to_columnar,
+            fdic_csv_file_to_partitions,
+            fdic_json_file_to_csv,
+            fdic_yaml_file_to_csv,
+        )
 
-    def run_data_transformation_pipeline(self) -> None:
         logging.info("Starting Data Pipeline.")
 
-        logging.info("Transforming JSON files to CSV files.")
+        # Collected files filtered by a watermark are merged into the resources
+        # of the previous run
+        pending_merges = load_pending_merges()
+        if self.incremental or pending_merges:
+            self.decompress_dataset_artifacts()
+
         # Get all JSON Files.
-        json_files = get_files_in_data_dir(self.abs_data_dir, "json")
+        # The dataset metadata file of a previous incremental run is not data.
+        json_files = [
+            file
+            for file in get_files_in_data_dir(self.abs_data_dir, "json")
+            if os.path.basename(file) != os.path.basename(config.METADATA_FILE)
+        ]
+        # Get all YAML Files.
+        yaml_files = get_files_in_data_dir(self.abs_data_dir, "yaml")
 
-        # Transform JSON files to CSV files.
-        fdic_json_to_csv(json_files)
+        # Skip the collected files that are identical to the previous run's
+        manifest = load_manifest() if config.SKIP_UNCHANGED else None
+        input_hashes: Dict[str, str] = {}
+        fingerprint = self.get_transform_fingerprint()
+        unchanged_stems: Set[str] = set()
+        if manifest is not None:
+            input_hashes = {
+                os.path.basename(file): get_file_hash(file)
+                for file in yaml_files + json_files
+            }
+            unchanged = self.get_unchanged_inputs(input_hashes, manifest, fingerprint)
+            for file in yaml_files + json_files:
+                if os.path.basename(file) in unchanged:
+                    # Transformations consume their input file
+                    os.remove(file)
+                    logging.info(
+                        f"{os.path.basename(file)} unchanged since the last run, skipped transforming it"
+                    )
+            unchanged_stems = {name.rsplit(".", 1)[0] for name in unchanged}
+            yaml_files = [f for f in yaml_files if os.path.basename(f) not in unchanged]
+            json_files = [f for f in json_files if os.path.basename(f) not in unchanged]
 
+        # Transform YAML definitions files to CSV files first, so that typed
+        # JSON transformations can read the column types from them.
         logging.info("Transforming YAML files to CSV files.")
-        # Get all YAML Files.
-        yaml_files = get_files_in_data_dir(self.abs_data_dir, "yaml")
+        errors = self.run_file_transformations(
+            [(fdic_yaml_file_to_csv, (file,)) for file in yaml_files]
+        )
+
+        # Transform JSON files to CSV files; every file is independent.
+        logging.info("Transforming JSON files to CSV files.")
+        tasks: List[Tuple[Callable[..., Any], Tuple[Any, ...]]] = [
+            (
+                fdic_json_file_to_csv,
+                (
+                    file,
+                    os.path.basename(file).rsplit(".", 1)[0] in pending_merges,
+                    config.TRANSFORM_CHUNK_ROWS,
+                    self.typed,
+                ),
+            )
+            for file in json_files
+        ]
+        errors.update(self.run_file_transformations(tasks))
+        # Transformed files are removed; a file that failed is merged by the next run
+        save_pending_merges(
+            {
+                name: None
+                for name in pending_merges
+                if not os.path.exists(os.path.join(self.abs_data_dir, f"{name}.json"))
+            }
+        )
 
-        # Transform YAML files to CSV files.
-        fdic_yaml_to_csv(yaml_files)
+        if config.COLUMNAR_OUTPUT_FORMATS:
+            logging.info("Writing typed columnar copies of CSV files.")
+            csv_files = [
+                file
+                for file in get_files_in_data_dir(self.abs_data_dir, "csv")
+                if os.path.basename(file).rsplit(".", 1)[0] not in unchanged_stems
+            ]
+            errors.update(
+                self.run_file_transformations(
+                    [
+                        (
+                            fdic_csv_file_to_columnar,
+                            (
+                                file,
+                                config.COLUMNAR_OUTPUT_FORMATS,
+                                config.DATASET_DEFINITIONS,
+                                self.typed,
+                            ),
+                        )
+                        for file in csv_files
+                    ]
+                )
+            )
+
+        if config.PARTITIONED_OUTPUT:
+            logging.info("Writing partitioned copies of CSV files.")
+            partition_dir = get_partition_directory()
+            tasks = []
+            for file in get_files_in_data_dir(self.abs_data_dir, "csv"):
+                dataset = os.path.basename(file).rsplit(".", 1)[0]
+                partitioning = config.PARTITIONED_DATASETS.get(dataset)
+                index_path = os.path.join(partition_dir, dataset, "_index.json")
+                # Unchanged datasets keep their partitions, unless they are missing
+                if partitioning is None or (
+                    dataset in unchanged_stems and os.path.exists(index_path)
+                ):
+                    continue
+                tasks.append(
+                    (
+                        fdic_csv_file_to_partitions,
+                        (
+                            file,
+                            partitioning["column"],
+                            partitioning["granularity"],
+                            partition_dir,
+                        ),
+                    )
+                )
+            errors.update(self.run_file_transformations(tasks))
+
+        if self.incremental or pending_merges:
+            self.update_watermarks(pending_merges)
+
+        self.compress_dataset_artifacts()
+
+        if manifest is not None:
+            # Failed inputs are transformed again by the next run
+            for name, content_hash in input_hashes.items():
+                if name not in errors:
+                    manifest["inputs"][name] = {
+                        "sha256": content_hash,
+                        "fingerprint": fingerprint,
+                    }
+            self.changed_resources = update_resources(self.abs_data_dir, manifest)
+            save_manifest(manifest)
+
+        if errors:
+            logging.error(
+                f"Data transformation failed for {len(errors)} files: {', '.join(errors)}"
+            )
 
         logging.info("Completed Data Pipeline endpoint.")
+        return errors
+
+    def get_transform_fingerprint(self) -> str:
+        """
+        Hash what the output of a transformation depends on besides its input file.
+
+        Returns:
+            str: The hex digest of the transform settings, the configuration and the transformation code.
+        """
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256(f"typed={self.typed}".encode())
+        for module in ("config.py", "data_transform.py", "fdic_datapipeline.py"):
+            digest.update(get_file_hash(os.path.join(src_dir, module)).encode())
+
+        return digest.hexdigest()
+
+    def get_unchanged_inputs(
+        self, input_hashes: Dict[str, str], manifest: Dict[str, Any], fingerprint: str
+    ) -> Set[str]:
+        """
+        Find the collected files that need not be transformed again.
+
+        A file is unchanged if it is byte-identical to the previous run's,
+        transformed by the same code and settings, and the resources it was
+        transformed to still hold the content recorded in the manifest.
+
+        Parameters:
+            input_hashes (Dict[str, str]): The content hash of each collected file, keyed by file name.
+            manifest (Dict[str, Any]): The manifest of the previous run.
+            fingerprint (str): The fingerprint of this run's transformations.
+
+        Returns:
+            Set[str]: The names of the unchanged files.
+        """
+        resource_paths = get_resource_paths()
+        unchanged = set()
+
+        for name, content_hash in input_hashes.items():
+            record = {"sha256": content_hash, "fingerprint": fingerprint}
+            if manifest["inputs"].get(name) != record:
+                continue
+
+            stem = name.rsplit(".", 1)[0]
+            outputs = [path for path in resource_paths if path.startswith(f"{stem}.")]
+            if outputs and all(
+                is_resource_intact(self.abs_data_dir, path, manifest)
+                for path in outputs
+            ):
+                unchanged.add(name)
+
+        return unchanged
+
+    def update_watermarks(
+        self, pending_merges: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Store the high-water mark of every dataset collected in this run.
+
+        Parameters:
+            pending_merges (Optional[Dict[str, str]]): The watermark field of the datasets merged by this run's transformation, which may have been collected by a previous run. # noqa E501
+        """
+        from data_transform import get_csv_column_max_date
+
+        watermark_fields = {**(pending_merges or {}), **self.watermark_fields}
+        for file_name, watermark_field in watermark_fields.items():
+            csv_path = os.path.join(self.abs_data_dir, f"{file_name}.csv")
+            if not os.path.exists(csv_path):
+                continue
+
+            try:
+                watermark = get_csv_column_max_date(csv_path, watermark_field)
+            except ValueError as e:
+                logging.warning(f"Could not compute {file_name} watermark: {e}")
+                continue
+
+            if watermark:
+                save_watermark(file_name, watermark_field, watermark)
+
+    def compress_dataset_artifacts(self) -> None:
+        """Compress every resource that declares a compression in config.KAGGLE_METADATA."""
+        for resource in config.KAGGLE_METADATA["resources"]:
+            compression = resource.get("compression")
+            file_path = os.path.join(self.abs_data_dir, resource["path"])
+            if compression and os.path.exists(file_path):
+                compress_file(file_path, compression)
+
+    def decompress_dataset_artifacts(self) -> None:
+        """Restore the compressed resources of a previous run so they can be merged into."""
+        if not os.path.exists(self.abs_data_dir):
+            return
+
+        for resource in config.KAGGLE_METADATA["resources"]:
+            compression = resource.get("compression")
+            if not compression:
+                continue
+            compressed_path = os.path.join(
+                self.abs_data_dir,
+                get_compressed_file_name(resource["path"], compression),
+            )
+            # A resource collected in this run is newer than its compressed copy
+            file_path = os.path.join(self.abs_data_dir, resource["path"])
+            if os.path.exists(compressed_path) and not os.path.exists(file_path):
+                decompress_file(compressed_path, compression)
@@ -1,6 +1,40 @@
 import config
+import gzip
+import hashlib
+import importlib
+import json
 import os
 import logging
+import shutil
+import time
+from types import ModuleType
+from typing import Any, BinaryIO, Collection, Dict, Optional, cast
+
+# File extension of each supported artifact compression
+COMPRESSION_EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+
+def import_optional_dependency(name: str, extra: str) -> ModuleType:
+    """
+    Import an optional dependency of the project.
+
+    Parameters:
+        name (str): The name of the module (e.g., 'pyarrow').
+        extra (str): The project extra that installs it (e.g., 'columnar').
+
+    Returns:
+        ModuleType: The imported module.
+
+    Raises:
+        ImportError: If the module is not installed, naming the extra to install.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise ImportError(
+            f"{name} is not installed; install the '{extra}' extra with "
+            f"`poetry install --extras {extra}`"
+        ) from e
 
 
 def get_data_directory(data_dir: str = config.DATA_DIR) -> str:
@@ -22,12 +56,15 @@ def get_data_directory(data_dir: str = config.DATA_DIR) -> str:
     return destination_dir
 
 
-def clean_data_directory(abs_data_dir: str) -> None:
+def clean_data_directory(
+    abs_data_dir: str, keep: Optional[Collection[str]] = None
+) -> None:
     """
     Cleans the data directory by removing all files in the directory.
 
     Parameters:
         abs_data_dir (str): The absolute path to the directory containing data files.
+        keep (Optional[Collection[str]]): The names of files to keep.
 
     Returns:
         None
@@ -40,6 +77,8 @@ def clean_data_directory(abs_data_dir: str) -> None:
 
     # Remove all files in the directory
     for file in os.listdir(abs_data_dir):
+        if keep and file in keep:
+            continue
         file_path = os.path.join(abs_data_dir, file)
         os.remove(file_path)
         logging.info(f"Removed {os.path.basename(file_path)}")
@@ -86,3 +125,326 @@ def get_files_in_data_dir(abs_data_dir: str, file_extension: str) -> list:
         for file in os.listdir(abs_data_dir)
         if file.endswith(f".{file_extension}")
     ]
+
+
+def get_partition_directory(partition_dir: str = config.PARTITION_DIR) -> str:
+    """
+    Get the directory of the partitioned copies of the datasets.
+
+    Parameters:
+        partition_dir (str): The path of the partition directory relative to the script's directory.
+
+    Returns:
+        str: The full path of the partition directory.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    return setup_directory(os.path.join(script_dir, partition_dir))
+
+
+def get_state_directory(state_dir: str = config.STATE_DIR) -> str:
+    """
+    Get the directory used to keep pipeline state between runs.
+
+    The state directory is kept outside of the data directory so that it is
+    neither cleaned nor published with the dataset.
+
+    Parameters:
+        state_dir (str): The path of the state directory relative to the script's directory.
+
+    Returns:
+        str: The full path of the state directory.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    return setup_directory(os.path.join(script_dir, state_dir))
+
+
+def load_watermark(name: str) -> Optional[Dict[str, str]]:
+    """
+    Load the high-water mark stored for a dataset.
+
+    Parameters:
+        name (str): The name of the dataset (e.g., 'bank_failures').
+
+    Returns:
+        Optional[Dict[str, str]]: The stored 'field' and 'value', or None if no watermark is stored.
+    """
+    watermarks_path = os.path.join(get_state_directory(), config.WATERMARKS_FILE)
+
+    if not os.path.exists(watermarks_path):
+        return None
+
+    with open(watermarks_path, "r") as f:
+        watermarks = json.load(f)
+
+    return watermarks.get(name)
+
+
+def save_watermark(name: str, field: str, value: str) -> None:
+    """
+    Store the high-water mark of a dataset.
+
+    Parameters:
+        name (str): The name of the dataset (e.g., 'bank_failures').
+        field (str): The field the watermark applies to (e.g., 'FAILDATE').
+        value (str): The highest value of the field in the dataset.
+    """
+    watermarks_path = os.path.join(get_state_directory(), config.WATERMARKS_FILE)
+
+    watermarks = {}
+    if os.path.exists(watermarks_path):
+        with open(watermarks_path, "r") as f:
+            watermarks = json.load(f)
+
+    watermarks[name] = {"field": field, "value": value}
+
+    with open(watermarks_path, "w") as f:
+        json.dump(watermarks, f, indent=4)
+
+    logging.info(f"Stored {name} watermark {field}={value}")
+
+
+def load_pending_merges() -> Dict[str, str]:
+    """
+    Load the datasets whose collected file only holds the records since their watermark.
+
+    Returns:
+        Dict[str, str]: The watermark field of each dataset to merge into its existing output, keyed by dataset name.
+    """
+    pending_path = os.path.join(get_state_directory(), config.PENDING_MERGES_FILE)
+
+    if not os.path.exists(pending_path):
+        return {}
+
+    with open(pending_path, "r") as f:
+        return json.load(f)
+
+
+def save_pending_merges(updates: Dict[str, Optional[str]]) -> None:
+    """
+    Record which collected files must be merged into the existing output.
+
+    Parameters:
+        updates (Dict[str, Optional[str]]): The watermark field of each dataset collected since its watermark, or None for a dataset collected in full or already merged. # noqa E501
+    """
+    pending_path = os.path.join(get_state_directory(), config.PENDING_MERGES_FILE)
+
+    pending = load_pending_merges()
+    for name, watermark_field in updates.items():
+        if watermark_field is None:
+            pending.pop(name, None)
+        else:
+            pending[name] = watermark_field
+
+    with open(pending_path, "w") as f:
+        json.dump(pending, f, indent=4)
+
+
+def get_checkpoint_directory() -> str:
+    """
+    Get the directory of the pagination checkpoints, creating it if needed.
+
+    Returns:
+        str: The full path of the checkpoint directory.
+    """
+    return setup_directory(os.path.join(get_state_directory(), config.CHECKPOINT_DIR))
+
+
+def get_checkpoint_partial_path(name: str) -> str:
+    """
+    Get the path of the partial output kept with a checkpoint.
+
+    Parameters:
+        name (str): The name of the checkpointed output file (e.g., 'bank_failures.json').
+
+    Returns:
+        str: The full path of the partial output file.
+    """
+    return os.path.join(get_checkpoint_directory(), f"{name}.partial")
+
+
+def load_checkpoint(
+    name: str, key: str, max_age: float = config.CHECKPOINT_MAX_AGE
+) -> Optional[Dict[str, Any]]:
+    """
+    Load the checkpoint of an interrupted download.
+
+    A checkpoint of a different request, an expired checkpoint or one without
+    its partial output is discarded.
+
+    Parameters:
+        name (str): The name of the checkpointed output file (e.g., 'bank_failures.json').
+        key (str): The key of the request the checkpoint must belong to.
+        max_age (float): The maximum age of the checkpoint, in seconds.
+
+    Returns:
+        Optional[Dict[str, Any]]: The checkpoint, or None if there is no usable checkpoint.
+    """
+    checkpoint_path = os.path.join(get_checkpoint_directory(), f"{name}.json")
+    if not os.path.exists(checkpoint_path):
+        return None
+
+    with open(checkpoint_path, "r") as f:
+        checkpoint = json.load(f)
+
+    if checkpoint.get("key") != key:
+        logging.info(f"Discarding {name} checkpoint of a different request")
+    elif time.time() - checkpoint.get("updated_at", 0) > max_age:
+        logging.info(f"Discarding expired {name} checkpoint")
+    elif not os.path.exists(get_checkpoint_partial_path(name)):
+        logging.warning(f"Discarding {name} checkpoint without partial output")
+    else:
+        return checkpoint
+
+    clear_checkpoint(name)
+    return None
+
+
+def save_checkpoint(name: str, checkpoint: Dict[str, Any]) -> None:
+    """
+    Store the checkpoint of a download in progress.
+
+    The checkpoint is replaced atomically, so an interruption leaves either the
+    previous or the new checkpoint.
+
+    Parameters:
+        name (str): The name of the checkpointed output file (e.g., 'bank_failures.json').
+        checkpoint (Dict[str, Any]): The JSON serializable checkpoint.
+    """
+    checkpoint_path = os.path.join(get_checkpoint_directory(), f"{name}.json")
+
+    with open(f"{checkpoint_path}.tmp", "w") as f:
+        json.dump(dict(checkpoint, updated_at=time.time()), f)
+    os.replace(f"{checkpoint_path}.tmp", checkpoint_path)
+
+
+def clear_checkpoint(name: str) -> None:
+    """
+    Remove the checkpoint of a download and its partial output.
+
+    Parameters:
+        name (str): The name of the checkpointed output file (e.g., 'bank_failures.json').
+    """
+    checkpoint_path = os.path.join(get_checkpoint_directory(), f"{name}.json")
+
+    for path in (checkpoint_path, get_checkpoint_partial_path(name)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def get_file_hash(file_path: str) -> str:
+    """
+    Compute the SHA-256 hash of a file's content.
+
+    Parameters:
+        file_path (str): The full path of the file.
+
+    Returns:
+        str: The hex digest of the file's content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def get_compressed_file_name(file_name: str, compression: Optional[str]) -> str:
+    """
+    Get the name of a file once compressed with the given compression.
+
+    Parameters:
+        file_name (str): The name of the uncompressed file (e.g., 'bank_failures.csv').
+        compression (Optional[str]): The compression, "gzip" or "zstd", or None for no compression.
+
+    Returns:
+        str: The name of the compressed file (e.g., 'bank_failures.csv.gz').
+
+    Raises:
+        ValueError: If an unsupported compression is specified.
+    """
+    if compression is None:
+        return file_name
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+    return f"{file_name}.{COMPRESSION_EXTENSIONS[compression]}"
+
+
+def _open_compressed(file_path: str, mode: str, compression: str) -> BinaryIO:
+    """Open a compressed file for binary reading ('rb') or writing ('wb')."""
+    if compression == "gzip":
+        return cast(BinaryIO, gzip.open(file_path, mode))
+
+    # zstandard is an optional dependency, only needed for zstd artifacts
+    zstandard = import_optional_dependency("zstandard", "zstd")
+
+    raw_file = open(file_path, mode)
+    if mode == "wb":
+        return cast(BinaryIO, zstandard.ZstdCompressor().stream_writer(raw_file))
+    return cast(BinaryIO, zstandard.ZstdDecompressor().stream_reader(raw_file))
+
+
+def compress_file(file_path: str, compression: str) -> str:
+    """
+    Compress a file in streaming fashion and remove the original.
+
+    Parameters:
+        file_path (str): The full path of the file to compress.
+        compression (str): The compression, "gzip" or "zstd".
+
+    Returns:
+        str: The full path of the compressed file.
+    """
+    compressed_path = get_compressed_file_name(file_path, compression)
+
+    with open(file_path, "rb") as source, _open_compressed(
+        compressed_path, "wb", compression
+    ) as destination:
+        shutil.copyfileobj(source, destination, 1024 * 1024)
+    os.remove(file_path)
+
+    logging.info(f"Compressed {os.path.basename(compressed_path)}")
+    return compressed_path
+
+
+def decompress_file(compressed_path: str, compression: str) -> str:
+    """
+    Decompress a file in streaming fashion and remove the compressed copy.
+
+    Parameters:
+        compressed_path (str): The full path of the compressed file.
+        compression (str): The compression, "gzip" or "zstd".
+
+    Returns:
+        str: The full path of the decompressed file.
+    """
+    file_path = compressed_path[: -len(COMPRESSION_EXTENSIONS[compression]) - 1]
+
+    with _open_compressed(compressed_path, "rb", compression) as source, open(
+        file_path, "wb"
+    ) as destination:
+        shutil.copyfileobj(source, destination, 1024 * 1024)
+    os.remove(compressed_path)
+
+    logging.info(f"Decompressed {os.path.basename(file_path)}")
+    return file_path
+
+
+def open_data_file(file_path: str, compression: Optional[str] = None) -> BinaryIO:
+    """
+    Open a data file for binary reading, decompressing it on the fly.
+
+    Parameters:
+        file_path (str): The full path of the file.
+        compression (Optional[str]): The compression of the file, "gzip" or "zstd", or None for an uncompressed file.
+
+    Returns:
+        BinaryIO: The decompressed content of the file.
+    """
+    if compression is None:
+        return open(file_path, "rb")
+
+    return _open_compressed(file_path, "rb", compression)
@@ -1,9 +1,23 @@
-from file_ops import get_data_directory
+from column_stats import get_column_statistics
+from file_ops import (
+    get_compressed_file_name,
+    get_data_directory,
+    get_file_hash,
+    open_data_file,
+)
+from manifest import (
+    get_resource_paths,
+    load_manifest,
+    save_manifest,
+    update_resources,
+)
+import csv
+import hashlib
+import io
 import logging
 import json
 import os
 import config
-import pandas as pd
 from typing import Dict, List, Union, Any, cast
 
 
@@ -89,6 +103,65 @@ def compare_resources_with_metadata(
         raise MetadataDiscrepancyError("\n".join(error_message))
 
 
+def add_columnar_resources(
+    metadata_dict: Dict[str, Any], file_names: List[str]
+) -> Dict[str, Any]:
+    """
+    Declare the typed columnar copies of CSV resources as resources of their own.
+
+    Parameters:
+    - metadata_dict (Dict): The metadata dictionary.
+    - file_names (List[str]): List of file names.
+
+    Returns:
+    - Dict: Updated metadata dictionary.
+    """
+    resources = cast(List[Dict[str, Any]], metadata_dict.get("resources", []))
+    declared_paths = {resource["path"] for resource in resources}
+
+    columnar_resources = []
+    for resource in resources:
+        if not resource["path"].endswith(".csv"):
+            continue
+        for output_format in config.COLUMNAR_OUTPUT_FORMATS:
+            path = resource["path"].replace(".csv", f".{output_format}")
+            if path in file_names and path not in declared_paths:
+                columnar_resources.append(
+                    {
+                        "path": path,
+                        "description": f"{resource.get('description')} ({output_format} format)",
+                    }
+                )
+
+    metadata_dict["resources"] = resources + columnar_resources
+    return metadata_dict
+
+
+def resolve_compressed_resources(metadata_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Point resources that declare a compression at their compressed file.
+
+    Parameters:
+    - metadata_dict (Dict): The metadata dictionary.
+
+    Returns:
+    - Dict: A copy of the metadata dictionary with the compressed file paths and without the 'compression' keys.
+    """
+    resources = cast(List[Dict[str, Any]], metadata_dict.get("resources", []))
+
+    resolved_resources = []
+    for resource in resources:
+        resolved_resource = {
+            key: value for key, value in resource.items() if key != "compression"
+        }
+        resolved_resource["path"] = get_compressed_file_name(
+            resource["path"], resource.get("compression")
+        )
+        resolved_resources.append(resolved_resource)
+
+    return {**metadata_dict, "resources": resolved_resources}
+
+
 def create_metadata_file(
     metadata_dict: Dict[str, Union[str, List[Dict[str, str]]]]
 ) -> None:
@@ -112,10 +185,60 @@ def create_metadata_file(
         json.dump(metadata_dict, f, indent=4)
 
 
+def add_column_statistics(metadata_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Describe every column of the CSV resources with its statistics.
+
+    Each resource gets its number of 'rows' and a schema field per column with
+    the column's inferred type and 'statistics': null count, distinct count
+    estimate, minimum and maximum. Files are scanned in a single streaming pass
+    and only when their content changed since a previous run.
+
+    Parameters:
+        metadata_dict (Dict): The metadata dictionary.
+
+    Returns:
+        Dict: Updated metadata dictionary.
+    """
+    data_dir = get_data_directory()
+    resources = cast(List[Dict[str, Any]], metadata_dict.get("resources", []))
+
+    for resource in resources:
+        if not resource["path"].endswith(".csv"):
+            continue
+
+        compression = resource.get("compression")
+        file_path = os.path.join(
+            data_dir, get_compressed_file_name(resource["path"], compression)
+        )
+        if not os.path.exists(file_path):
+            logging.warning(f"Skipping statistics of missing {resource['path']}")
+            continue
+
+        statistics = get_column_statistics(file_path, compression)
+        resource["rows"] = statistics["rows"]
+        resource["schema"] = resource.get("schema", {})
+        resource["schema"]["fields"] = [
+            {
+                "name": name,
+                "type": column["type"],
+                "statistics": {
+                    key: value for key, value in column.items() if key != "type"
+                },
+            }
+            for name, column in statistics["columns"].items()
+        ]
+
+    return metadata_dict
+
+
 def get_failures_column_metadata(metadata_dict: Dict[str, Any]) -> Dict[str, Any]:
     """
     Update the metadata dictionary with column metadata for 'bank_failures.csv'.
 
+    Each property of the definitions file becomes a field named after its title,
+    keeping the statistics of its column from add_column_statistics.
+
     Parameters:
         metadata_dict (Dict): The metadata dictionary.
 
@@ -128,20 +251,44 @@ def get_failures_column_metadata(metadata_dict: Dict[str, Any]) -> Dict[str, Any
     try:
         data_dir = get_data_directory()
         failures_properties_file = "failure_properties.csv"
+        properties_compression = None
 
-        properties_abs_path = os.path.join(data_dir, failures_properties_file)
-
-        properties_df = pd.read_csv(properties_abs_path)
+        # The definitions file may have been published compressed
+        resources = cast(List[Dict[str, Any]], metadata_dict.get("resources", []))
+        for resource in resources:
+            if resource.get("path") == failures_properties_file:
+                properties_compression = resource.get("compression")
+                failures_properties_file = get_compressed_file_name(
+                    failures_properties_file, properties_compression
+                )
 
-        properties_df.drop(columns=["name"], inplace=True)
-        properties_df.rename(columns={"title": "name"}, inplace=True)
+        properties_abs_path = os.path.join(data_dir, failures_properties_file)
 
-        failures_schema = properties_df.to_dict(orient="records")
+        with open_data_file(properties_abs_path, properties_compression) as raw_file:
+            properties = list(
+                csv.DictReader(io.TextIOWrapper(raw_file, encoding="utf-8"))
+            )
 
-        resources = cast(List[Dict[str, Any]], metadata_dict.get("resources", []))
         for resource in resources:
             if resource.get("path") == "bank_failures.csv":
                 resource["schema"] = resource.get("schema", {})
+                column_statistics = {
+                    field["name"]: field["statistics"]
+                    for field in resource["schema"].get("fields", [])
+                    if "statistics" in field
+                }
+
+                failures_schema = []
+                for prop in properties:
+                    field = {
+                        "name": prop["title"],
+                        "description": prop["description"],
+                        "type": prop["type"],
+                    }
+                    if prop["name"] in column_statistics:
+                        field["statistics"] = column_statistics[prop["name"]]
+                    failures_schema.append(field)
+
                 resource["schema"]["fields"] = failures_schema
                 break
         return metadata_dict
@@ -150,14 +297,45 @@ def get_failures_column_metadata(metadata_dict: Dict[str, Any]) -> Dict[str, Any
         return metadata_dict
 
 
-def gen_kaggle_metadata() -> None:
+def get_metadata_key(readme: str, resources: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Hash everything the dataset metadata is generated from.
+
+    Parameters:
+        readme (str): The dataset description.
+        resources (Dict[str, Dict[str, Any]]): The manifest records of the resources, keyed by path.
+
+    Returns:
+        str: The hex digest of the configuration, the generation code, the description and the resources' content.
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256(readme.encode())
+    for module in ("config.py", "column_stats.py", "get_dataset_metadata.py"):
+        digest.update(get_file_hash(os.path.join(src_dir, module)).encode())
+    # The published path of a resource also depends on its compression
+    resource_paths = get_resource_paths()
+    for path, record in sorted(resources.items()):
+        digest.update(f"{path}:{resource_paths.get(path)}:{record['sha256']}".encode())
+
+    return digest.hexdigest()
+
+
+def gen_kaggle_metadata() -> bool:
     """
     Generate the Kaggle dataset metadata JSON file.
 
     The function performs several steps:
     1. Checks for discrepancies between the metadata and actual files.
     2. Updates the metadata description from a Markdown file.
-    3. Updates the metadata schema for 'bank_failures.csv'.
+    3. Describes the columns of every CSV resource with their statistics.
+    4. Updates the metadata schema for 'bank_failures.csv'.
+
+    With config.SKIP_UNCHANGED, the file is kept as is when the configuration,
+    the description and the content of every resource are the same as when it
+    was generated.
+
+    Returns:
+        bool: True if the metadata file changed.
 
     Raises:
         MetadataDiscrepancyError: If there are discrepancies between metadata and actual files.
@@ -169,12 +347,12 @@ def gen_kaggle_metadata() -> None:
     output_path = get_data_directory()
     abs_output_file_path = os.path.join(output_path, file_name)
 
-    # Delete the file if it exists
-    if os.path.exists(abs_output_file_path):
-        os.remove(abs_output_file_path)
-
-    # Get the list of files in the data/ directory
-    dataset_files: List[str] = get_dataset_file_list()
+    # Get the list of files in the data/ directory, besides the metadata file
+    dataset_files: List[str] = [
+        dataset_file
+        for dataset_file in get_dataset_file_list()
+        if dataset_file != file_name
+    ]
 
     # Load Metadata from config
     meta_data = config.KAGGLE_METADATA
@@ -183,8 +361,13 @@ def gen_kaggle_metadata() -> None:
     if not os.path.exists(output_path):
         os.makedirs(output_path)
 
+    # Declare the typed columnar copies of the CSV resources
+    add_columnar_resources(meta_data, dataset_files)
+
     # Check if metadata and directory files are in sync
-    compare_resources_with_metadata(meta_data, dataset_files)
+    compare_resources_with_metadata(
+        resolve_compressed_resources(meta_data), dataset_files
+    )
     logging.info("Metadata and directory files are in sync.")
 
     # generate the metadata.description from markdown file.
@@ -195,14 +378,44 @@ def gen_kaggle_metadata() -> None:
 
     with open(readme_path, "r") as file:
         readme = file.read()
+
+    # Keep the metadata file if nothing it is generated from changed
+    manifest = load_manifest() if config.SKIP_UNCHANGED else None
+    if manifest is not None:
+        update_resources(output_path, manifest)
+        metadata_key = get_metadata_key(readme, manifest["resources"])
+        if (
+            os.path.exists(abs_output_file_path)
+            and manifest["metadata"].get("key") == metadata_key
+            and manifest["metadata"].get("sha256")
+            == get_file_hash(abs_output_file_path)
+        ):
+            save_manifest(manifest)
+            logging.info(f"Dataset unchanged, kept {file_name}")
+            return False
+
+    # Delete the file if it exists
+    if os.path.exists(abs_output_file_path):
+        os.remove(abs_output_file_path)
+
     meta_data["description"] = readme
 
+    add_column_statistics(meta_data)
+
     get_failures_column_metadata(
         metadata_dict=meta_data,
     )
 
-    # Write the metadata to the file
+    # Write the metadata to the file, with the published (compressed) paths
     with open(abs_output_file_path, "w") as f:
-        json.dump(meta_data, f, indent=4)
+        json.dump(resolve_compressed_resources(meta_data), f, indent=4)
+
+    changed = True
+    if manifest is not None:
+        metadata_hash = get_file_hash(abs_output_file_path)
+        changed = manifest["metadata"].get("sha256") != metadata_hash
+        manifest["metadata"] = {"key": metadata_key, "sha256": metadata_hash}
+        save_manifest(manifest)
 
     logging.info("Completed kaggle dataset metadata generation")
+    return changed
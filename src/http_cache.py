@@ -0,0 +1,351 @@
+import config
+import hashlib
+import json
+import logging
+import os
+import requests
+import shutil
+import threading
+import time
+from file_ops import get_state_directory, setup_directory
+from typing import Any, Dict, Mapping, Optional, Union
+from urllib.parse import urlencode
+
+_page_cache_lock = threading.Lock()
+# Total size of the page cache, computed on first use
+_page_cache_bytes: Optional[int] = None
+
+
+def get_cache_directory() -> str:
+    """
+    Get the directory of the local HTTP cache, creating it if needed.
+
+    Returns:
+        str: The full path of the HTTP cache directory.
+    """
+    return setup_directory(os.path.join(get_state_directory(), config.HTTP_CACHE_DIR))
+
+
+def _url_key(url: str) -> str:
+    """Return the cache key of a URL."""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def get_cached_body_path(url: str) -> Optional[str]:
+    """
+    Get the path of the cached body of a URL.
+
+    Parameters:
+        url (str): The URL of the cached response.
+
+    Returns:
+        Optional[str]: The full path of the cached body, or None if the URL is not cached.
+    """
+    body_path = os.path.join(get_cache_directory(), f"{_url_key(url)}.body")
+
+    return body_path if os.path.exists(body_path) else None
+
+
+def get_conditional_headers(url: str) -> Dict[str, str]:
+    """
+    Build the conditional request headers for a cached URL.
+
+    Parameters:
+        url (str): The URL about to be requested.
+
+    Returns:
+        Dict[str, str]: The If-None-Match/If-Modified-Since headers, or an empty dict if the URL is not cached.
+    """
+    meta_path = os.path.join(get_cache_directory(), f"{_url_key(url)}.json")
+    if not os.path.exists(meta_path) or get_cached_body_path(url) is None:
+        return {}
+
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    return headers
+
+
+def store_response(url: str, response: requests.Response, body_path: str) -> None:
+    """
+    Store a downloaded body and its validators in the cache.
+
+    Responses without an ETag or Last-Modified header cannot be revalidated
+    and are not cached.
+
+    Parameters:
+        url (str): The URL of the response.
+        response (requests.Response): The response the body was downloaded from.
+        body_path (str): The full path of the downloaded body.
+    """
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return
+
+    key = _url_key(url)
+    cache_dir = get_cache_directory()
+    shutil.copyfile(body_path, os.path.join(cache_dir, f"{key}.body"))
+
+    with open(os.path.join(cache_dir, f"{key}.json"), "w") as f:
+        json.dump({"url": url, "etag": etag, "last_modified": last_modified}, f)
+
+    logging.debug(f"Cached {url}")
+
+
+def load_parsed(content_hash: str) -> Optional[Any]:
+    """
+    Load the parsed result of a document from the cache.
+
+    Parameters:
+        content_hash (str): The SHA-256 hash of the document's content.
+
+    Returns:
+        Optional[Any]: The parsed result, or None if the document was never parsed.
+    """
+    parsed_path = os.path.join(get_cache_directory(), f"{content_hash}.parsed.json")
+    if not os.path.exists(parsed_path):
+        return None
+
+    with open(parsed_path, "r") as f:
+        return json.load(f)
+
+
+def store_parsed(content_hash: str, parsed: Any) -> None:
+    """
+    Store the parsed result of a document in the cache.
+
+    Parameters:
+        content_hash (str): The SHA-256 hash of the document's content.
+        parsed (Any): The JSON serializable parsed result.
+    """
+    parsed_path = os.path.join(get_cache_directory(), f"{content_hash}.parsed.json")
+    with open(parsed_path, "w") as f:
+        json.dump(parsed, f)
+
+
+def get_page_cache_directory() -> str:
+    """
+    Get the directory of the raw API page cache, creating it if needed.
+
+    Returns:
+        str: The full path of the page cache directory.
+    """
+    return setup_directory(os.path.join(get_state_directory(), config.PAGE_CACHE_DIR))
+
+
+def get_page_key(url: str, params: Mapping[str, Union[str, int]]) -> str:
+    """
+    Get the content address of an API page.
+
+    Parameters:
+        url (str): The URL of the API endpoint.
+        params (Mapping[str, Union[str, int]]): The parameters of the request, including its offset.
+
+    Returns:
+        str: The SHA-256 hash of the URL and its sorted parameters.
+    """
+    query = urlencode(sorted((key, str(value)) for key, value in params.items()))
+
+    return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+
+def load_page(
+    url: str,
+    params: Mapping[str, Union[str, int]],
+    ttl: Optional[float] = config.PAGE_CACHE_TTL,
+) -> Optional[bytes]:
+    """
+    Load the raw body of an API page from the page cache.
+
+    A hit marks the page as recently used, so that it is evicted last.
+
+    Parameters:
+        url (str): The URL of the API endpoint.
+        params (Mapping[str, Union[str, int]]): The parameters of the request, including its offset.
+        ttl (Optional[float]): The maximum age of the page, in seconds; None accepts any age.
+
+    Returns:
+        Optional[bytes]: The raw response body, or None if the page is not cached or expired.
+    """
+    page_path = os.path.join(
+        get_page_cache_directory(), f"{get_page_key(url, params)}.json"
+    )
+
+    try:
+        stat = os.stat(page_path)
+        if ttl is not None and time.time() - stat.st_mtime > ttl:
+            return None
+        with open(page_path, "rb") as f:
+            body = f.read()
+        # The access time orders eviction; the modification time keeps the age
+        os.utime(page_path, (time.time(), stat.st_mtime))
+    except FileNotFoundError:
+        return None
+
+    return body
+
+
+def _get_page_cache_bytes(cache_dir: str) -> int:
+    """Return the total size of the page cache. Requires _page_cache_lock."""
+    global _page_cache_bytes
+
+    if _page_cache_bytes is None:
+        _page_cache_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(cache_dir) if entry.is_file()
+        )
+    return _page_cache_bytes
+
+
+def evict_pages(cache_dir: str, max_bytes: int) -> None:
+    """
+    Remove the least recently used pages until the page cache fits in `max_bytes`.
+
+    Parameters:
+        cache_dir (str): The full path of the page cache directory.
+        max_bytes (int): The maximum total size of the page cache, in bytes.
+    """
+    global _page_cache_bytes
+
+    with _page_cache_lock:
+        total = _get_page_cache_bytes(cache_dir)
+        if total <= max_bytes:
+            return
+
+        entries = sorted(
+            (entry for entry in os.scandir(cache_dir) if entry.is_file()),
+            key=lambda entry: entry.stat().st_atime,
+        )
+        evicted = 0
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            evicted += 1
+
+        _page_cache_bytes = total
+        logging.info(f"Evicted {evicted} pages from the page cache")
+
+
+def store_page(
+    url: str,
+    params: Mapping[str, Union[str, int]],
+    body: bytes,
+    max_bytes: int = config.PAGE_CACHE_MAX_BYTES,
+) -> None:
+    """
+    Store the raw body of an API page in the page cache.
+
+    Parameters:
+        url (str): The URL of the API endpoint.
+        params (Mapping[str, Union[str, int]]): The parameters of the request, including its offset.
+        body (bytes): The raw response body.
+        max_bytes (int): The maximum total size of the page cache, in bytes.
+    """
+    global _page_cache_bytes
+
+    cache_dir = get_page_cache_directory()
+    page_path = os.path.join(cache_dir, f"{get_page_key(url, params)}.json")
+
+    with _page_cache_lock:
+        total = _get_page_cache_bytes(cache_dir)
+        if os.path.exists(page_path):
+            total -= os.path.getsize(page_path)
+        # Write to a temporary file so a concurrent reader never sees half a page
+        partial_path = f"{page_path}.{threading.get_ident()}.partial"
+        with open(partial_path, "wb") as f:
+            f.write(body)
+        os.replace(partial_path, page_path)
+        _page_cache_bytes = total + len(body)
+
+    if "offset" in params and "limit" in params:
+        store_page_limit(url, params)
+    evict_pages(cache_dir, max_bytes)
+
+
+def _get_page_limits_path(url: str, params: Mapping[str, Union[str, int]]) -> str:
+    """Return the path of the page limits of a paginated request, without its offset and limit."""
+    request_params = {
+        key: value for key, value in params.items() if key not in ("offset", "limit")
+    }
+    # Kept in a subdirectory, which is not evicted with the pages
+    limits_dir = setup_directory(os.path.join(get_page_cache_directory(), "limits"))
+
+    return os.path.join(limits_dir, f"{get_page_key(url, request_params)}.json")
+
+
+def store_page_limit(url: str, params: Mapping[str, Union[str, int]]) -> None:
+    """
+    Record the limit a page of a paginated request was cached with, by its offset.
+
+    Page keys include the limit, so a download must request every cached page
+    with the limit it was cached with to hit the cache.
+
+    Parameters:
+        url (str): The URL of the API endpoint.
+        params (Mapping[str, Union[str, int]]): The parameters of the request, including its offset and limit.
+    """
+    limits_path = _get_page_limits_path(url, params)
+
+    with _page_cache_lock:
+        limits = {}
+        if os.path.exists(limits_path):
+            with open(limits_path, "r") as f:
+                limits = json.load(f)
+        limits[str(params["offset"])] = int(params["limit"])
+
+        with open(f"{limits_path}.tmp", "w") as f:
+            json.dump(limits, f)
+        os.replace(f"{limits_path}.tmp", limits_path)
+
+
+def load_page_limits(
+    url: str,
+    params: Mapping[str, Union[str, int]],
+    ttl: Optional[float] = None,
+) -> Dict[int, int]:
+    """
+    Load the limits the pages of a paginated request were cached with.
+
+    Parameters:
+        url (str): The URL of the API endpoint.
+        params (Mapping[str, Union[str, int]]): The parameters shared by every page request.
+        ttl (Optional[float]): Leave out pages that are no longer cached or older than this, in seconds; None loads every limit. # noqa E501
+
+    Returns:
+        Dict[int, int]: The limit of each cached page, keyed by offset.
+    """
+    limits_path = _get_page_limits_path(url, params)
+
+    if not os.path.exists(limits_path):
+        return {}
+
+    with open(limits_path, "r") as f:
+        limits = {int(offset): limit for offset, limit in json.load(f).items()}
+
+    if ttl is None:
+        return limits
+
+    cache_dir = get_page_cache_directory()
+    fresh_limits = {}
+    for offset, limit in limits.items():
+        page_params = dict(params, offset=offset, limit=limit)
+        page_path = os.path.join(cache_dir, f"{get_page_key(url, page_params)}.json")
+        try:
+            if time.time() - os.stat(page_path).st_mtime <= ttl:
+                fresh_limits[offset] = limit
+        except FileNotFoundError:
+            continue
+
+    return fresh_limits
@@ -0,0 +1,218 @@
+import config
+import logging
+import metrics
+import requests
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from typing import Any, Mapping, Optional, Union
+from urllib3.response import BaseHTTPResponse
+from urllib3.util.retry import Retry
+
+# Status codes that are worth retrying: throttling and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# Start of the latest request attempt sent by each thread, after its rate limiter wait
+_attempt = threading.local()
+
+
+class TokenBucket:
+    """
+    Limit the rate of requests shared by every thread of the process.
+
+    Tokens accumulate at `rate` per second up to `burst`, and each request
+    takes one. Requests reserve their token under a lock and sleep outside of
+    it, so waiting threads are released in order, spaced by 1 / `rate`. A pause
+    holds back every request until it expires, e.g. after a 429 response.
+
+    Parameters:
+        rate (float): The average number of requests per second; 0 disables the limit.
+        burst (int): The number of requests that may be sent at once after a quiet period.
+
+    Example:
+    >>> bucket = TokenBucket(rate=10, burst=20)
+    >>> bucket.acquire()
+    0.0
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Wait until a request may be sent.
+
+        Returns:
+            float: The time spent waiting, in seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._paused_until - now)
+            if self.rate > 0:
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                # A negative balance is a reservation of a future token
+                self._tokens -= 1
+                delay = max(delay, -self._tokens / self.rate)
+
+        if delay > 0:
+            time.sleep(delay)
+            metrics.observe_rate_limit_wait(delay)
+
+        return delay
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every request for a while and drop the accumulated burst.
+
+        Parameters:
+            seconds (float): The length of the pause, in seconds.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+        logging.warning(f"API throttled requests, pausing for {seconds:.1f}s")
+
+
+rate_limiter = TokenBucket(config.HTTP_RATE_LIMIT, config.HTTP_RATE_BURST)
+
+
+def throttle(response: Union[requests.Response, BaseHTTPResponse]) -> None:
+    """
+    Pause every request after a 429 response, for its Retry-After if it has one.
+
+    Parameters:
+        response (Union[requests.Response, BaseHTTPResponse]): The response to a request.
+    """
+    status = getattr(response, "status_code", None) or getattr(response, "status", None)
+    if status != 429:
+        return
+
+    metrics.observe_throttled_response()
+    pause = float(config.HTTP_THROTTLE_PAUSE)
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            pause = Retry(0).parse_retry_after(retry_after)
+        except Exception:
+            logging.debug(f"Ignoring invalid Retry-After header {retry_after}")
+    rate_limiter.pause(pause)
+
+
+class RateLimitedRetry(Retry):
+    """A retry policy whose retries also pass through the shared rate limiter."""
+
+    def sleep(self, response: Optional[BaseHTTPResponse] = None) -> None:
+        if response is not None:
+            throttle(response)
+        super().sleep(response)
+        rate_limiter.acquire()
+        _attempt.started = time.perf_counter()
+
+
+def build_session(
+    pool_size: int = config.HTTP_POOL_SIZE,
+    max_retries: int = config.HTTP_MAX_RETRIES,
+    backoff_factor: float = config.HTTP_BACKOFF_FACTOR,
+    backoff_max: float = config.HTTP_BACKOFF_MAX,
+    backoff_jitter: float = config.HTTP_BACKOFF_JITTER,
+) -> requests.Session:
+    """
+    Build a requests session with a keep-alive connection pool and retry policy.
+
+    Parameters:
+        pool_size (int): The number of connections kept alive per host.
+        max_retries (int): The maximum number of retries for a single request.
+        backoff_factor (float): The base of the exponential backoff between retries, in seconds.
+        backoff_max (float): The upper bound of a single backoff sleep, in seconds.
+        backoff_jitter (float): The maximum random jitter added to each backoff sleep, in seconds.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = RateLimitedRetry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        backoff_max=backoff_max,
+        backoff_jitter=backoff_jitter,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Get the session shared by every FDIC API call, creating it on first use.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+            logging.debug("Created shared HTTP session.")
+        return _session
+
+
+def get_attempt_start() -> float:
+    """
+    Get when the final attempt of this thread's latest request was sent.
+
+    The latency measured from it excludes the rate limiter waits and the
+    backoff and failed attempts of retries.
+
+    Returns:
+        float: The time.perf_counter() value when the attempt was sent.
+    """
+    return _attempt.started
+
+
+def get(
+    url: str,
+    params: Optional[Mapping[str, Union[str, int]]] = None,
+    timeout: float = config.HTTP_TIMEOUT,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    Send a GET request through the shared session and rate limiter.
+
+    Parameters:
+        url (str): The URL to request.
+        params (Optional[Mapping[str, Union[str, int]]]): The query parameters of the request.
+        timeout (float): The connect and read timeout of the request, in seconds.
+        **kwargs: Additional keyword arguments passed to requests.Session.get.
+
+    Returns:
+        requests.Response: The final response after any retries.
+    """
+    rate_limiter.acquire()
+    _attempt.started = time.perf_counter()
+    response = get_session().get(url, params=params, timeout=timeout, **kwargs)
+    # Retries pause the limiter themselves; a final 429 has run out of retries
+    throttle(response)
+
+    return response
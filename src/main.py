@@ -1,7 +1,13 @@
+import argparse
 import logging
-from fdic_datapipeline import FDICDataPipeline
-from get_dataset_metadata import gen_kaggle_metadata
 import config
+import metrics
+import os
+import sys
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from fdic_datapipeline import FDICDataPipeline
 
 # Get the logging level from the config
 logging_level = config.LOGGING_LEVEL.upper()
@@ -12,33 +18,174 @@ logging.basicConfig(
     level=logging_level,
 )
 
+# Stages run by each command, in order
+COMMAND_STAGES = {
+    "collect": ["collection"],
+    "transform": ["transformation"],
+    "metadata": ["metadata"],
+    "store": ["store"],
+    "all": ["collection", "transformation", "metadata"],
+}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse the command line of the data pipeline.
+
+    Parameters:
+        argv (Optional[List[str]]): The arguments to parse. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The command, the endpoints to collect and whether the run is incremental.
+    """
+    parser = argparse.ArgumentParser(
+        description="Collect, transform and describe the FDIC failed bank dataset."
+    )
+    subparsers = parser.add_subparsers(
+        dest="command", metavar="{collect,transform,metadata,store,all}"
+    )
+
+    pipeline_options = argparse.ArgumentParser(add_help=False)
+    pipeline_options.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=config.INCREMENTAL_SYNC,
+        help="Merge new records into the previous output instead of replacing it.",
+    )
+    collect_options = argparse.ArgumentParser(add_help=False)
+    collect_options.add_argument(
+        "--endpoint",
+        action="append",
+        choices=sorted(config.PIPELINE_CONFIGS),
+        help="Collect only this pipeline; may be repeated. Defaults to ENABLED_PIPELINES.",
+    )
+
+    subparsers.add_parser(
+        "collect",
+        parents=[pipeline_options, collect_options],
+        help="Download the enabled endpoints to the data directory.",
+    )
+    subparsers.add_parser(
+        "transform",
+        parents=[pipeline_options],
+        help="Transform the collected files to CSV and columnar files.",
+    )
+    subparsers.add_parser("metadata", help="Generate dataset-metadata.json.")
+    subparsers.add_parser(
+        "store", help="Load the published CSV files into the SQLite store."
+    )
+    subparsers.add_parser(
+        "all",
+        parents=[pipeline_options, collect_options],
+        help="Run every stage (the default).",
+    )
+
+    # Running without a command runs the whole pipeline
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv = ["all", *argv]
+
+    return parser.parse_args(argv)
+
+
+def get_pipeline(incremental: bool) -> "FDICDataPipeline":
+    """
+    Create the data pipeline, importing its modules on first use.
 
-def main() -> None:
-    """Main function to run the data pipeline."""
+    Parameters:
+        incremental (bool): Merge new records into the previous output.
 
-    # Initialize the data pipeline
-    pipeline = FDICDataPipeline(config.FDIC_URL)
+    Returns:
+        FDICDataPipeline: The data pipeline.
+    """
+    from fdic_datapipeline import FDICDataPipeline
 
-    # Define the pipeline configurations
-    pipeline_configs = [
-        {
-            "endpoint": config.FAILURES_ENDPOINT,
-            "params": config.FAILURES_PARAMS,
-        },
-        {
-            "endpoint": config.FAILURES_DEFINITION_ENDPOINT,
-            "params": {},
-        },
-    ]
+    return FDICDataPipeline(
+        config.FDIC_URL,
+        incremental=incremental,
+        fused=config.FUSED_PIPELINE,
+        typed=config.TYPED_TRANSFORM,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Main function to run the data pipeline.
+
+    Parameters:
+        argv (Optional[List[str]]): The command line arguments. Defaults to sys.argv.
+    """
+    args = parse_args(argv)
+    stages = COMMAND_STAGES[args.command]
+    if args.command == "all" and config.SQLITE_STORE:
+        stages = stages + ["store"]
+    incremental = getattr(args, "incremental", config.INCREMENTAL_SYNC)
+    pipeline = (
+        get_pipeline(incremental)
+        if "collection" in stages or "transformation" in stages
+        else None
+    )
+    # Published files changed by this run
+    changes: List[str] = []
+    # Pipelines and files that failed; a failed stage stops the run
+    failures: List[str] = []
 
     # Run data collection pipeline
-    pipeline.run_data_collection_pipelines(pipeline_configs)
+    if "collection" in stages:
+        assert pipeline is not None
+        endpoints = getattr(args, "endpoint", None)
+        pipeline_configs = [
+            config.PIPELINE_CONFIGS[name]
+            for name in (endpoints or config.ENABLED_PIPELINES)
+        ]
+        with metrics.stage("collection"):
+            # Only a run of every enabled endpoint replaces the whole data directory
+            pipeline.prepare_data_directory(clean=not endpoints)
+            results = pipeline.run_data_collection_pipelines(pipeline_configs)
+        failures.extend(name for name, success in results.items() if not success)
 
     # Run data Transformation pipeline
-    pipeline.run_data_transformation_pipeline()
+    if "transformation" in stages and not failures:
+        assert pipeline is not None
+        with metrics.stage("transformation"):
+            errors = pipeline.run_data_transformation_pipeline()
+        failures.extend(errors)
+        changes.extend(pipeline.changed_resources)
 
     # Run dataset-metadata.json generation
-    gen_kaggle_metadata()
+    if "metadata" in stages and not failures:
+        from get_dataset_metadata import gen_kaggle_metadata
+
+        with metrics.stage("metadata"):
+            if gen_kaggle_metadata():
+                changes.append(os.path.basename(config.METADATA_FILE))
+
+    # Load the published files into the SQLite store
+    if "store" in stages and not failures:
+        from file_ops import get_data_directory
+        from sqlite_store import run_store_pipeline
+
+        with metrics.stage("store"):
+            run_store_pipeline(get_data_directory())
+
+    # Tell whether there is anything new to publish
+    if config.SKIP_UNCHANGED and stages not in (["collection"], ["store"]):
+        from manifest import defer_changes, report_changes
+
+        if failures:
+            # A failed run is not published, so its changes are reported by the next run
+            defer_changes(changes)
+        else:
+            report_changes(changes)
+
+    # Save the run report and Prometheus metrics to the state directory
+    metrics.write_run_report()
+
+    if failures:
+        logging.error(
+            f"Pipeline failed for: {', '.join(failures)}; skipped the remaining stages"
+        )
+        sys.exit(1)
 
 
 if __name__ == "__main__":
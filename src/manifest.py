@@ -0,0 +1,259 @@
+import config
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+from file_ops import get_compressed_file_name, get_state_directory, open_data_file
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def load_manifest() -> Dict[str, Any]:
+    """
+    Load the manifest of the previous run from the state directory.
+
+    The manifest records the content hash of the collected files ('inputs')
+    each resource was transformed from, the content hash, size and row count of
+    every published file ('resources'), the hash of what the dataset
+    metadata was generated from ('metadata'), and the changes of failed runs
+    that have not been reported yet ('unreported').
+
+    Returns:
+        Dict[str, Any]: The manifest, empty if there was no previous run.
+    """
+    manifest_path = os.path.join(get_state_directory(), config.MANIFEST_FILE)
+    manifest: Dict[str, Any] = {
+        "inputs": {},
+        "resources": {},
+        "metadata": {},
+        "unreported": [],
+    }
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            manifest.update(json.load(f))
+
+    return manifest
+
+
+def save_manifest(manifest: Dict[str, Any]) -> None:
+    """
+    Save the manifest of this run to the state directory.
+
+    Parameters:
+        manifest (Dict[str, Any]): The manifest.
+    """
+    manifest_path = os.path.join(get_state_directory(), config.MANIFEST_FILE)
+
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+
+def get_resource_paths() -> Dict[str, Optional[str]]:
+    """
+    Get every file published with the dataset and its compression.
+
+    These are the resources of config.KAGGLE_METADATA and the typed columnar
+    copies of its CSV resources, by their uncompressed path.
+
+    Returns:
+        Dict[str, Optional[str]]: The compression of each resource, or None, keyed by path.
+    """
+    resource_paths: Dict[str, Optional[str]] = {}
+    for resource in config.KAGGLE_METADATA["resources"]:
+        resource_paths[resource["path"]] = resource.get("compression")
+        if resource["path"].endswith(".csv"):
+            for output_format in config.COLUMNAR_OUTPUT_FORMATS:
+                resource_paths[
+                    resource["path"].replace(".csv", f".{output_format}")
+                ] = None
+
+    return resource_paths
+
+
+def get_published_file_names() -> List[str]:
+    """
+    Get the names of the files a run publishes in the data directory.
+
+    Returns:
+        List[str]: The published (compressed) resource file names and the metadata file.
+    """
+    file_names = [
+        get_compressed_file_name(path, compression)
+        for path, compression in get_resource_paths().items()
+    ]
+    return file_names + [os.path.basename(config.METADATA_FILE)]
+
+
+def find_resource_file(
+    abs_data_dir: str, path: str, compression: Optional[str]
+) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Find the file of a resource, which may currently be stored compressed or not.
+
+    Parameters:
+        abs_data_dir (str): The absolute path of the data directory.
+        path (str): The uncompressed path of the resource (e.g., 'bank_failures.csv').
+        compression (Optional[str]): The compression the resource is published with.
+
+    Returns:
+        Optional[Tuple[str, Optional[str]]]: The full path of the file and its compression, or None if it is missing.
+    """
+    if compression:
+        compressed_path = os.path.join(
+            abs_data_dir, get_compressed_file_name(path, compression)
+        )
+        if os.path.exists(compressed_path):
+            return compressed_path, compression
+
+    file_path = os.path.join(abs_data_dir, path)
+    if os.path.exists(file_path):
+        return file_path, None
+
+    return None
+
+
+def describe_file(
+    file_path: str,
+    compression: Optional[str] = None,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Describe the content of a resource file.
+
+    The hash and size are those of the uncompressed content, so they do not
+    depend on how the file is stored. The previous description is reused when
+    the file's size and modification time did not change.
+
+    Parameters:
+        file_path (str): The full path of the file.
+        compression (Optional[str]): The compression of the file, or None.
+        previous (Optional[Dict[str, Any]]): The description of the file in the previous manifest.
+
+    Returns:
+        Dict[str, Any]: The 'sha256' and 'bytes' of the content, its 'rows' if it is a CSV file, and the 'file_size' and 'mtime_ns' of the file. # noqa E501
+    """
+    stat = os.stat(file_path)
+    if (
+        previous
+        and previous.get("file_size") == stat.st_size
+        and previous.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return previous
+
+    digest = hashlib.sha256()
+    content_bytes = 0
+    with open_data_file(file_path, compression) as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+            content_bytes += len(chunk)
+
+    rows = None
+    if file_path.endswith(".csv") or ".csv." in os.path.basename(file_path):
+        with open_data_file(file_path, compression) as f:
+            reader = csv.reader(io.TextIOWrapper(f, encoding="utf-8", newline=""))
+            rows = max(0, sum(1 for _ in reader) - 1)
+
+    return {
+        "sha256": digest.hexdigest(),
+        "bytes": content_bytes,
+        "rows": rows,
+        "file_size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def is_resource_intact(abs_data_dir: str, path: str, manifest: Dict[str, Any]) -> bool:
+    """
+    Check whether a resource is stored with the content recorded in the manifest.
+
+    Parameters:
+        abs_data_dir (str): The absolute path of the data directory.
+        path (str): The uncompressed path of the resource (e.g., 'bank_failures.csv').
+        manifest (Dict[str, Any]): The manifest of the previous run.
+
+    Returns:
+        bool: True if the resource exists with the recorded content hash.
+    """
+    record = manifest["resources"].get(path)
+    found = find_resource_file(abs_data_dir, path, get_resource_paths().get(path))
+    if record is None or found is None:
+        return False
+
+    return describe_file(*found, previous=record)["sha256"] == record["sha256"]
+
+
+def update_resources(abs_data_dir: str, manifest: Dict[str, Any]) -> List[str]:
+    """
+    Record the current content of every resource in the manifest.
+
+    Parameters:
+        abs_data_dir (str): The absolute path of the data directory.
+        manifest (Dict[str, Any]): The manifest of the previous run, updated in place.
+
+    Returns:
+        List[str]: The resources whose content changed, appeared or disappeared since the previous run.
+    """
+    previous_resources = manifest["resources"]
+    resources = {}
+    for path, compression in get_resource_paths().items():
+        found = find_resource_file(abs_data_dir, path, compression)
+        if found is not None:
+            resources[path] = describe_file(
+                *found, previous=previous_resources.get(path)
+            )
+
+    manifest["resources"] = resources
+    return sorted(
+        path
+        for path in resources.keys() | previous_resources.keys()
+        if resources.get(path, {}).get("sha256")
+        != previous_resources.get(path, {}).get("sha256")
+    )
+
+
+def defer_changes(changed: List[str]) -> None:
+    """
+    Keep the changes of a failed run, to be reported by the next run.
+
+    Parameters:
+        changed (List[str]): The files that changed.
+    """
+    manifest = load_manifest()
+    manifest["unreported"] = sorted(set(manifest["unreported"]) | set(changed))
+    save_manifest(manifest)
+
+    logging.warning(
+        f"Run failed; {len(manifest['unreported'])} changed files are left to report"
+    )
+
+
+def report_changes(changed: List[str]) -> None:
+    """
+    Report whether the dataset changed since the previous run.
+
+    The changes kept by failed runs since the last report are included. In
+    GitHub Actions, the result is also written to the step's outputs as
+    `changed=true` or `changed=false`, so that publishing can be skipped.
+
+    Parameters:
+        changed (List[str]): The files that changed.
+    """
+    manifest = load_manifest()
+    changed = sorted(set(manifest["unreported"]) | set(changed))
+
+    if changed:
+        logging.info(f"Dataset changed: {', '.join(changed)}")
+    else:
+        logging.info("No changes: the dataset is identical to the previous run.")
+
+    github_output = os.environ.get("GITHUB_OUTPUT")
+    if github_output:
+        with open(github_output, "a") as f:
+            f.write(f"changed={'true' if changed else 'false'}\n")
+
+    if manifest["unreported"]:
+        manifest["unreported"] = []
+        save_manifest(manifest)
@@ -0,0 +1,342 @@
+import config
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from file_ops import get_state_directory
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_lock = threading.Lock()
+_run_started = time.time()
+_stages: Dict[str, Dict[str, float]] = {}
+_endpoints: Dict[str, Dict[str, Any]] = {}
+_rows: Dict[Tuple[str, str], Dict[str, int]] = {}
+_rate_limit: Dict[str, float] = {"waits": 0, "wait_seconds": 0.0, "throttled": 0}
+
+
+def reset() -> None:
+    """Discard every metric recorded so far and start a new run."""
+    global _run_started
+
+    with _lock:
+        _run_started = time.time()
+        _stages.clear()
+        _endpoints.clear()
+        _rows.clear()
+        _rate_limit.update(waits=0, wait_seconds=0.0, throttled=0)
+
+
+def get_peak_rss_bytes() -> int:
+    """
+    Get the peak resident set size of this process and its finished children.
+
+    Returns:
+        int: The peak resident set size, in bytes.
+    """
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Record the wall time and peak memory of a pipeline stage.
+
+    Parameters:
+        name (str): The name of the stage (e.g., 'collection').
+
+    Example:
+    >>> with stage("collection"):
+    ...     rows = sum(range(1000))
+    >>> "collection" in get_run_report()["stages"]
+    True
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall_seconds = time.perf_counter() - start
+        with _lock:
+            _stages[name] = {
+                "wall_seconds": wall_seconds,
+                "peak_rss_bytes": get_peak_rss_bytes(),
+            }
+        logging.info(f"Stage {name} took {wall_seconds:.2f}s")
+
+
+def _get_endpoint(endpoint: str) -> Dict[str, Any]:
+    """Return the metrics of an endpoint, creating them on first use. Requires _lock."""
+    if endpoint not in _endpoints:
+        _endpoints[endpoint] = {
+            "wall_seconds": 0.0,
+            "success": None,
+            "requests": 0,
+            "failed_requests": 0,
+            "retries": 0,
+            "bytes": 0,
+            "latency_sum": 0.0,
+            "latency_buckets": [0] * len(config.REQUEST_LATENCY_BUCKETS),
+        }
+    return _endpoints[endpoint]
+
+
+def observe_request(
+    endpoint: str, seconds: float, size: int, retries: int, success: bool
+) -> None:
+    """
+    Record an API request.
+
+    Parameters:
+        endpoint (str): The endpoint of the request (e.g., '/api/failures').
+        seconds (float): The latency of the request's final attempt, in seconds.
+        size (int): The number of bytes downloaded.
+        retries (int): The number of retries before the final response.
+        success (bool): Whether the final response was successful.
+    """
+    with _lock:
+        metrics = _get_endpoint(endpoint)
+        metrics["requests"] += 1
+        metrics["failed_requests"] += 0 if success else 1
+        metrics["retries"] += retries
+        metrics["bytes"] += size
+        metrics["latency_sum"] += seconds
+        for i, bound in enumerate(config.REQUEST_LATENCY_BUCKETS):
+            if seconds <= bound:
+                metrics["latency_buckets"][i] += 1
+
+
+def observe_endpoint(endpoint: str, seconds: float, success: bool) -> None:
+    """
+    Record the collection of an endpoint.
+
+    Parameters:
+        endpoint (str): The collected endpoint (e.g., '/api/failures').
+        seconds (float): The wall time of the endpoint's collection pipeline, in seconds.
+        success (bool): Whether the collection succeeded.
+    """
+    with _lock:
+        metrics = _get_endpoint(endpoint)
+        metrics["wall_seconds"] += seconds
+        metrics["success"] = success
+
+
+def observe_rate_limit_wait(seconds: float) -> None:
+    """
+    Record a request held back by the rate limiter.
+
+    Parameters:
+        seconds (float): The time the request waited, in seconds.
+    """
+    with _lock:
+        _rate_limit["waits"] += 1
+        _rate_limit["wait_seconds"] += seconds
+
+
+def observe_throttled_response() -> None:
+    """Record a 429 response of the API."""
+    with _lock:
+        _rate_limit["throttled"] += 1
+
+
+def add_rows(stage: str, dataset: str, rows_in: int, rows_out: int) -> None:
+    """
+    Record the rows a stage read and wrote for a dataset.
+
+    Parameters:
+        stage (str): The name of the stage (e.g., 'transformation').
+        dataset (str): The file the rows belong to (e.g., 'bank_failures.csv').
+        rows_in (int): The number of rows read.
+        rows_out (int): The number of rows written.
+    """
+    with _lock:
+        rows = _rows.setdefault((stage, dataset), {"rows_in": 0, "rows_out": 0})
+        rows["rows_in"] += rows_in
+        rows["rows_out"] += rows_out
+
+
+def get_run_report() -> Dict[str, Any]:
+    """
+    Build the report of the metrics recorded in this run.
+
+    Returns:
+        Dict[str, Any]: The JSON serializable run report.
+    """
+    with _lock:
+        endpoints = {}
+        for endpoint, metrics in _endpoints.items():
+            endpoint_report = {
+                key: value
+                for key, value in metrics.items()
+                if key not in ("latency_sum", "latency_buckets")
+            }
+            endpoint_report["latency"] = {
+                "count": metrics["requests"],
+                "sum_seconds": metrics["latency_sum"],
+                "buckets": {
+                    str(bound): count
+                    for bound, count in zip(
+                        config.REQUEST_LATENCY_BUCKETS, metrics["latency_buckets"]
+                    )
+                },
+            }
+            endpoints[endpoint] = endpoint_report
+
+        return {
+            "started_at": _run_started,
+            "finished_at": time.time(),
+            "peak_rss_bytes": get_peak_rss_bytes(),
+            "stages": {name: dict(metrics) for name, metrics in _stages.items()},
+            "endpoints": endpoints,
+            "rate_limit": dict(_rate_limit),
+            "rows": [
+                {"stage": stage, "dataset": dataset, **rows}
+                for (stage, dataset), rows in _rows.items()
+            ],
+        }
+
+
+def _labels(**labels: str) -> str:
+    """Format Prometheus labels, escaping their values."""
+    pairs = []
+    for key, value in labels.items():
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{key}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_prometheus(report: Dict[str, Any]) -> str:
+    """
+    Format a run report in the Prometheus text exposition format.
+
+    Parameters:
+        report (Dict[str, Any]): A run report from get_run_report.
+
+    Returns:
+        str: The metrics, for the node_exporter textfile collector.
+    """
+    lines: List[str] = []
+
+    def metric(name: str, metric_type: str, help_text: str) -> None:
+        lines.append(f"# HELP fdic_pipeline_{name} {help_text}")
+        lines.append(f"# TYPE fdic_pipeline_{name} {metric_type}")
+
+    metric("last_run_timestamp_seconds", "gauge", "End of the last run.")
+    lines.append(f"fdic_pipeline_last_run_timestamp_seconds {report['finished_at']}")
+    metric("peak_rss_bytes", "gauge", "Peak resident set size of the run.")
+    lines.append(f"fdic_pipeline_peak_rss_bytes {report['peak_rss_bytes']}")
+
+    metric("stage_duration_seconds", "gauge", "Wall time of each pipeline stage.")
+    for name, stage_metrics in report["stages"].items():
+        lines.append(
+            f"fdic_pipeline_stage_duration_seconds{_labels(stage=name)} {stage_metrics['wall_seconds']}"
+        )
+    metric("stage_peak_rss_bytes", "gauge", "Peak resident set size by stage end.")
+    for name, stage_metrics in report["stages"].items():
+        lines.append(
+            f"fdic_pipeline_stage_peak_rss_bytes{_labels(stage=name)} {stage_metrics['peak_rss_bytes']}"
+        )
+
+    endpoints = report["endpoints"]
+    metric("endpoint_duration_seconds", "gauge", "Wall time of each endpoint.")
+    for endpoint, endpoint_metrics in endpoints.items():
+        lines.append(
+            f"fdic_pipeline_endpoint_duration_seconds{_labels(endpoint=endpoint)} {endpoint_metrics['wall_seconds']}"
+        )
+    metric("endpoint_success", "gauge", "Whether each endpoint was collected.")
+    for endpoint, endpoint_metrics in endpoints.items():
+        if endpoint_metrics["success"] is not None:
+            lines.append(
+                f"fdic_pipeline_endpoint_success{_labels(endpoint=endpoint)} {int(endpoint_metrics['success'])}"
+            )
+    for name, key, help_text in (
+        ("requests_total", "requests", "API requests sent."),
+        ("failed_requests_total", "failed_requests", "API requests that failed."),
+        ("retries_total", "retries", "Retries of API requests."),
+        ("downloaded_bytes_total", "bytes", "Bytes downloaded from the API."),
+    ):
+        metric(name, "counter", help_text)
+        for endpoint, endpoint_metrics in endpoints.items():
+            lines.append(
+                f"fdic_pipeline_{name}{_labels(endpoint=endpoint)} {endpoint_metrics[key]}"
+            )
+
+    metric("request_duration_seconds", "histogram", "Latency of API requests.")
+    for endpoint, endpoint_metrics in endpoints.items():
+        latency = endpoint_metrics["latency"]
+        for bound, count in latency["buckets"].items():
+            lines.append(
+                f"fdic_pipeline_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=bound)} {count}"
+            )
+        lines.append(
+            f"fdic_pipeline_request_duration_seconds_bucket{_labels(endpoint=endpoint, le='+Inf')} {latency['count']}"
+        )
+        lines.append(
+            f"fdic_pipeline_request_duration_seconds_sum{_labels(endpoint=endpoint)} {latency['sum_seconds']}"
+        )
+        lines.append(
+            f"fdic_pipeline_request_duration_seconds_count{_labels(endpoint=endpoint)} {latency['count']}"
+        )
+
+    for name, key, help_text in (
+        ("rate_limit_waits_total", "waits", "Requests held back by the rate limiter."),
+        (
+            "rate_limit_wait_seconds_total",
+            "wait_seconds",
+            "Time requests waited for the rate limiter.",
+        ),
+        ("throttled_responses_total", "throttled", "429 responses of the API."),
+    ):
+        metric(name, "counter", help_text)
+        lines.append(f"fdic_pipeline_{name} {report['rate_limit'][key]}")
+
+    for name, key, help_text in (
+        ("rows_in_total", "rows_in", "Rows read by each stage."),
+        ("rows_out_total", "rows_out", "Rows written by each stage."),
+    ):
+        metric(name, "counter", help_text)
+        for rows in report["rows"]:
+            lines.append(
+                f"fdic_pipeline_{name}{_labels(stage=rows['stage'], dataset=rows['dataset'])} {rows[key]}"
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def write_run_report(state_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Write the run report as JSON and as a Prometheus textfile.
+
+    Both files are replaced atomically so that a collector never reads a
+    partially written report.
+
+    Parameters:
+        state_dir (Optional[str]): The directory to write to. Defaults to the state directory.
+
+    Returns:
+        Dict[str, Any]: The run report.
+    """
+    state_dir = state_dir or get_state_directory()
+    report = get_run_report()
+
+    outputs = (
+        (config.RUN_REPORT_FILE, json.dumps(report, indent=4)),
+        (config.METRICS_TEXTFILE, format_prometheus(report)),
+    )
+    for file_name, content in outputs:
+        path = os.path.join(state_dir, file_name)
+        with open(f"{path}.tmp", "w") as f:
+            f.write(content)
+        os.replace(f"{path}.tmp", path)
+
+    logging.info(
+        f"Saved run report to {os.path.join(state_dir, config.RUN_REPORT_FILE)}"
+    )
+    return report
@@ -0,0 +1,202 @@
+import config
+import json
+import logging
+import os
+import threading
+from file_ops import get_state_directory
+from typing import Dict, Optional
+
+# Endpoints save their page sizes concurrently
+_page_sizes_lock = threading.Lock()
+
+
+class PageLimitError(Exception):
+    """Exception raised when the API rejects or times out on the requested page size."""
+
+    def __init__(self, message: str, limit: int) -> None:
+        super().__init__(message)
+        self.limit = limit
+
+
+class PageSizeController:
+    """
+    Tune the page size of a paginated endpoint with additive increase, multiplicative decrease.
+
+    Every page served within the latency and size targets grows the limit by
+    `step`; a slow or large page shrinks it by `decrease`. A rejected limit or a
+    timeout also shrinks it and caps it below the failed value. After
+    `probe_after` pages in a row within the targets the cap is lifted again, so
+    a transient failure does not hold the page size down for the rest of the
+    download. The best page size is the largest one served within the targets,
+    and is what the next download of the endpoint starts with. The controller is
+    shared by the concurrent page requests of a download.
+
+    Parameters:
+        initial (int): The first page size.
+        min_limit (int): The smallest page size.
+        max_limit (int): The largest page size.
+        adaptive (bool): Tune the page size; otherwise it stays at `initial`.
+        step (int): The increase of the page size after a page within the targets.
+        decrease (float): The factor the page size is multiplied by after a failed, slow or large page.
+        target_latency (float): The latency above which a page is too slow, in seconds.
+        max_bytes (int): The response size above which a page is too large, in bytes.
+        probe_after (int): The number of pages in a row within the targets after which a cap is lifted.
+        schedule (Optional[Dict[int, int]]): Fixed page sizes by offset, e.g. of pages in the cache; other offsets use the tuned page size. # noqa E501
+
+    Example:
+    >>> controller = PageSizeController(5000)
+    >>> controller.observe(5000, 1.2, 4 * 1024 * 1024)
+    >>> controller.limit
+    6000
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = config.PAGE_SIZE_MIN,
+        max_limit: int = config.PAGE_SIZE_MAX,
+        adaptive: bool = True,
+        step: int = config.PAGE_SIZE_STEP,
+        decrease: float = config.PAGE_SIZE_DECREASE,
+        target_latency: float = config.PAGE_TARGET_LATENCY,
+        max_bytes: int = config.PAGE_MAX_BYTES,
+        probe_after: int = config.PAGE_SIZE_PROBE_AFTER,
+        schedule: Optional[Dict[int, int]] = None,
+    ) -> None:
+        self.adaptive = adaptive
+        self.min_limit = min(min_limit, initial)
+        self.max_limit = max_limit if adaptive else initial
+        # The largest page size, which caps after a failure are lifted back to
+        self.ceiling = self.max_limit
+        self.probe_after = probe_after
+        # Pages in a row within the targets since the last failed, slow or large page
+        self.successes = 0
+        self.limit = max(self.min_limit, min(initial, self.max_limit))
+        self.step = step
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.best: Optional[int] = None
+        self.schedule = schedule or {}
+        self._lock = threading.Lock()
+
+    def limit_at(self, offset: int) -> int:
+        """
+        Get the page size of the page starting at an offset.
+
+        Parameters:
+            offset (int): The offset of the first record of the page.
+
+        Returns:
+            int: The scheduled page size of the offset, or the current page size.
+        """
+        return self.schedule.get(offset, self.limit)
+
+    def _shrink(self, limit: int) -> None:
+        """Multiply the page size down from `limit`. Requires _lock."""
+        self.limit = min(self.limit, max(self.min_limit, int(limit * self.decrease)))
+
+    def observe(self, limit: int, seconds: float, size: int) -> None:
+        """
+        Adjust the page size after a successful page.
+
+        Parameters:
+            limit (int): The page size of the request.
+            seconds (float): The latency of the request, in seconds.
+            size (int): The size of the response body, in bytes.
+        """
+        if not self.adaptive:
+            return
+
+        with self._lock:
+            if seconds > self.target_latency or size > self.max_bytes:
+                self.successes = 0
+                self._shrink(limit)
+                if self.best is not None and self.best >= limit:
+                    self.best = self.limit
+                logging.info(
+                    f"Page of {limit} records took {seconds:.1f}s and {size} bytes, lowered page size to {self.limit}"
+                )
+            else:
+                self.best = max(self.best or 0, limit)
+                self.successes += 1
+                if self.max_limit < self.ceiling and self.successes >= self.probe_after:
+                    self.max_limit = self.ceiling
+                    self.successes = 0
+                    logging.info(
+                        f"{self.probe_after} pages within targets, probing page sizes up to {self.ceiling} again"
+                    )
+                if limit >= self.limit:
+                    # Only full-size pages are evidence that a larger page is fine
+                    self.limit = min(self.max_limit, self.limit + self.step)
+
+    def reject(self, limit: int) -> bool:
+        """
+        Shrink the page size after the API rejected or timed out on a page.
+
+        Parameters:
+            limit (int): The page size of the failed request.
+
+        Returns:
+            bool: True if the page can be requested again with a smaller size.
+        """
+        if not self.adaptive:
+            return False
+
+        with self._lock:
+            if limit <= self.min_limit:
+                return False
+            if self.best is not None and self.best >= limit:
+                self.best = None
+            self.successes = 0
+            self.max_limit = min(self.max_limit, max(self.min_limit, limit - 1))
+            self._shrink(limit)
+            logging.warning(
+                f"Page of {limit} records failed, lowered page size to {self.limit}"
+            )
+            return True
+
+
+def load_page_size(endpoint: str) -> Optional[int]:
+    """
+    Load the page size remembered for an endpoint.
+
+    Parameters:
+        endpoint (str): The API endpoint (e.g., '/api/failures').
+
+    Returns:
+        Optional[int]: The last page size of the endpoint, or None if none is remembered.
+    """
+    page_sizes_path = os.path.join(get_state_directory(), config.PAGE_SIZES_FILE)
+
+    if not os.path.exists(page_sizes_path):
+        return None
+
+    with open(page_sizes_path, "r") as f:
+        page_sizes = json.load(f)
+
+    return page_sizes.get(endpoint)
+
+
+def save_page_size(endpoint: str, limit: int) -> None:
+    """
+    Remember the page size of an endpoint for the next run.
+
+    Parameters:
+        endpoint (str): The API endpoint (e.g., '/api/failures').
+        limit (int): The page size to start the next download of the endpoint with.
+    """
+    page_sizes_path = os.path.join(get_state_directory(), config.PAGE_SIZES_FILE)
+
+    with _page_sizes_lock:
+        page_sizes = {}
+        if os.path.exists(page_sizes_path):
+            with open(page_sizes_path, "r") as f:
+                page_sizes = json.load(f)
+
+        page_sizes[endpoint] = limit
+
+        with open(page_sizes_path, "w") as f:
+            json.dump(page_sizes, f, indent=4)
+
+    logging.info(f"Stored {endpoint} page size {limit}")
@@ -0,0 +1,207 @@
+import config
+import csv
+import io
+import logging
+import metrics
+import os
+import sqlite3
+import time
+from column_stats import get_column_statistics, parse_date
+from file_ops import get_file_hash, open_data_file
+from itertools import islice
+from manifest import find_resource_file, get_resource_paths
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+def to_integer(value: str) -> int:
+    """Convert a CSV value of an integer column, e.g. '10' or '10.0'."""
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
+
+
+# SQLite column type of each inferred column type, with the conversion of its values
+SQLITE_TYPES: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "integer": ("INTEGER", to_integer),
+    "numeric": ("REAL", float),
+    "datetime": ("TEXT", parse_date),
+    "string": ("TEXT", str),
+}
+
+
+def get_store_path(db_path: str = config.SQLITE_DB_PATH) -> str:
+    """
+    Get the path of the SQLite database.
+
+    Parameters:
+        db_path (str): The path of the database relative to the script's directory.
+
+    Returns:
+        str: The full path of the database.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    return os.path.join(script_dir, db_path)
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or column name for SQLite."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def iter_rows(
+    file_path: str,
+    compression: Optional[str],
+    converters: List[Callable[[str], Any]],
+) -> Iterator[Tuple[Any, ...]]:
+    """
+    Stream the rows of a CSV file as SQLite values.
+
+    Parameters:
+        file_path (str): The full path of the CSV file.
+        compression (Optional[str]): The compression of the file, "gzip" or "zstd", or None.
+        converters (List[Callable[[str], Any]]): The conversion of the values of each column.
+
+    Returns:
+        Iterator[Tuple[Any, ...]]: The rows, with None for empty values.
+    """
+    width = len(converters)
+    with open_data_file(file_path, compression) as raw_file:
+        reader = csv.reader(io.TextIOWrapper(raw_file, encoding="utf-8", newline=""))
+        next(reader, None)
+        for row in reader:
+            row = row[:width] + [""] * (width - len(row))
+            yield tuple(
+                convert(value) if value != "" else None
+                for convert, value in zip(converters, row)
+            )
+
+
+def load_table(
+    connection: sqlite3.Connection,
+    table: str,
+    file_path: str,
+    compression: Optional[str] = None,
+    batch_rows: int = config.SQLITE_BATCH_ROWS,
+    index_columns: List[str] = config.SQLITE_INDEX_COLUMNS,
+) -> int:
+    """
+    Replace a table with the rows of a CSV file.
+
+    Column types come from the file's column statistics, dates are stored as
+    YYYY-MM-DD text so that they sort and compare, and the configured columns
+    are indexed once the rows are loaded. The caller owns the transaction.
+
+    Parameters:
+        connection (sqlite3.Connection): The database connection, in a transaction.
+        table (str): The name of the table (e.g., 'bank_failures').
+        file_path (str): The full path of the CSV file.
+        compression (Optional[str]): The compression of the file, "gzip" or "zstd", or None.
+        batch_rows (int): The number of rows inserted per executemany call.
+        index_columns (List[str]): The columns to index when the table has them.
+
+    Returns:
+        int: The number of rows loaded.
+    """
+    columns = get_column_statistics(file_path, compression)["columns"]
+    sqlite_types = [SQLITE_TYPES[column["type"]] for column in columns.values()]
+
+    quoted_table = quote_identifier(table)
+    connection.execute(f"DROP TABLE IF EXISTS {quoted_table}")
+    column_definitions = ", ".join(
+        f"{quote_identifier(name)} {sqlite_type}"
+        for name, (sqlite_type, _) in zip(columns, sqlite_types)
+    )
+    connection.execute(f"CREATE TABLE {quoted_table} ({column_definitions})")
+
+    insert = f"INSERT INTO {quoted_table} VALUES ({', '.join('?' for _ in columns)})"
+    rows = iter_rows(file_path, compression, [convert for _, convert in sqlite_types])
+    loaded = 0
+    while True:
+        batch = list(islice(rows, batch_rows))
+        if not batch:
+            break
+        connection.executemany(insert, batch)
+        loaded += len(batch)
+
+    # Indexes are built once over the loaded rows rather than maintained per insert
+    for column in index_columns:
+        if column in columns:
+            connection.execute(
+                f"CREATE INDEX {quote_identifier(f'{table}_{column}')} "
+                f"ON {quoted_table} ({quote_identifier(column)})"
+            )
+
+    return loaded
+
+
+def run_store_pipeline(
+    abs_data_dir: str, db_path: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Load every CSV resource of the data directory into the SQLite database.
+
+    Each dataset becomes a table named after its file. Only the datasets whose
+    content changed since they were loaded are reloaded, and tables of datasets
+    that are no longer published are dropped, all in a single transaction.
+
+    Parameters:
+        abs_data_dir (str): The absolute path of the data directory.
+        db_path (Optional[str]): The full path of the database. Defaults to config.SQLITE_DB_PATH.
+
+    Returns:
+        Dict[str, int]: The number of rows loaded into each reloaded table, keyed by table name.
+    """
+    db_path = db_path or get_store_path()
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    loaded: Dict[str, int] = {}
+
+    try:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS _datasets "
+            "(name TEXT PRIMARY KEY, sha256 TEXT, rows INTEGER, loaded_at REAL)"
+        )
+        loaded_hashes = dict(connection.execute("SELECT name, sha256 FROM _datasets"))
+
+        datasets = {}
+        for path, compression in get_resource_paths().items():
+            found = find_resource_file(abs_data_dir, path, compression)
+            if path.endswith(".csv") and found is not None:
+                datasets[path.rsplit(".", 1)[0]] = found
+
+        connection.execute("BEGIN")
+        for table in loaded_hashes.keys() - datasets.keys():
+            connection.execute(f"DROP TABLE IF EXISTS {quote_identifier(table)}")
+            connection.execute("DELETE FROM _datasets WHERE name = ?", (table,))
+            logging.info(f"Dropped {table} from the SQLite store")
+
+        for table, (file_path, compression) in datasets.items():
+            content_hash = get_file_hash(file_path)
+            if loaded_hashes.get(table) == content_hash:
+                logging.info(f"{table} unchanged, kept its SQLite table")
+                continue
+
+            rows = load_table(connection, table, file_path, compression)
+            connection.execute(
+                "INSERT OR REPLACE INTO _datasets VALUES (?, ?, ?, ?)",
+                (table, content_hash, rows, time.time()),
+            )
+            metrics.add_rows("store", os.path.basename(file_path), rows, rows)
+            loaded[table] = rows
+            logging.info(f"Loaded {rows} rows into the {table} SQLite table")
+
+        connection.execute("COMMIT")
+
+        if loaded:
+            # Refresh the query planner's statistics once the tables are loaded
+            connection.execute("ANALYZE")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+    logging.info(f"SQLite store {db_path} is up to date")
+    return loaded
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+# The pipeline modules import each other as top-level modules from src/
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import column_stats  # noqa: E402
+import file_ops  # noqa: E402
+import http_cache  # noqa: E402
+import manifest  # noqa: E402
+import metrics  # noqa: E402
+import page_size  # noqa: E402
+
+# Modules that imported get_state_directory by name
+STATE_DIRECTORY_USERS = [
+    column_stats,
+    file_ops,
+    http_cache,
+    manifest,
+    metrics,
+    page_size,
+]
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    """Keep the pipeline state of a test in its own directory."""
+    path = str(tmp_path / ".pipeline")
+
+    def get_state_directory(state_dir=path):
+        return file_ops.setup_directory(state_dir)
+
+    for module in STATE_DIRECTORY_USERS:
+        monkeypatch.setattr(module, "get_state_directory", get_state_directory)
+    # The page cache size is tracked per process
+    monkeypatch.setattr(http_cache, "_page_cache_bytes", None)
+
+    return path
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Collect the data of a test in its own directory."""
+    import api_utils
+
+    path = file_ops.setup_directory(str(tmp_path / "data"))
+    monkeypatch.setattr(api_utils, "get_data_directory", lambda: path)
+
+    return path
+
+
+@pytest.fixture
+def fdic_server():
+    """Serve 55 bank failures from the stand-in FDIC API."""
+    from fake_fdic_server import FakeFDICServer
+
+    server = FakeFDICServer(rows={"/api/failures": 55}).start()
+    yield server
+    server.stop()
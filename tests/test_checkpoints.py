@@ -0,0 +1,127 @@
+import json
+import os
+
+import api_utils
+import file_ops
+from data_transform import CsvPageWriter, JsonArrayWriter
+
+fetch_page = api_utils._fetch_page
+
+
+def read_records(path):
+    with open(path, "r") as f:
+        return [record["data"]["ID"] for record in json.load(f)]
+
+
+def fail_from_offset(monkeypatch, failing_offset):
+    """Make every page at or after `failing_offset` fail, recording the requested offsets."""
+    offsets = []
+
+    def _fetch_page(url, params, offset, *args, **kwargs):
+        offsets.append(offset)
+        if failing_offset is not None and offset >= failing_offset:
+            return None
+        return fetch_page(url, params, offset, *args, **kwargs)
+
+    monkeypatch.setattr(api_utils, "_fetch_page", _fetch_page)
+    return offsets
+
+
+def download(server):
+    return api_utils.download_files_with_pagination(
+        server.base_url,
+        "/api/failures",
+        {"filename": "bank_failures"},
+        limit=10,
+        max_workers=1,
+        adaptive=False,
+    )
+
+
+def test_checkpoint_of_another_request_is_discarded(state_dir):
+    with open(file_ops.get_checkpoint_partial_path("bank_failures.json"), "w") as f:
+        f.write("[")
+    file_ops.save_checkpoint("bank_failures.json", {"key": "a", "offset": 10})
+
+    assert file_ops.load_checkpoint("bank_failures.json", "b") is None
+    # The partial output of the discarded checkpoint is removed with it
+    assert not os.path.exists(
+        file_ops.get_checkpoint_partial_path("bank_failures.json")
+    )
+
+
+def test_expired_checkpoint_is_discarded(state_dir):
+    with open(file_ops.get_checkpoint_partial_path("bank_failures.json"), "w") as f:
+        f.write("[")
+    file_ops.save_checkpoint("bank_failures.json", {"key": "a", "offset": 10})
+
+    assert file_ops.load_checkpoint("bank_failures.json", "a")["offset"] == 10
+    assert file_ops.load_checkpoint("bank_failures.json", "a", max_age=-1) is None
+
+
+def test_json_writer_resumes_after_its_checkpoint(tmp_path):
+    destination_path = str(tmp_path / "bank_failures.json")
+    writer = JsonArrayWriter(destination_path)
+    writer.write_records([{"data": {"ID": 1}}, {"data": {"ID": 2}}])
+    checkpoint = writer.checkpoint()
+    # Records written after the checkpoint are lost with the interruption
+    writer.write_records([{"data": {"ID": 3}}])
+    writer.abort()
+
+    with JsonArrayWriter(destination_path, resume=checkpoint) as writer:
+        writer.write_records([{"data": {"ID": 3}}, {"data": {"ID": 4}}])
+
+    assert read_records(destination_path) == [1, 2, 3, 4]
+
+
+def test_csv_writer_resumes_after_its_checkpoint(tmp_path):
+    destination_path = str(tmp_path / "bank_failures.csv")
+    writer = CsvPageWriter(destination_path)
+    writer.write_records([{"data": {"ID": 1, "NAME": "a"}}])
+    checkpoint = writer.checkpoint()
+    writer.write_records([{"data": {"ID": 2, "NAME": "b"}}])
+    writer.abort()
+
+    with CsvPageWriter(destination_path, resume=checkpoint) as writer:
+        writer.write_records([{"data": {"NAME": "b", "ID": 2}}])
+
+    with open(destination_path, "r") as f:
+        assert f.read().splitlines() == ["ID,NAME", "1,a", "2,b"]
+
+
+def test_interrupted_download_resumes_at_its_last_page(
+    state_dir, data_dir, fdic_server, monkeypatch
+):
+    offsets = fail_from_offset(monkeypatch, 30)
+    assert not download(fdic_server)
+    assert not os.path.exists(os.path.join(data_dir, "bank_failures.json"))
+    with open(
+        os.path.join(file_ops.get_checkpoint_directory(), "bank_failures.json.json")
+    ) as f:
+        assert json.load(f)["offset"] == 30
+
+    offsets = fail_from_offset(monkeypatch, None)
+    assert download(fdic_server)
+
+    # Only the pages after the last checkpoint are requested again
+    assert offsets == [30, 40, 50]
+    assert read_records(os.path.join(data_dir, "bank_failures.json")) == [
+        str(i) for i in range(1, 56)
+    ]
+    assert os.listdir(file_ops.get_checkpoint_directory()) == []
+
+
+def test_resumed_download_restarts_when_the_total_changed(
+    state_dir, data_dir, fdic_server, monkeypatch
+):
+    fail_from_offset(monkeypatch, 30)
+    assert not download(fdic_server)
+
+    fdic_server.rows["/api/failures"] = 60
+    offsets = fail_from_offset(monkeypatch, None)
+    assert download(fdic_server)
+
+    assert offsets[0] == 30 and offsets[1:] == [0, 10, 20, 30, 40, 50]
+    assert read_records(os.path.join(data_dir, "bank_failures.json")) == [
+        str(i) for i in range(1, 61)
+    ]
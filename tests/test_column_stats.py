@@ -0,0 +1,65 @@
+import csv
+
+import pytest
+
+import column_stats
+from column_stats import HyperLogLog, get_column_statistics
+
+
+@pytest.mark.parametrize("distinct", [10, 1000, 100000])
+def test_distinct_count_estimate_is_within_its_error(distinct):
+    sketch = HyperLogLog(12)
+
+    sketch.update(str(value) for value in range(distinct))
+
+    # Five standard errors of 1.04 / sqrt(2 ** 12)
+    assert sketch.count() == pytest.approx(distinct, rel=0.08)
+
+
+def test_repeated_values_do_not_change_the_estimate():
+    sketch = HyperLogLog(12)
+    sketch.update(str(value) for value in range(5000))
+    count = sketch.count()
+
+    sketch.update(str(value) for value in range(5000))
+    sketch.update(str(value) for value in range(0, 5000, 7))
+
+    assert sketch.count() == count
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows([["CERT", "FAILDATE", "NAME"]] + rows)
+
+
+def test_statistics_are_scanned_once_per_content(state_dir, tmp_path, monkeypatch):
+    file_path = str(tmp_path / "bank_failures.csv")
+    write_csv(file_path, [["10", "1/5/2001", "a"], ["12", "12/31/1999", ""]])
+    scans = []
+    scan_csv_statistics = column_stats.scan_csv_statistics
+    monkeypatch.setattr(
+        column_stats,
+        "scan_csv_statistics",
+        lambda *args: scans.append(args) or scan_csv_statistics(*args),
+    )
+
+    statistics = get_column_statistics(file_path)
+    assert get_column_statistics(file_path) == statistics
+    assert len(scans) == 1
+    assert statistics["rows"] == 2
+    assert statistics["columns"]["CERT"] == {
+        "type": "integer",
+        "nulls": 0,
+        "distinct": 2,
+        "min": 10,
+        "max": 12,
+    }
+    assert statistics["columns"]["FAILDATE"]["min"] == "1999-12-31"
+    assert statistics["columns"]["NAME"]["nulls"] == 1
+
+    write_csv(file_path, [["10", "1/5/2001", "a"], ["12.5", "12/31/1999", "b"]])
+
+    statistics = get_column_statistics(file_path)
+    assert len(scans) == 2
+    assert statistics["columns"]["CERT"]["type"] == "numeric"
+    assert statistics["columns"]["NAME"]["nulls"] == 0
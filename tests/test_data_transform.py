@@ -0,0 +1,209 @@
+import json
+import os
+
+import pytest
+from fake_fdic_server import ENDPOINT_GENERATORS
+from synthetic_data import (
+    generate_failure_properties_yaml,
+    generate_failure_record,
+    generate_records,
+)
+
+import api_utils
+import file_ops
+from data_transform import (
+    CsvHeaderError,
+    CsvPageWriter,
+    fdic_json_file_to_csv,
+    fdic_yaml_file_to_csv,
+)
+
+
+@pytest.fixture
+def definitions_dir(tmp_path, state_dir):
+    """A data directory holding the definitions of the stand-in bank failures."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    yaml_path = data_dir / "failure_properties.yaml"
+    yaml_path.write_text(generate_failure_properties_yaml())
+    fdic_yaml_file_to_csv(str(yaml_path))
+    return data_dir
+
+
+def transform_both_ways(data_dir, records):
+    """Transform the same records untyped and typed and return both CSV files."""
+    contents = []
+    for typed in (False, True):
+        json_path = data_dir / "bank_failures.json"
+        json_path.write_text(json.dumps(records))
+        fdic_json_file_to_csv(str(json_path), typed=typed)
+        csv_path = data_dir / "bank_failures.csv"
+        contents.append(csv_path.read_bytes())
+        os.remove(csv_path)
+    return contents
+
+
+def test_typed_transform_writes_the_same_csv(definitions_dir):
+    records = generate_records(generate_failure_record, 0, 3000, 3000)
+
+    untyped, typed = transform_both_ways(definitions_dir, records)
+
+    assert typed == untyped
+
+
+@pytest.mark.parametrize(
+    "costs",
+    [
+        [254766, 10],
+        [254766, None],
+        [254766.5, None],
+        [-0.25, 3],
+        [None, None],
+    ],
+)
+def test_typed_transform_writes_numbers_like_pandas(definitions_dir, costs):
+    records = [
+        {"data": {"ID": str(i), "CERT": cost, "COST": cost, "FAILDATE": "1/5/2001"}}
+        for i, cost in enumerate(costs)
+    ]
+
+    untyped, typed = transform_both_ways(definitions_dir, records)
+
+    assert typed == untyped
+
+
+def write_existing_csv(data_dir, text):
+    (data_dir / "bank_failures.csv").write_text(text)
+
+
+def merge(data_dir, records, chunk_rows):
+    json_path = data_dir / "bank_failures.json"
+    json_path.write_text(json.dumps([{"data": record} for record in records]))
+    fdic_json_file_to_csv(str(json_path), merge_existing=True, chunk_rows=chunk_rows)
+    return (data_dir / "bank_failures.csv").read_text().splitlines()
+
+
+@pytest.mark.parametrize("chunk_rows", [0, 1])
+def test_new_records_replace_existing_rows_with_their_key(tmp_path, chunk_rows):
+    write_existing_csv(tmp_path, "ID,CERT,NAME\n1,10,old\n2,20,kept\n3,30,old too\n")
+
+    lines = merge(
+        tmp_path,
+        [
+            {"ID": "3", "CERT": 30, "NAME": "new too"},
+            {"ID": "1", "CERT": 10, "NAME": "new"},
+            {"ID": "4", "CERT": 40, "NAME": "added"},
+        ],
+        chunk_rows,
+    )
+
+    assert lines == [
+        "ID,CERT,NAME",
+        "3,30,new too",
+        "1,10,new",
+        "4,40,added",
+        "2,20,kept",
+    ]
+
+
+@pytest.mark.parametrize("chunk_rows", [0, 1])
+def test_existing_rows_match_whatever_format_they_were_written_in(tmp_path, chunk_rows):
+    # Without an ID, bank failures are keyed by CERT
+    write_existing_csv(
+        tmp_path, "CERT,FAILDATE,NAME\n254766.0,2023-02-09,old\n10,1/5/2001,kept\n"
+    )
+
+    lines = merge(
+        tmp_path, [{"CERT": 254766, "FAILDATE": "2/9/2023", "NAME": "new"}], chunk_rows
+    )
+
+    assert lines == ["CERT,FAILDATE,NAME", "254766,2/9/2023,new", "10,1/5/2001,kept"]
+
+
+@pytest.mark.parametrize("chunk_rows", [0, 1])
+def test_merge_without_new_records_keeps_the_existing_csv(tmp_path, chunk_rows):
+    existing = "ID,CERT,NAME\n1,10,kept\n"
+    write_existing_csv(tmp_path, existing)
+
+    merge(tmp_path, [], chunk_rows)
+
+    assert (tmp_path / "bank_failures.csv").read_text() == existing
+    assert not (tmp_path / "bank_failures.json").exists()
+
+
+def test_fused_download_without_new_records_keeps_the_existing_csv(
+    state_dir, data_dir, fdic_server
+):
+    existing = "ID,CERT,NAME\n1,10,kept\n"
+    with open(os.path.join(data_dir, "bank_failures.csv"), "w") as f:
+        f.write(existing)
+    fdic_server.rows["/api/failures"] = 0
+
+    assert api_utils.download_files_with_pagination(
+        fdic_server.base_url,
+        "/api/failures",
+        {"filename": "bank_failures"},
+        output_format="csv",
+        merge_existing=True,
+        adaptive=False,
+    )
+
+    with open(os.path.join(data_dir, "bank_failures.csv")) as f:
+        assert f.read() == existing
+
+
+def test_streamed_transform_keeps_properties_of_later_records(tmp_path):
+    records = [
+        {"data": {"ID": "1", "NAME": "a"}},
+        {"data": {"ID": "2", "COST": 5}},
+        {"data": {"ID": "3", "NAME": "c", "FIN": "x"}},
+    ]
+    contents = []
+    for chunk_rows in (0, 1):
+        json_path = tmp_path / "bank_failures.json"
+        json_path.write_text(json.dumps(records))
+        fdic_json_file_to_csv(str(json_path), chunk_rows=chunk_rows)
+        contents.append((tmp_path / "bank_failures.csv").read_text())
+
+    # Streamed values are written as received, so only the columns compare
+    assert [content.splitlines()[0] for content in contents] == [
+        "ID,NAME,COST,FIN",
+        "ID,NAME,COST,FIN",
+    ]
+    assert contents[1].splitlines()[1:] == ["1,a,,", "2,,5,", "3,c,,x"]
+
+
+def test_csv_writer_refuses_properties_missing_from_its_header(tmp_path):
+    destination_path = tmp_path / "bank_failures.csv"
+    writer = CsvPageWriter(str(destination_path))
+    writer.write_records([{"data": {"ID": "1", "NAME": "a"}}])
+
+    with pytest.raises(CsvHeaderError, match="COST"):
+        writer.write_records([{"data": {"ID": "2", "COST": 5}}])
+
+    writer.abort()
+    assert not destination_path.exists()
+
+
+def test_fused_download_fails_on_properties_of_later_pages(
+    state_dir, data_dir, fdic_server, monkeypatch
+):
+    def generate_record(index):
+        record = generate_failure_record(index)
+        if index >= 20:
+            record["data"]["NEWPROP"] = "x"
+        return record
+
+    monkeypatch.setitem(ENDPOINT_GENERATORS, "/api/failures", generate_record)
+
+    assert not api_utils.download_files_with_pagination(
+        fdic_server.base_url,
+        "/api/failures",
+        {"filename": "bank_failures"},
+        limit=10,
+        output_format="csv",
+        adaptive=False,
+    )
+
+    assert not os.path.exists(os.path.join(data_dir, "bank_failures.csv"))
+    assert os.listdir(file_ops.get_checkpoint_directory()) == []
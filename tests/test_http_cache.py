@@ -0,0 +1,129 @@
+import json
+import os
+
+import api_utils
+import config
+import http_cache
+
+URL = "http://127.0.0.1/api/failures"
+
+
+def read_records(path):
+    with open(path, "r") as f:
+        return [record["data"]["ID"] for record in json.load(f)]
+
+
+def test_page_is_loaded_from_a_later_run(state_dir):
+    params = {"filename": "bank_failures", "offset": "0", "limit": "10"}
+    http_cache.store_page(URL, params, b'{"data": []}')
+
+    assert http_cache.load_page(URL, dict(params)) == b'{"data": []}'
+    # The limit is part of the page's address
+    assert http_cache.load_page(URL, dict(params, limit="20")) is None
+    assert http_cache.load_page_limits(URL, {"filename": "bank_failures"}) == {0: 10}
+
+
+def test_expired_page_is_not_loaded(state_dir):
+    params = {"offset": "0", "limit": "10"}
+    http_cache.store_page(URL, params, b"{}")
+    page_path = os.path.join(
+        http_cache.get_page_cache_directory(),
+        f"{http_cache.get_page_key(URL, params)}.json",
+    )
+    os.utime(page_path, (0, 0))
+
+    assert http_cache.load_page(URL, params, ttl=60) is None
+    assert http_cache.load_page(URL, params, ttl=None) == b"{}"
+
+
+def test_least_recently_used_page_is_evicted(state_dir):
+    pages = [{"offset": str(offset), "limit": "10"} for offset in (0, 10, 20)]
+    http_cache.store_page(URL, pages[0], b"x" * 100, max_bytes=250)
+    http_cache.store_page(URL, pages[1], b"x" * 100, max_bytes=250)
+    page_path = os.path.join(
+        http_cache.get_page_cache_directory(),
+        f"{http_cache.get_page_key(URL, pages[1])}.json",
+    )
+    # The second page was read after the first one was stored
+    os.utime(page_path, (0, os.stat(page_path).st_mtime))
+    http_cache.load_page(URL, pages[0])
+
+    http_cache.store_page(URL, pages[2], b"x" * 100, max_bytes=250)
+
+    assert http_cache.load_page(URL, pages[0]) is not None
+    assert http_cache.load_page(URL, pages[1]) is None
+    assert http_cache.load_page(URL, pages[2]) is not None
+
+
+def test_replay_reads_every_page_from_the_cache(
+    state_dir, data_dir, fdic_server, monkeypatch
+):
+    params = {"filename": "bank_failures"}
+    monkeypatch.setattr(config, "PAGE_CACHE_ENABLED", True)
+    assert api_utils.download_files_with_pagination(
+        fdic_server.base_url, "/api/failures", params, limit=10, adaptive=False
+    )
+    collected = read_records(os.path.join(data_dir, "bank_failures.json"))
+    requests_before_replay = fdic_server.request_count
+
+    monkeypatch.setattr(config, "REPLAY_FROM_CACHE", True)
+    # Pages are replayed with the limit they were cached with
+    assert api_utils.download_files_with_pagination(
+        fdic_server.base_url, "/api/failures", params, limit=25, adaptive=False
+    )
+
+    assert read_records(os.path.join(data_dir, "bank_failures.json")) == collected
+    assert len(collected) == 55
+    assert fdic_server.request_count == requests_before_replay
+
+
+def test_replay_fails_on_a_page_missing_from_the_cache(
+    state_dir, data_dir, fdic_server, monkeypatch
+):
+    monkeypatch.setattr(config, "REPLAY_FROM_CACHE", True)
+
+    assert not api_utils.download_files_with_pagination(
+        fdic_server.base_url,
+        "/api/failures",
+        {"filename": "bank_failures"},
+        limit=10,
+        adaptive=False,
+        resumable=False,
+    )
+    assert fdic_server.request_count == 0
+    assert not os.path.exists(os.path.join(data_dir, "bank_failures.json"))
+
+
+def test_limits_of_expired_pages_are_not_loaded(state_dir):
+    params = {"filename": "bank_failures"}
+    for offset in (0, 10):
+        http_cache.store_page(URL, dict(params, offset=offset, limit=10), b"{}")
+    page_path = os.path.join(
+        http_cache.get_page_cache_directory(),
+        f"{http_cache.get_page_key(URL, dict(params, offset=10, limit=10))}.json",
+    )
+    os.utime(page_path, (0, 0))
+
+    assert http_cache.load_page_limits(URL, params) == {0: 10, 10: 10}
+    assert http_cache.load_page_limits(URL, params, ttl=60) == {0: 10}
+
+
+def test_adaptive_download_reads_cached_pages_with_their_limits(
+    state_dir, data_dir, fdic_server, monkeypatch
+):
+    params = {"filename": "bank_failures"}
+    monkeypatch.setattr(config, "PAGE_CACHE_ENABLED", True)
+    assert api_utils.download_files_with_pagination(
+        fdic_server.base_url, "/api/failures", params, limit=10, adaptive=True
+    )
+    collected = read_records(os.path.join(data_dir, "bank_failures.json"))
+    requests_before_rerun = fdic_server.request_count
+
+    # The rerun starts at the tuned page size, but requests cached pages as cached
+    assert api_utils.download_files_with_pagination(
+        fdic_server.base_url, "/api/failures", params, limit=10, adaptive=True
+    )
+
+    assert read_records(os.path.join(data_dir, "bank_failures.json")) == collected
+    assert len(collected) == 55
+    assert fdic_server.request_count == requests_before_rerun
@@ -0,0 +1,89 @@
+import pytest
+import requests
+
+import http_client
+from http_client import TokenBucket
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the delays of the token bucket instead of sleeping."""
+    delays = []
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    return delays
+
+
+def test_burst_is_sent_at_once_and_the_rest_spaced_by_the_rate(sleeps):
+    bucket = TokenBucket(rate=10, burst=3)
+
+    waits = [bucket.acquire() for _ in range(5)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    # Waiting requests reserve consecutive future tokens
+    assert waits[3] == pytest.approx(0.1, abs=0.01)
+    assert waits[4] == pytest.approx(0.2, abs=0.01)
+    assert sleeps == waits[3:]
+
+
+def test_tokens_refill_up_to_the_burst(sleeps, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(http_client.time, "monotonic", lambda: clock[0])
+    bucket = TokenBucket(rate=10, burst=2)
+    bucket.acquire()
+    bucket.acquire()
+
+    clock[0] += 60
+    waits = [bucket.acquire() for _ in range(3)]
+
+    assert waits == [0.0, 0.0, pytest.approx(0.1)]
+
+
+def test_pause_holds_back_requests_and_drops_the_burst(sleeps, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(http_client.time, "monotonic", lambda: clock[0])
+    bucket = TokenBucket(rate=1, burst=5)
+
+    bucket.pause(1)
+
+    # The burst accumulated before the pause is not sent when it expires
+    assert [bucket.acquire() for _ in range(3)] == [1, 2, 3]
+    assert sleeps == [1, 2, 3]
+
+
+def test_zero_rate_does_not_limit_requests(sleeps):
+    bucket = TokenBucket(rate=0, burst=1)
+
+    assert [bucket.acquire() for _ in range(100)] == [0.0] * 100
+    assert sleeps == []
+
+
+def test_throttled_response_pauses_the_shared_limiter(sleeps, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(http_client.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(http_client, "rate_limiter", TokenBucket(rate=10, burst=5))
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = "3"
+
+    http_client.throttle(response)
+
+    assert http_client.rate_limiter.acquire() == pytest.approx(3)
+
+
+def test_rate_limiter_wait_is_not_request_latency(fdic_server, monkeypatch):
+    import api_utils
+    from page_size import PageSizeController
+
+    monkeypatch.setattr(http_client, "rate_limiter", TokenBucket(rate=10, burst=5))
+    http_client.rate_limiter.pause(0.5)
+    page_size = PageSizeController(10, target_latency=0.3, step=10)
+
+    data = api_utils.make_api_request(
+        f"{fdic_server.base_url}/api/failures",
+        {"limit": "10", "offset": "0"},
+        page_size,
+    )
+
+    assert len(data["data"]) == 10
+    # A page held back by the limiter is not too slow
+    assert page_size.limit == 20
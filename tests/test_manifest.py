@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+import fdic_datapipeline
+import main
+from fdic_datapipeline import FDICDataPipeline
+from file_ops import setup_directory
+
+
+@pytest.fixture
+def pipeline_data_dir(tmp_path, monkeypatch):
+    """Transform the files of a test in its own data directory."""
+    path = setup_directory(str(tmp_path / "data"))
+    monkeypatch.setattr(fdic_datapipeline, "get_data_directory", lambda *args: path)
+    return path
+
+
+@pytest.fixture
+def github_output(tmp_path, monkeypatch):
+    """Collect the GitHub Actions step outputs of a test."""
+    path = tmp_path / "github_output"
+    path.write_text("")
+    monkeypatch.setenv("GITHUB_OUTPUT", str(path))
+    return path
+
+
+def collect(data_dir, names):
+    """Write a collected bank_failures.json with a record for each name."""
+    records = [
+        {"data": {"ID": str(i), "CERT": str(i), "NAME": name, "FAILDATE": "1/5/2001"}}
+        for i, name in enumerate(names, start=1)
+    ]
+    with open(os.path.join(data_dir, "bank_failures.json"), "w") as f:
+        json.dump(records, f)
+
+
+def transform():
+    pipeline = FDICDataPipeline("http://127.0.0.1")
+    assert pipeline.run_data_transformation_pipeline() == {}
+    return pipeline.changed_resources
+
+
+def test_unchanged_input_is_not_transformed_again(state_dir, pipeline_data_dir):
+    csv_path = os.path.join(pipeline_data_dir, "bank_failures.csv")
+    collect(pipeline_data_dir, ["a", "b"])
+    assert transform() == ["bank_failures.csv"]
+    mtime_ns = os.stat(csv_path).st_mtime_ns
+
+    collect(pipeline_data_dir, ["a", "b"])
+    assert transform() == []
+
+    assert os.stat(csv_path).st_mtime_ns == mtime_ns
+    assert not os.path.exists(os.path.join(pipeline_data_dir, "bank_failures.json"))
+
+
+def test_changed_input_is_transformed_and_reported(state_dir, pipeline_data_dir):
+    collect(pipeline_data_dir, ["a", "b"])
+    transform()
+
+    collect(pipeline_data_dir, ["a", "c"])
+    assert transform() == ["bank_failures.csv"]
+
+    with open(os.path.join(pipeline_data_dir, "bank_failures.csv")) as f:
+        assert "c" in f.read().split()[-1]
+
+
+def test_missing_output_of_an_unchanged_input_is_rebuilt(state_dir, pipeline_data_dir):
+    csv_path = os.path.join(pipeline_data_dir, "bank_failures.csv")
+    collect(pipeline_data_dir, ["a", "b"])
+    transform()
+    with open(csv_path) as f:
+        content = f.read()
+    os.remove(csv_path)
+
+    collect(pipeline_data_dir, ["a", "b"])
+    # The rebuilt file has the content of the previous run
+    assert transform() == []
+
+    with open(csv_path) as f:
+        assert f.read() == content
+
+
+def test_failed_run_exits_and_leaves_its_changes_to_the_next_run(
+    state_dir, pipeline_data_dir, github_output
+):
+    collect(pipeline_data_dir, ["a", "b"])
+    with open(os.path.join(pipeline_data_dir, "failure_properties.yaml"), "w") as f:
+        f.write("properties: [")
+
+    with pytest.raises(SystemExit) as exit_info:
+        main.main(["transform"])
+
+    assert exit_info.value.code == 1
+    assert github_output.read_text() == ""
+
+    # The next collection brings a valid definitions file
+    os.remove(os.path.join(pipeline_data_dir, "failure_properties.yaml"))
+    main.main(["transform"])
+    main.main(["transform"])
+
+    assert github_output.read_text() == "changed=true\nchanged=false\n"
@@ -0,0 +1,152 @@
+import api_utils
+from page_size import PageSizeController, load_page_size, save_page_size
+
+
+def controller(**kwargs):
+    options = dict(
+        min_limit=100,
+        max_limit=1000,
+        step=100,
+        decrease=0.5,
+        target_latency=1,
+        max_bytes=1000,
+        probe_after=3,
+    )
+    options.update(kwargs)
+    return PageSizeController(500, **options)
+
+
+def test_pages_within_targets_grow_the_page_size_up_to_its_maximum():
+    page_size = controller()
+
+    for _ in range(10):
+        page_size.observe(page_size.limit, 0.1, 10)
+
+    assert page_size.limit == 1000
+    assert page_size.best == 1000
+
+
+def test_short_pages_do_not_grow_the_page_size():
+    page_size = controller()
+
+    # A page smaller than the current size is no evidence a larger one is fine
+    page_size.observe(200, 0.1, 10)
+
+    assert page_size.limit == 500
+    assert page_size.best == 200
+
+
+def test_slow_or_large_page_shrinks_the_page_size():
+    page_size = controller()
+    page_size.observe(500, 0.1, 10)
+    page_size.observe(600, 2, 10)
+    assert page_size.limit == 300
+    # A smaller page size served within the targets stays the best
+    assert page_size.best == 500
+
+    page_size.observe(300, 0.1, 5000)
+    assert page_size.limit == 150
+
+
+def test_rejected_limit_caps_the_page_size_below_it():
+    page_size = controller()
+    page_size.observe(500, 0.1, 10)
+    page_size.observe(600, 0.1, 10)
+
+    assert page_size.reject(700)
+
+    assert page_size.limit == 350
+    assert page_size.max_limit == 699
+    for _ in range(2):
+        page_size.observe(page_size.limit, 0.1, 10)
+    assert page_size.limit == 550
+    # The best page size served within the targets is kept below the cap
+    assert page_size.best == 600
+
+
+def test_rejected_best_page_size_is_forgotten():
+    page_size = controller()
+    page_size.observe(500, 0.1, 10)
+
+    assert page_size.reject(500)
+
+    assert page_size.best is None
+
+
+def test_cap_is_lifted_after_enough_pages_within_targets():
+    page_size = controller()
+    page_size.reject(700)
+    page_size.observe(page_size.limit, 0.1, 10)
+    page_size.observe(page_size.limit, 0.1, 10)
+    assert page_size.max_limit == 699
+
+    page_size.observe(page_size.limit, 0.1, 10)
+
+    assert page_size.max_limit == 1000
+    for _ in range(10):
+        page_size.observe(page_size.limit, 0.1, 10)
+    assert page_size.limit == 1000
+
+
+def test_failure_restarts_the_count_before_the_cap_is_lifted():
+    page_size = controller()
+    page_size.reject(700)
+    page_size.observe(page_size.limit, 0.1, 10)
+    page_size.observe(page_size.limit, 0.1, 10)
+
+    page_size.observe(page_size.limit, 2, 10)
+    page_size.observe(page_size.limit, 0.1, 10)
+
+    assert page_size.max_limit == 699
+
+
+def test_smallest_page_size_cannot_be_rejected():
+    page_size = controller()
+
+    assert not page_size.reject(100)
+
+
+def test_fixed_page_size_does_not_change():
+    page_size = controller(adaptive=False)
+    page_size.observe(500, 0.1, 10)
+    page_size.observe(500, 2, 10)
+
+    assert page_size.limit == 500
+    assert not page_size.reject(500)
+
+
+def test_scheduled_offsets_use_their_page_size():
+    page_size = controller(schedule={0: 700, 700: 300})
+
+    assert [page_size.limit_at(offset) for offset in (0, 700, 1000)] == [
+        700,
+        300,
+        500,
+    ]
+
+
+def test_page_size_is_remembered_for_the_next_run(state_dir):
+    assert load_page_size("/api/failures") is None
+
+    save_page_size("/api/failures", 3000)
+    save_page_size("/api/financials", 5000)
+
+    assert load_page_size("/api/failures") == 3000
+
+
+def test_retried_page_is_timed_by_its_final_attempt(fdic_server, monkeypatch):
+    failures = [True, True]
+    monkeypatch.setattr(
+        fdic_server, "should_fail", lambda: bool(failures and failures.pop())
+    )
+    page_size = controller(target_latency=0.3, max_bytes=10**6)
+
+    data = api_utils.make_api_request(
+        f"{fdic_server.base_url}/api/failures",
+        {"limit": "500", "offset": "0"},
+        page_size,
+    )
+
+    assert len(data["data"]) == 55
+    # The 503s and the backoff before the retries are not the page's latency
+    assert page_size.limit == 600
@@ -0,0 +1,103 @@
+import csv
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from data_transform import fdic_csv_file_to_partitions, get_partition_keys
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows([["CERT", "FAILDATE"]] + rows)
+
+
+def partition(file_path, partition_dir, granularity="year"):
+    return fdic_csv_file_to_partitions(
+        file_path, "FAILDATE", granularity, partition_dir, chunk_rows=2
+    )
+
+
+def read_index(partition_dir):
+    with open(os.path.join(partition_dir, "bank_failures", "_index.json")) as f:
+        return json.load(f)
+
+
+def test_partition_keys_by_year_and_quarter():
+    dates = pd.Series(["1/5/2001", "2001-11-30", ""], dtype=str)
+
+    assert list(get_partition_keys(dates, "year")) == [
+        "year=2001",
+        "year=2001",
+        "year=unknown",
+    ]
+    assert list(get_partition_keys(dates, "quarter")) == [
+        "quarter=2001Q1",
+        "quarter=2001Q4",
+        "quarter=unknown",
+    ]
+    with pytest.raises(ValueError):
+        get_partition_keys(dates, "month")
+
+
+def test_partitions_keep_every_row_in_file_order(tmp_path):
+    file_path = str(tmp_path / "bank_failures.csv")
+    partition_dir = str(tmp_path / "partitions")
+    write_csv(
+        file_path,
+        [["1", "1/5/2001"], ["2", "3/1/2002"], ["3", "7/4/2001"], ["4", ""]],
+    )
+
+    assert partition(file_path, partition_dir) == (4, 4)
+
+    index = read_index(partition_dir)
+    assert {key: value["rows"] for key, value in index["partitions"].items()} == {
+        "year=2001": 2,
+        "year=2002": 1,
+        "year=unknown": 1,
+    }
+    with open(
+        os.path.join(partition_dir, "bank_failures", "year=2001", "data.csv")
+    ) as f:
+        assert f.read().splitlines() == ["CERT,FAILDATE", "1,1/5/2001", "3,7/4/2001"]
+
+
+def test_only_changed_partitions_are_rewritten(tmp_path):
+    file_path = str(tmp_path / "bank_failures.csv")
+    partition_dir = str(tmp_path / "partitions")
+    dataset_dir = os.path.join(partition_dir, "bank_failures")
+    write_csv(file_path, [["1", "1/5/2001"], ["2", "3/1/2002"], ["3", "6/1/2003"]])
+    partition(file_path, partition_dir)
+    inodes = {
+        key: os.stat(os.path.join(dataset_dir, key, "data.csv")).st_ino
+        for key in ("year=2001", "year=2002")
+    }
+
+    # 2002 gains a row, 2003 loses its only row
+    write_csv(file_path, [["1", "1/5/2001"], ["2", "3/1/2002"], ["4", "9/9/2002"]])
+
+    assert partition(file_path, partition_dir) == (3, 2)
+    assert os.stat(os.path.join(dataset_dir, "year=2001", "data.csv")).st_ino == (
+        inodes["year=2001"]
+    )
+    assert os.stat(os.path.join(dataset_dir, "year=2002", "data.csv")).st_ino != (
+        inodes["year=2002"]
+    )
+    assert not os.path.exists(os.path.join(dataset_dir, "year=2003"))
+    assert sorted(read_index(partition_dir)["partitions"]) == ["year=2001", "year=2002"]
+    assert sorted(os.listdir(dataset_dir)) == ["_index.json", "year=2001", "year=2002"]
+
+
+def test_missing_partition_is_written_again(tmp_path):
+    file_path = str(tmp_path / "bank_failures.csv")
+    partition_dir = str(tmp_path / "partitions")
+    partition_path = os.path.join(
+        partition_dir, "bank_failures", "year=2001", "data.csv"
+    )
+    write_csv(file_path, [["1", "1/5/2001"], ["2", "3/1/2002"]])
+    partition(file_path, partition_dir)
+    os.remove(partition_path)
+
+    assert partition(file_path, partition_dir) == (2, 1)
+    assert os.path.exists(partition_path)
@@ -0,0 +1,117 @@
+import csv
+import os
+import sqlite3
+
+import pytest
+
+import sqlite_store
+from sqlite_store import run_store_pipeline
+
+
+@pytest.fixture
+def store(tmp_path, state_dir):
+    """The data directory and database path of a test."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    return str(data_dir), str(tmp_path / "fdic.sqlite")
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows([["CERT", "FAILDATE", "NAME", "COST"]] + rows)
+
+
+def query(db_path, sql):
+    connection = sqlite3.connect(db_path)
+    try:
+        return connection.execute(sql).fetchall()
+    finally:
+        connection.close()
+
+
+def test_datasets_are_loaded_typed_and_indexed(store):
+    data_dir, db_path = store
+    write_csv(
+        os.path.join(data_dir, "bank_failures.csv"),
+        [["10", "1/5/2001", "a", "1.5"], ["12", "12/31/1999", "b", ""]],
+    )
+
+    assert run_store_pipeline(data_dir, db_path) == {"bank_failures": 2}
+
+    assert query(db_path, "SELECT * FROM bank_failures ORDER BY FAILDATE") == [
+        (12, "1999-12-31", "b", None),
+        (10, "2001-01-05", "a", 1.5),
+    ]
+    indexes = query(
+        db_path,
+        "SELECT name FROM sqlite_master WHERE type = 'index' "
+        "AND tbl_name = 'bank_failures' ORDER BY name",
+    )
+    assert indexes == [("bank_failures_CERT",), ("bank_failures_FAILDATE",)]
+
+
+def test_unchanged_dataset_keeps_its_table(store):
+    data_dir, db_path = store
+    write_csv(
+        os.path.join(data_dir, "bank_failures.csv"), [["10", "1/5/2001", "a", "1"]]
+    )
+    run_store_pipeline(data_dir, db_path)
+    loaded_at = query(db_path, "SELECT loaded_at FROM _datasets")
+
+    assert run_store_pipeline(data_dir, db_path) == {}
+    assert query(db_path, "SELECT loaded_at FROM _datasets") == loaded_at
+    assert query(db_path, "SELECT COUNT(*) FROM bank_failures") == [(1,)]
+
+
+def test_changed_dataset_is_reloaded_and_removed_dataset_dropped(store):
+    data_dir, db_path = store
+    write_csv(
+        os.path.join(data_dir, "bank_failures.csv"), [["10", "1/5/2001", "a", "1"]]
+    )
+    write_csv(os.path.join(data_dir, "failure_properties.csv"), [["1", "", "x", ""]])
+    run_store_pipeline(data_dir, db_path)
+
+    write_csv(
+        os.path.join(data_dir, "bank_failures.csv"),
+        [["10", "1/5/2001", "a", "1"], ["11", "2/9/2023", "c", "2"]],
+    )
+    os.remove(os.path.join(data_dir, "failure_properties.csv"))
+
+    assert run_store_pipeline(data_dir, db_path) == {"bank_failures": 2}
+    assert query(db_path, "SELECT CERT FROM bank_failures ORDER BY CERT") == [
+        (10,),
+        (11,),
+    ]
+    assert query(db_path, "SELECT name FROM _datasets") == [("bank_failures",)]
+    tables = query(db_path, "SELECT name FROM sqlite_master WHERE type = 'table'")
+    assert ("failure_properties",) not in tables
+
+
+def test_failed_reload_keeps_the_previous_tables(store, monkeypatch):
+    data_dir, db_path = store
+    write_csv(
+        os.path.join(data_dir, "bank_failures.csv"), [["10", "1/5/2001", "a", "1"]]
+    )
+    write_csv(os.path.join(data_dir, "failure_properties.csv"), [["1", "", "x", ""]])
+    run_store_pipeline(data_dir, db_path)
+    datasets = query(db_path, "SELECT * FROM _datasets ORDER BY name")
+
+    write_csv(
+        os.path.join(data_dir, "bank_failures.csv"), [["11", "2/9/2023", "c", "2"]]
+    )
+    write_csv(os.path.join(data_dir, "failure_properties.csv"), [["2", "", "y", ""]])
+    load_table = sqlite_store.load_table
+
+    def fail_on_properties(connection, table, *args):
+        if table == "failure_properties":
+            raise OSError("disk full")
+        return load_table(connection, table, *args)
+
+    monkeypatch.setattr(sqlite_store, "load_table", fail_on_properties)
+
+    with pytest.raises(OSError):
+        run_store_pipeline(data_dir, db_path)
+
+    # The tables loaded before the failure are rolled back with it
+    assert query(db_path, "SELECT CERT FROM bank_failures") == [(10,)]
+    assert query(db_path, "SELECT * FROM _datasets ORDER BY name") == datasets